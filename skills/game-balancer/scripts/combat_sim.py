@@ -9,11 +9,101 @@ Outputs win rates, average time-to-kill, and damage statistics.
 """
 
 import argparse
+import copy
+import heapq
 import json
+import math
+import mmap
+import os
 import random
+import signal
+import statistics
+import struct
+import sys
+import tempfile
+import time
+from bisect import insort
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Any, Tuple
-from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Any, Optional, TextIO, Tuple
+from dataclasses import asdict, dataclass, field
+
+from sim_cache import ResultCache, add_cache_arguments, cache_from_args, canonical_hash, source_version
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python engine always works
+    np = None
+
+
+# Fights per batch. A batch is also the unit of work handed to a worker process
+# and owns its own RNG stream, so results depend on the seed and batch size but
+# never on the number of workers.
+DEFAULT_BATCH_SIZE = 65536
+
+# Adaptive precision mode: size of the first pilot batch, and the fight budget
+# used when --target-ci is given without --simulations
+DEFAULT_PILOT_BATCH = 2000
+DEFAULT_MAX_ADAPTIVE_SIMULATIONS = 10_000_000
+
+# Exact solver: per-side live state limit before falling back to Monte Carlo,
+# and the probability below which a single state is dropped (reported as
+# truncated_probability)
+DEFAULT_EXACT_MAX_STATES = 200_000
+EXACT_PRUNE_PROBABILITY = 1e-16
+
+# Hit points at or below this count as dead, in every engine and in the exact
+# solver, so float residue from armor and multipliers cannot leave a target
+# alive after a hit that lands on exactly 0 HP
+HP_EPSILON = 1e-9
+
+# Winner codes used by the batch engine and trace files
+WINNER_DRAW = 0
+WINNER_ATTACKER = 1
+WINNER_DEFENDER = 2
+WINNER_CODES = {'draw': WINNER_DRAW, 'attacker': WINNER_ATTACKER, 'defender': WINNER_DEFENDER}
+
+# Attack outcomes (roll_hit and trace records)
+OUTCOME_HIT = 0
+OUTCOME_DODGED = 1
+OUTCOME_MISSED = 2
+OUTCOME_NO_ACTION = 3  # stunned, or defender already dead when its turn came
+
+# Status effect kinds (turn engine). DoTs and stuns land on the target of the
+# hit, shields on the side that landed it.
+EFFECT_DOT = 0
+EFFECT_STUN = 1
+EFFECT_SHIELD = 2
+EFFECT_KINDS = {'dot': EFFECT_DOT, 'stun': EFFECT_STUN, 'shield': EFFECT_SHIELD}
+
+# Trace file layout: header, fixed-size fight index, fixed-width turn records.
+# Records: turn, attacker_hp, defender_hp, then per side (attacker, defender):
+# ability index (-1 = basic attack), outcome, crit flag, damage dealt.
+TRACE_MAGIC = b'CBTRACE1'
+TRACE_HEADER = struct.Struct('<8sIIQQQQI12x')
+TRACE_INDEX = struct.Struct('<QQIB3x')
+TRACE_RECORD = struct.Struct('<Iffhbbfhbbf')
+TRACE_FLAG_TRUNCATED = 1
+
+# Seconds between checkpoint saves of long runs (--checkpoint)
+DEFAULT_CHECKPOINT_INTERVAL = 300.0
+
+# Rare-event (importance sampling) mode: fights in the final weighted run and
+# per cross-entropy tuning round
+DEFAULT_RARE_SIMULATIONS = 10_000
+DEFAULT_RARE_PILOT = 2_000
+
+# --check-exact: Monte Carlo fights compared against the exact solver, and the
+# largest z-score (win rate or average turns) that still passes
+DEFAULT_CHECK_SIMULATIONS = 1_000_000
+EXACT_CHECK_MAX_Z = 5.0
+
+# Default trace capacity: stored fights, and turn records reserved per fight
+DEFAULT_TRACE_FIGHTS = 10_000
+DEFAULT_TRACE_TURNS = 64
+
+# Pilot fights used to estimate a 'ttk>pXX' threshold when --exact cannot
+DEFAULT_TRACE_PILOT = 20_000
 
 
 @dataclass
@@ -25,20 +115,1100 @@ class CombatStats:
     critical_chance: float = 0.0
     critical_multiplier: float = 1.5
     dodge_chance: float = 0.0
+    attack_speed: float = 1.0  # actions per second (timeline engine)
+
+
+@dataclass
+class StatusEffect:
+    """
+    Status effect applied when an ability hits (turn engine).
+
+    dot: deals damage_multiplier x the caster's attack_power (ignoring armor)
+         at the end of each of the next ``duration`` turns, starting with the
+         turn it lands.
+    stun: the target skips its next ``duration`` actions.
+    shield: the caster absorbs up to ``amount`` damage until the end of turn
+            (landing turn + duration - 1).
+    """
+    name: str
+    kind: str  # 'dot', 'stun' or 'shield'
+    duration: int = 1  # turns
+    damage_multiplier: float = 0.0  # dot damage per turn, x attack_power
+    amount: float = 0.0  # shield absorb
+    chance: float = 1.0  # rolled separately after the hit when below 1
+    max_stacks: Optional[int] = None  # concurrent dot/shield stacks per target
 
 
 @dataclass
 class Ability:
     """Combat ability definition."""
     name: str
-    cooldown: int  # turns
+    cooldown: int  # turns (seconds in the timeline engine)
     damage_multiplier: float
     hit_chance: float = 1.0
+    cast_time: float = 0.0  # seconds (timeline engine)
+    effects: List[StatusEffect] = field(default_factory=list)
+
+
+class RunningStats:
+    """
+    Constant-memory count/mean/variance/min/max (Welford's algorithm).
+
+    Two instances merge exactly with Chan's parallel update, so batch and
+    worker results can be combined without keeping individual samples.
+    """
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float) -> None:
+        """Add a single sample."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def add_array(self, values: Any) -> None:
+        """Add a NumPy array of samples."""
+        if len(values) == 0:
+            return
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = values.min().item()
+        batch.max = values.max().item()
+        self.merge(batch)
+
+    def merge(self, other: 'RunningStats') -> None:
+        """Merge another RunningStats into this one in place."""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (0 with fewer than two samples)."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def to_state(self) -> List[Any]:
+        """JSON-serializable state (floats round-trip exactly)."""
+        return [self.count, self.mean, self.m2, self.min, self.max]
+
+    @classmethod
+    def from_state(cls, state: List[Any]) -> 'RunningStats':
+        """Rebuild from to_state() output."""
+        stats = cls()
+        stats.count, stats.mean, stats.m2, stats.min, stats.max = state
+        return stats
+
+
+class QuantileSketch:
+    """
+    Mergeable histogram sketch for quantiles.
+
+    Samples are counted in buckets of width ``resolution``, so memory is bounded
+    by the value range (e.g. 1..max_turns for turn counts) rather than by the
+    number of samples. With resolution 1 integer samples are exact.
+    """
+
+    def __init__(self, resolution: float = 1.0):
+        self.resolution = resolution
+        self.count = 0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, value: float, weight: int = 1) -> None:
+        """Add a sample (optionally with a multiplicity)."""
+        key = int(round(value / self.resolution))
+        self.buckets[key] = self.buckets.get(key, 0) + weight
+        self.count += weight
+
+    def add_array(self, values: Any) -> None:
+        """Add a NumPy array of samples."""
+        keys, counts = np.unique(np.rint(values / self.resolution), return_counts=True)
+        for key, weight in zip(keys.tolist(), counts.tolist()):
+            self.buckets[int(key)] = self.buckets.get(int(key), 0) + weight
+        self.count += len(values)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        """Merge another sketch (same resolution) into this one in place."""
+        for key, weight in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + weight
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Nearest-rank quantile for q in [0, 1] (None when empty)."""
+        if self.count == 0:
+            return None
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen >= rank:
+                return key * self.resolution
+        return max(self.buckets) * self.resolution
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable state."""
+        return {'resolution': self.resolution, 'buckets': sorted(self.buckets.items())}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'QuantileSketch':
+        """Rebuild from to_state() output."""
+        sketch = cls(state['resolution'])
+        sketch.buckets = {key: weight for key, weight in state['buckets']}
+        sketch.count = sum(sketch.buckets.values())
+        return sketch
+
+
+def apply_armor(base_damage: float, armor_formula: str, armor_value: float) -> float:
+    """
+    Apply an armor formula to a raw damage value.
+
+    Args:
+        base_damage: Damage before armor
+        armor_formula: 'flat' (subtract, min 1), 'percent' (reduce by %) or other (none)
+        armor_value: Armor damage reduction value
+
+    Returns:
+        Damage after armor
+    """
+    if armor_formula == 'flat':
+        return max(1, base_damage - armor_value)
+    elif armor_formula == 'percent':
+        return base_damage * (1 - armor_value / 100)
+    return base_damage
+
+
+def z_score(confidence: float) -> float:
+    """Two-sided standard normal critical value for a confidence level."""
+    return statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def wilson_interval(successes: int, trials: int, z: float) -> Tuple[float, float]:
+    """
+    Wilson score interval for a binomial proportion.
+
+    Unlike the normal approximation it stays inside [0, 1] and behaves well for
+    lopsided matchups with win rates near 0% or 100%.
+    """
+    if trials == 0:
+        return 0.0, 1.0
+    p = successes / trials
+    denom = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denom
+    half = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class CombatAccumulator:
+    """Constant-memory, mergeable aggregate over any number of fights."""
+
+    def __init__(self, resolution: float = 1.0):
+        self.attacker_wins = 0
+        self.defender_wins = 0
+        self.draws = 0
+        self.turns = RunningStats()
+        self.turns_sketch = QuantileSketch(resolution)
+        self.attacker_damage = RunningStats()
+        self.defender_damage = RunningStats()
+
+    @property
+    def simulations(self) -> int:
+        """Number of fights aggregated so far."""
+        return self.attacker_wins + self.defender_wins + self.draws
+
+    def add_fight(self, winner: str, turns: int, att_dmg: float, def_dmg: float) -> None:
+        """Add one simulate_combat() result."""
+        if winner == 'attacker':
+            self.attacker_wins += 1
+            self.attacker_damage.add(att_dmg)
+        elif winner == 'defender':
+            self.defender_wins += 1
+            self.defender_damage.add(def_dmg)
+        else:
+            self.draws += 1
+        self.turns.add(turns)
+        self.turns_sketch.add(turns)
+
+    def add_batch(self, winners: Any, turns: Any, att_dmg: Any, def_dmg: Any) -> None:
+        """Add the arrays returned by CombatSimulator.simulate_batch()."""
+        att_won = winners == WINNER_ATTACKER
+        def_won = winners == WINNER_DEFENDER
+        self.attacker_wins += int(np.count_nonzero(att_won))
+        self.defender_wins += int(np.count_nonzero(def_won))
+        self.draws += int(np.count_nonzero(winners == WINNER_DRAW))
+        self.turns.add_array(turns)
+        self.turns_sketch.add_array(turns)
+        self.attacker_damage.add_array(att_dmg[att_won])
+        self.defender_damage.add_array(def_dmg[def_won])
+
+    def merge(self, other: 'CombatAccumulator') -> None:
+        """Merge another accumulator into this one in place."""
+        self.attacker_wins += other.attacker_wins
+        self.defender_wins += other.defender_wins
+        self.draws += other.draws
+        self.turns.merge(other.turns)
+        self.turns_sketch.merge(other.turns_sketch)
+        self.attacker_damage.merge(other.attacker_damage)
+        self.defender_damage.merge(other.defender_damage)
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-serializable state, restored exactly by from_state()."""
+        return {
+            'wins': [self.attacker_wins, self.defender_wins, self.draws],
+            'turns': self.turns.to_state(),
+            'turns_sketch': self.turns_sketch.to_state(),
+            'attacker_damage': self.attacker_damage.to_state(),
+            'defender_damage': self.defender_damage.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'CombatAccumulator':
+        """Rebuild from to_state() output."""
+        accumulator = cls()
+        accumulator.attacker_wins, accumulator.defender_wins, accumulator.draws = state['wins']
+        accumulator.turns = RunningStats.from_state(state['turns'])
+        accumulator.turns_sketch = QuantileSketch.from_state(state['turns_sketch'])
+        accumulator.attacker_damage = RunningStats.from_state(state['attacker_damage'])
+        accumulator.defender_damage = RunningStats.from_state(state['defender_damage'])
+        return accumulator
+
+    def win_rate_interval(self, z: float) -> Tuple[float, float]:
+        """Wilson interval on the attacker win rate."""
+        return wilson_interval(self.attacker_wins, self.simulations, z)
+
+    def turns_interval(self, z: float) -> Tuple[float, float]:
+        """Normal-approximation interval on the mean turn count."""
+        if self.turns.count == 0:
+            return 0.0, float('inf')
+        half = z * math.sqrt(self.turns.variance / self.turns.count)
+        return self.turns.mean - half, self.turns.mean + half
+
+    def to_stats(self) -> Dict[str, Any]:
+        """Build the run_simulations stats dictionary."""
+        num_simulations = self.simulations
+
+        return {
+            'simulations': num_simulations,
+            'attacker_win_rate': self.attacker_wins / num_simulations,
+            'defender_win_rate': self.defender_wins / num_simulations,
+            'draw_rate': self.draws / num_simulations,
+            'average_turns': self.turns.mean,
+            'avg_attacker_damage': self.attacker_damage.mean if self.attacker_wins else 0,
+            'avg_defender_damage': self.defender_damage.mean if self.defender_wins else 0,
+            'turns_min': self.turns.min,
+            'turns_max': self.turns.max,
+            'turns_variance': self.turns.variance,
+            'turns_std': math.sqrt(self.turns.variance),
+            'turns_p50': self.turns_sketch.quantile(0.50),
+            'turns_p90': self.turns_sketch.quantile(0.90),
+            'turns_p99': self.turns_sketch.quantile(0.99),
+            'attacker_damage_variance': self.attacker_damage.variance,
+            'defender_damage_variance': self.defender_damage.variance,
+        }
+
+
+class PairedComparison:
+    """
+    Mergeable aggregate for a baseline-vs-candidate run on common random numbers.
+
+    Besides one CombatAccumulator per config it tracks the per-unit paired
+    differences (a unit is one fight, or one antithetic fight pair), whose
+    variance gives the standard error of the delta directly.
+    """
+
+    def __init__(self, resolution: float = 1.0):
+        self.baseline = CombatAccumulator(resolution)
+        self.candidate = CombatAccumulator(resolution)
+        self.win_delta = RunningStats()
+        self.turns_delta = RunningStats()
+
+    def merge(self, other: 'PairedComparison') -> None:
+        """Merge another comparison into this one in place."""
+        self.baseline.merge(other.baseline)
+        self.candidate.merge(other.candidate)
+        self.win_delta.merge(other.win_delta)
+        self.turns_delta.merge(other.turns_delta)
+
+    def to_stats(self, confidence: float = 0.95) -> Dict[str, Any]:
+        """Baseline/candidate stats plus deltas (candidate - baseline) with intervals."""
+        z = z_score(confidence)
+        base = self.baseline.to_stats()
+        cand = self.candidate.to_stats()
+        # 1 for plain pairing, 2 when each unit averages an antithetic fight pair
+        fights_per_unit = self.baseline.simulations / max(self.win_delta.count, 1)
+
+        def delta(paired: RunningStats, base_var: float, cand_var: float) -> Dict[str, Any]:
+            std_error = math.sqrt(paired.variance / paired.count) if paired.count else 0.0
+            low, high = paired.mean - z * std_error, paired.mean + z * std_error
+            # Per-unit variance the same delta would have from two independent runs
+            independent = (base_var + cand_var) / fights_per_unit
+            return {
+                'estimate': paired.mean,
+                'ci': [low, high],
+                'std_error': std_error,
+                'significant': low > 0 or high < 0,
+                'variance_reduction_factor': (
+                    independent / paired.variance if paired.variance > 0 else None
+                ),
+            }
+
+        p_base = base['attacker_win_rate']
+        p_cand = cand['attacker_win_rate']
+
+        return {
+            'confidence': confidence,
+            'paired_units': self.win_delta.count,
+            'baseline': base,
+            'candidate': cand,
+            'delta': {
+                'attacker_win_rate': delta(
+                    self.win_delta, p_base * (1 - p_base), p_cand * (1 - p_cand)
+                ),
+                'average_turns': delta(
+                    self.turns_delta, base['turns_variance'], cand['turns_variance']
+                ),
+            },
+        }
+
+
+def effect_specs(stats: CombatStats, ability: Optional[Ability]) -> Tuple[Tuple, ...]:
+    """
+    Resolve an ability's status effects for a caster.
+
+    Returns:
+        One (kind, duration, value, chance, max_stacks, name) tuple per
+        effect; value is the dot damage per turn or the shield amount.
+        Certain, uncapped dots come first (they draw no random numbers, so
+        only the order of the others is observable).
+    """
+    if ability is None:
+        return ()
+    specs = [
+        (
+            EFFECT_KINDS[e.kind],
+            max(int(e.duration), 1),
+            stats.attack_power * e.damage_multiplier if e.kind == 'dot' else e.amount,
+            e.chance,
+            e.max_stacks,
+            e.name,
+        )
+        for e in ability.effects
+    ]
+    return tuple(sorted(specs, key=lambda spec: not _plain_dot(spec)))
+
+
+def _plain_dot(spec: Tuple) -> bool:
+    """True for an effect_specs() dot that always lands and has no stack cap."""
+    return spec[0] == EFFECT_DOT and spec[3] >= 1.0 and spec[4] is None
+
+
+def _linked(items: Iterable[Tuple]) -> Optional[Tuple]:
+    """
+    Chain tuples as item + (rest,), ending in None.
+
+    FightKernel walks these with ``while x is not None`` and an unpack, which
+    unlike a for loop allocates no iterator for each ability use.
+    """
+    chain = None
+    for item in reversed(list(items)):
+        chain = item + (chain,)
+    return chain
+
+
+class EffectTracker:
+    """
+    Status effects active in one fight: dot damage rates, stuns and shields.
+
+    Effects end through a hashed timer wheel: anything due at the end of
+    turn T is filed in slot T mod the wheel size, and each turn only that
+    slot is read. The wheel is larger than the longest duration, so a slot
+    only ever holds what is due this turn and no active effect is scanned.
+    Dot stacks on a side are summed into one damage-per-turn rate, and each
+    slot keeps the summed rate of the dots ending there, so ticking and
+    expiring cost the same with one stack or fifty. Shields and capped
+    (max_stacks) effects also leave a per-effect timer in the slot. Sides
+    are 0 (attacker) and 1 (defender).
+    """
+
+    __slots__ = (
+        'mask', 'due', 'dot_rate', 'dot_stacks', 'dot_expiry', 'dot_expiry_count',
+        'timers', 'stacks', 'shields', 'stun',
+    )
+
+    def __init__(self, max_duration: int):
+        """
+        Initialize tracker.
+
+        Args:
+            max_duration: Longest effect duration (sizes the wheel)
+        """
+        size = 8
+        while size <= max_duration:
+            size <<= 1
+        self.mask = size - 1
+        self.reset()
+
+    def reset(self) -> None:
+        """Clear all effects before a new fight."""
+        size = self.mask + 1
+        self.due = [0] * size
+        self.dot_rate = [0.0, 0.0]
+        self.dot_stacks = [0, 0]
+        self.dot_expiry = ([0.0] * size, [0.0] * size)
+        self.dot_expiry_count = ([0] * size, [0] * size)
+        self.timers: List[List[Tuple]] = [[] for _ in range(size)]
+        self.stacks: Dict[Tuple[int, str], int] = {}
+        self.shields: Tuple[List[List[float]], List[List[float]]] = ([], [])
+        self.stun = [0, 0]
+
+    def apply(self, spec: Tuple, source: int, turn: int) -> None:
+        """Land one effect_specs() entry cast by side ``source`` on this turn."""
+        kind, duration, value, _, max_stacks, name = spec
+        target = source if kind == EFFECT_SHIELD else 1 - source
+        if kind == EFFECT_STUN:
+            if duration > self.stun[target]:
+                self.stun[target] = duration
+            return
+
+        slot = (turn + duration - 1) & self.mask
+        stack_key = None
+        if max_stacks is not None:
+            stack_key = (target, name)
+            active = self.stacks.get(stack_key, 0)
+            if active >= max_stacks:
+                return
+            self.stacks[stack_key] = active + 1
+
+        if kind == EFFECT_DOT:
+            self.dot_rate[target] += value
+            self.dot_stacks[target] += 1
+            self.dot_expiry[target][slot] += value
+            self.dot_expiry_count[target][slot] += 1
+            if stack_key is not None:
+                self.timers[slot].append((EFFECT_DOT, target, None, stack_key))
+        else:
+            payload = [value]
+            self.shields[target].append(payload)
+            self.timers[slot].append((EFFECT_SHIELD, target, payload, stack_key))
+        self.due[slot] += 1
+
+    def absorb(self, side: int, damage: float) -> float:
+        """Damage left after ``side``'s shields (oldest first) soak it up."""
+        shields = self.shields[side]
+        while shields:
+            shield = shields[0]
+            if shield[0] > damage:
+                shield[0] -= damage
+                return 0.0
+            damage -= shield[0]
+            shield[0] = 0.0
+            shields.pop(0)
+        return damage
+
+    def expire(self, turn: int) -> None:
+        """End everything filed in this turn's slot."""
+        slot = turn & self.mask
+        self.due[slot] = 0
+        for target in (0, 1):
+            count = self.dot_expiry_count[target][slot]
+            if count:
+                self.dot_stacks[target] -= count
+                # Reset exactly when the last stack ends (no float residue)
+                if self.dot_stacks[target]:
+                    self.dot_rate[target] -= self.dot_expiry[target][slot]
+                else:
+                    self.dot_rate[target] = 0.0
+                self.dot_expiry[target][slot] = 0.0
+                self.dot_expiry_count[target][slot] = 0
+
+        if self.timers[slot]:
+            self.expire_timers(slot)
+
+    def expire_timers(self, slot: int) -> None:
+        """End the shields and capped stacks filed in a slot (part of expire())."""
+        timers = self.timers[slot]
+        self.timers[slot] = []
+        for kind, target, payload, stack_key in timers:
+            if stack_key is not None:
+                self.stacks[stack_key] -= 1
+            if kind == EFFECT_SHIELD and payload[0] > 0:
+                shields = self.shields[target]
+                for k, shield in enumerate(shields):
+                    if shield is payload:
+                        del shields[k]
+                        break
+
+    def end_turn(self, turn: int) -> Tuple[float, float]:
+        """
+        Tick dots and expire effects due at the end of ``turn``.
+
+        Returns:
+            Dot damage taken by (attacker, defender) after shields
+        """
+        ticks = [0.0, 0.0]
+        for side in (0, 1):
+            rate = self.dot_rate[side]
+            if rate:
+                ticks[side] = self.absorb(side, rate) if self.shields[side] else rate
+        if self.due[turn & self.mask]:
+            self.expire(turn)
+        return ticks[0], ticks[1]
+
+
+class FightKernel:
+    """
+    CombatSimulator.simulate_combat specialized for one configuration.
+
+    Everything that is fixed for a matchup is resolved once: the armor
+    formula is applied to every (ability, crit) damage value up front, the
+    available-ability list for each combination of abilities off cooldown is
+    a precomputed tuple indexed by a bitmask, and cooldowns are an integer
+    array of the turn each ability becomes ready again (so nothing is
+    decremented per turn). It draws from the RNG in exactly the same order
+    as the generic loop, so seeded results are unchanged.
+
+    The ability pick inlines random.choice, which is
+    seq[Random._randbelow_with_getrandbits(len(seq))]; ``supported`` is False
+    on interpreters where Random draws indices differently, and
+    CombatSimulator then keeps the generic loop.
+    """
+
+    supported = random.Random._randbelow is getattr(random.Random, '_randbelow_with_getrandbits', None)
+
+    __slots__ = (
+        'max_turns', 'health', 'dodge', 'critical_chance',
+        'damage', 'crit_damage', 'hit_chance', 'cooldown', 'options', 'clear',
+        'dots', 'effects', 'stack_keys', 'tracker',
+    )
+
+    def __init__(self, sim: 'CombatSimulator'):
+        """
+        Compile a simulator's configuration.
+
+        Args:
+            sim: Simulator to specialize (its stats, abilities and armor)
+        """
+        self.max_turns = sim.max_turns
+        self.health = []
+        self.dodge = []
+        self.critical_chance = []
+        self.damage = []
+        self.crit_damage = []
+        self.hit_chance = []
+        self.cooldown = []
+        self.options = []
+        self.clear = []
+        self.dots = []
+        self.effects = []
+        self.stack_keys: List[Tuple[int, str]] = []
+        durations = []
+        for stats, abilities in (
+            (sim.attacker_stats, sim.attacker_abilities),
+            (sim.defender_stats, sim.defender_abilities),
+        ):
+            hit = sim._apply_armor(stats.attack_power)
+            crit = sim._apply_armor(stats.attack_power * stats.critical_multiplier)
+            # Index -1 (the last entry) is the basic attack
+            multipliers = [a.damage_multiplier for a in abilities] + [1.0]
+            self.health.append(stats.health)
+            self.dodge.append(stats.dodge_chance)
+            self.critical_chance.append(stats.critical_chance)
+            self.damage.append(tuple(hit * m for m in multipliers))
+            self.crit_damage.append(tuple(crit * m for m in multipliers))
+            self.hit_chance.append(tuple(a.hit_chance for a in abilities))
+            # Used on turn t, an ability is ready again on turn t + max(cooldown, 1)
+            self.cooldown.append(tuple(max(a.cooldown, 1) for a in abilities))
+            # Per bitmask of ready abilities: (ability indices, count, bits to draw)
+            choices = [
+                tuple(i for i in range(len(abilities)) if mask >> i & 1)
+                for mask in range(1 << len(abilities))
+            ]
+            self.options.append(tuple((c, len(c), len(c).bit_length()) for c in choices))
+            self.clear.append(tuple(~(1 << i) for i in range(len(abilities))))
+            # Per ability: its plain dots as (longest duration - 1, _linked
+            # chain of (duration - 1, damage)), or None, and a _linked chain of
+            # (kind, chance, duration - 1, value, stack, max_stacks) per other
+            # effect, where stack indexes stack_keys ((target, name) as in
+            # EffectTracker) for capped effects
+            side = len(self.effects)
+            specs = [effect_specs(stats, a) for a in abilities]
+            dots = []
+            effects = []
+            for side_specs in specs:
+                plain = [(spec[1] - 1, spec[2]) for spec in side_specs if _plain_dot(spec)]
+                dots.append((max(extra for extra, _ in plain), _linked(plain)) if plain else None)
+                others = []
+                for spec in side_specs:
+                    if _plain_dot(spec):
+                        continue
+                    kind, duration, value, chance, max_stacks, name = spec
+                    stack = None
+                    if max_stacks is not None:
+                        key = (side if kind == EFFECT_SHIELD else 1 - side, name)
+                        if key not in self.stack_keys:
+                            self.stack_keys.append(key)
+                        stack = self.stack_keys.index(key)
+                    others.append((kind, chance, duration - 1, value, stack, max_stacks))
+                effects.append(_linked(others))
+            self.dots.append(tuple(dots) + (None,))
+            self.effects.append(tuple(effects) + (None,))
+            durations.extend(spec[1] for side_specs in specs for spec in side_specs)
+
+        self.tracker = EffectTracker(max(durations)) if durations else None
+
+    def run(self, rng: random.Random) -> Tuple[str, int, float, float]:
+        """
+        Simulate one fight.
+
+        Args:
+            rng: Random stream (consumed exactly like simulate_combat)
+
+        Returns:
+            Tuple of (winner, turns_taken, attacker_damage_dealt, defender_damage_dealt)
+        """
+        if self.tracker is not None:
+            return self._run_with_effects(rng)
+
+        random_ = rng.random
+        getrandbits = rng.getrandbits
+        max_turns = self.max_turns
+        attacker_hp, defender_hp = self.health
+        att_dodge, def_dodge = self.dodge
+        att_cc, def_cc = self.critical_chance
+        att_damage, def_damage = self.damage
+        att_crit_damage, def_crit_damage = self.crit_damage
+        att_hit, def_hit = self.hit_chance
+        att_cooldown, def_cooldown = self.cooldown
+        att_options, def_options = self.options
+        att_clear, def_clear = self.clear
+
+        att_count = len(att_cooldown)
+        def_count = len(def_cooldown)
+        att_mask = (1 << att_count) - 1
+        def_mask = (1 << def_count) - 1
+        att_ready = [0] * att_count
+        def_ready = [0] * def_count
+        never = max_turns + 1
+        att_next = def_next = never
+
+        attacker_damage_dealt = 0.0
+        defender_damage_dealt = 0.0
+        turns = 0
+
+        while attacker_hp > HP_EPSILON and defender_hp > HP_EPSILON and turns < max_turns:
+            turns += 1
+
+            # Attacker turn
+            if turns >= att_next:
+                att_next = never
+                for i in range(att_count):
+                    ready = att_ready[i]
+                    if ready:
+                        if ready <= turns:
+                            att_mask |= 1 << i
+                            att_ready[i] = 0
+                        elif ready < att_next:
+                            att_next = ready
+            options, count, bits = att_options[att_mask]
+            if count:
+                # random.choice(options), inlined (see class docstring)
+                r = getrandbits(bits)
+                while r >= count:
+                    r = getrandbits(bits)
+                i = options[r]
+            else:
+                i = -1
+            if random_() >= att_dodge and (i < 0 or random_() <= att_hit[i]):
+                damage = att_crit_damage[i] if random_() < att_cc else att_damage[i]
+                defender_hp -= damage
+                attacker_damage_dealt += damage
+                if i >= 0:
+                    ready = turns + att_cooldown[i]
+                    att_ready[i] = ready
+                    att_mask &= att_clear[i]
+                    if ready < att_next:
+                        att_next = ready
+
+            # Defender turn (its rolls are drawn even if it just died)
+            if turns >= def_next:
+                def_next = never
+                for i in range(def_count):
+                    ready = def_ready[i]
+                    if ready:
+                        if ready <= turns:
+                            def_mask |= 1 << i
+                            def_ready[i] = 0
+                        elif ready < def_next:
+                            def_next = ready
+            options, count, bits = def_options[def_mask]
+            if count:
+                # random.choice(options), inlined (see class docstring)
+                r = getrandbits(bits)
+                while r >= count:
+                    r = getrandbits(bits)
+                i = options[r]
+            else:
+                i = -1
+            if random_() >= def_dodge and (i < 0 or random_() <= def_hit[i]) and defender_hp > HP_EPSILON:
+                damage = def_crit_damage[i] if random_() < def_cc else def_damage[i]
+                attacker_hp -= damage
+                defender_damage_dealt += damage
+                if i >= 0:
+                    ready = turns + def_cooldown[i]
+                    def_ready[i] = ready
+                    def_mask &= def_clear[i]
+                    if ready < def_next:
+                        def_next = ready
+
+        if attacker_hp > HP_EPSILON:
+            winner = 'attacker'
+        elif defender_hp > HP_EPSILON:
+            winner = 'defender'
+        else:
+            winner = 'draw'
+
+        return winner, turns, attacker_damage_dealt, defender_damage_dealt
+
+    def _run_with_effects(self, rng: random.Random) -> Tuple[str, int, float, float]:
+        """
+        run() for configurations with status effects.
+
+        Plays by EffectTracker's rules with the per-turn state in locals:
+        stuns, dot rates and the turn each side's last dot stack ends (no
+        tick after it, and the next stack to land restarts the rate from
+        exactly 0, as when the tracker's stack count reaches 0), so turns with
+        nothing due cost a few comparisons.
+        Shields carry their end turn and are dropped when absorb reaches them
+        after it, which is when the tracker's removal would have shown; the
+        oldest one on each side is kept in locals.
+        Capped (max_stacks) effects keep the sorted end turns of their stacks
+        and only drop the finished ones when the cap is reached, so nothing is
+        counted down per turn.
+        """
+        random_ = rng.random
+        getrandbits = rng.getrandbits
+        epsilon = HP_EPSILON
+        stun_kind, dot_kind = EFFECT_STUN, EFFECT_DOT
+        max_turns = self.max_turns
+        attacker_hp, defender_hp = self.health
+        att_dodge, def_dodge = self.dodge
+        att_cc, def_cc = self.critical_chance
+        att_damage, def_damage = self.damage
+        att_crit_damage, def_crit_damage = self.crit_damage
+        att_hit, def_hit = self.hit_chance
+        att_cooldown, def_cooldown = self.cooldown
+        att_options, def_options = self.options
+        att_clear, def_clear = self.clear
+        att_dots, def_dots = self.dots
+        att_effects, def_effects = self.effects
+
+        mask = self.tracker.mask
+        att_expiry = [0.0] * (mask + 1)  # dot damage ending per wheel slot
+        def_expiry = [0.0] * (mask + 1)
+        stacks: List[List[int]] = [[] for _ in self.stack_keys]  # sorted end turns
+        att_shield = def_shield = 0.0  # oldest shield's amount and end turn
+        att_shield_end = def_shield_end = 0  # (0 when there is none)
+        att_shields: List[Tuple[float, int]] = []  # later (amount, end turn), oldest first
+        def_shields: List[Tuple[float, int]] = []
+        att_stun = def_stun = 0
+        att_rate = def_rate = 0.0
+        att_dot_end = def_dot_end = 0
+
+        att_count = len(att_cooldown)
+        def_count = len(def_cooldown)
+        att_mask = (1 << att_count) - 1
+        def_mask = (1 << def_count) - 1
+        att_ready = [0] * att_count
+        def_ready = [0] * def_count
+        never = max_turns + 1
+        att_next = def_next = never
+
+        attacker_damage_dealt = 0.0
+        defender_damage_dealt = 0.0
+        turns = 0
+
+        while attacker_hp > epsilon and defender_hp > epsilon and turns < max_turns:
+            turns += 1
+
+            # Attacker turn
+            if att_stun:
+                att_stun -= 1
+            else:
+                if turns >= att_next:
+                    att_next = never
+                    for i in range(att_count):
+                        ready = att_ready[i]
+                        if ready:
+                            if ready <= turns:
+                                att_mask |= 1 << i
+                                att_ready[i] = 0
+                            elif ready < att_next:
+                                att_next = ready
+                options, count, bits = att_options[att_mask]
+                if count:
+                    r = getrandbits(bits)
+                    while r >= count:
+                        r = getrandbits(bits)
+                    i = options[r]
+                else:
+                    i = -1
+                if random_() >= att_dodge and (i < 0 or random_() <= att_hit[i]):
+                    damage = att_crit_damage[i] if random_() < att_cc else att_damage[i]
+                    # EffectTracker.absorb, inlined (expired shields are dropped here)
+                    while def_shield_end:
+                        if def_shield_end >= turns or not def_shield > 0:
+                            if def_shield > damage:
+                                def_shield -= damage
+                                damage = 0.0
+                                break
+                            damage -= def_shield
+                        if def_shields:
+                            def_shield, def_shield_end = def_shields.pop(0)
+                        else:
+                            def_shield_end = 0
+                    defender_hp -= damage
+                    attacker_damage_dealt += damage
+                    if i >= 0:
+                        ready = turns + att_cooldown[i]
+                        att_ready[i] = ready
+                        att_mask &= att_clear[i]
+                        if ready < att_next:
+                            att_next = ready
+                        # EffectTracker.apply, inlined
+                        dot = att_dots[i]
+                        if dot is not None:
+                            end, dot = dot
+                            end += turns
+                            if end > def_dot_end:
+                                if turns > def_dot_end:
+                                    def_rate = 0.0
+                                def_dot_end = end
+                            while dot is not None:
+                                extra_turns, value, dot = dot
+                                def_expiry[(turns + extra_turns) & mask] += value
+                                def_rate += value
+                        effect = att_effects[i]
+                        while effect is not None:
+                            kind, chance, extra_turns, value, stack, max_stacks, effect = effect
+                            if chance < 1.0 and random_() >= chance:
+                                continue
+                            if kind == stun_kind:
+                                if extra_turns >= def_stun:
+                                    def_stun = extra_turns + 1
+                                continue
+                            end = turns + extra_turns
+                            if stack is not None:
+                                ends = stacks[stack]
+                                if len(ends) >= max_stacks:
+                                    # At the cap unless the oldest stacks have ended
+                                    if not ends or ends[0] >= turns:
+                                        continue
+                                    del ends[0]
+                                    while ends and ends[0] < turns:
+                                        del ends[0]
+                                    if len(ends) >= max_stacks:
+                                        continue
+                                insort(ends, end)
+                            if kind == dot_kind:
+                                if end > def_dot_end:
+                                    if turns > def_dot_end:
+                                        def_rate = 0.0
+                                    def_dot_end = end
+                                def_expiry[end & mask] += value
+                                def_rate += value
+                            elif att_shield_end:
+                                att_shields.append((value, end))
+                            else:
+                                att_shield = value
+                                att_shield_end = end
+
+            # Defender turn (its rolls are drawn even if it just died)
+            if def_stun:
+                def_stun -= 1
+            else:
+                if turns >= def_next:
+                    def_next = never
+                    for i in range(def_count):
+                        ready = def_ready[i]
+                        if ready:
+                            if ready <= turns:
+                                def_mask |= 1 << i
+                                def_ready[i] = 0
+                            elif ready < def_next:
+                                def_next = ready
+                options, count, bits = def_options[def_mask]
+                if count:
+                    r = getrandbits(bits)
+                    while r >= count:
+                        r = getrandbits(bits)
+                    i = options[r]
+                else:
+                    i = -1
+                if random_() >= def_dodge and (i < 0 or random_() <= def_hit[i]) and defender_hp > epsilon:
+                    damage = def_crit_damage[i] if random_() < def_cc else def_damage[i]
+                    while att_shield_end:
+                        if att_shield_end >= turns or not att_shield > 0:
+                            if att_shield > damage:
+                                att_shield -= damage
+                                damage = 0.0
+                                break
+                            damage -= att_shield
+                        if att_shields:
+                            att_shield, att_shield_end = att_shields.pop(0)
+                        else:
+                            att_shield_end = 0
+                    attacker_hp -= damage
+                    defender_damage_dealt += damage
+                    if i >= 0:
+                        ready = turns + def_cooldown[i]
+                        def_ready[i] = ready
+                        def_mask &= def_clear[i]
+                        if ready < def_next:
+                            def_next = ready
+                        dot = def_dots[i]
+                        if dot is not None:
+                            end, dot = dot
+                            end += turns
+                            if end > att_dot_end:
+                                if turns > att_dot_end:
+                                    att_rate = 0.0
+                                att_dot_end = end
+                            while dot is not None:
+                                extra_turns, value, dot = dot
+                                att_expiry[(turns + extra_turns) & mask] += value
+                                att_rate += value
+                        effect = def_effects[i]
+                        while effect is not None:
+                            kind, chance, extra_turns, value, stack, max_stacks, effect = effect
+                            if chance < 1.0 and random_() >= chance:
+                                continue
+                            if kind == stun_kind:
+                                if extra_turns >= att_stun:
+                                    att_stun = extra_turns + 1
+                                continue
+                            end = turns + extra_turns
+                            if stack is not None:
+                                ends = stacks[stack]
+                                if len(ends) >= max_stacks:
+                                    # At the cap unless the oldest stacks have ended
+                                    if not ends or ends[0] >= turns:
+                                        continue
+                                    del ends[0]
+                                    while ends and ends[0] < turns:
+                                        del ends[0]
+                                    if len(ends) >= max_stacks:
+                                        continue
+                                insort(ends, end)
+                            if kind == dot_kind:
+                                if end > att_dot_end:
+                                    if turns > att_dot_end:
+                                        att_rate = 0.0
+                                    att_dot_end = end
+                                att_expiry[end & mask] += value
+                                att_rate += value
+                            elif def_shield_end:
+                                def_shields.append((value, end))
+                            else:
+                                def_shield = value
+                                def_shield_end = end
+
+            # Dots tick on living targets, then what is due expires
+            # (EffectTracker.end_turn, inlined). A side only ticks and
+            # expires while a stack is pending, so one comparison skips both; the
+            # sides are independent, so each ticks and expires in turn
+            if turns <= att_dot_end:
+                if att_shield_end:
+                    if att_rate:
+                        tick = att_rate
+                        while att_shield_end:
+                            if att_shield_end >= turns or not att_shield > 0:
+                                if att_shield > tick:
+                                    att_shield -= tick
+                                    tick = 0.0
+                                    break
+                                tick -= att_shield
+                            if att_shields:
+                                att_shield, att_shield_end = att_shields.pop(0)
+                            else:
+                                att_shield_end = 0
+                        if tick and attacker_hp > epsilon:
+                            attacker_hp -= tick
+                            defender_damage_dealt += tick
+                elif attacker_hp > epsilon:
+                    attacker_hp -= att_rate
+                    defender_damage_dealt += att_rate
+                value = att_expiry[turns & mask]
+                if value:
+                    att_expiry[turns & mask] = 0.0
+                    att_rate -= value
+            if turns <= def_dot_end:
+                if def_shield_end:
+                    if def_rate:
+                        tick = def_rate
+                        while def_shield_end:
+                            if def_shield_end >= turns or not def_shield > 0:
+                                if def_shield > tick:
+                                    def_shield -= tick
+                                    tick = 0.0
+                                    break
+                                tick -= def_shield
+                            if def_shields:
+                                def_shield, def_shield_end = def_shields.pop(0)
+                            else:
+                                def_shield_end = 0
+                        if tick and defender_hp > epsilon:
+                            defender_hp -= tick
+                            attacker_damage_dealt += tick
+                elif defender_hp > epsilon:
+                    defender_hp -= def_rate
+                    attacker_damage_dealt += def_rate
+                value = def_expiry[turns & mask]
+                if value:
+                    def_expiry[turns & mask] = 0.0
+                    def_rate -= value
+
+        if attacker_hp > epsilon:
+            winner = 'attacker'
+        elif defender_hp > epsilon:
+            winner = 'defender'
+        else:
+            winner = 'draw'
+
+        return winner, turns, attacker_damage_dealt, defender_damage_dealt
 
 
 class CombatSimulator:
     """Simulates combat encounters."""
 
+    # Quantile sketch bucket width for fight length (turns are integers)
+    time_resolution = 1.0
+
+    # Untraced fights run on the compiled FightKernel; subclasses that
+    # override the roll methods must set this to False
+    use_kernel = True
+
     def __init__(
         self,
         attacker_stats: CombatStats,
@@ -47,7 +1217,8 @@ class CombatSimulator:
         defender_abilities: List[Ability] = None,
         armor_formula: str = 'flat',
         armor_value: float = 0.0,
-        max_turns: int = 1000
+        max_turns: int = 1000,
+        seed: Optional[int] = None,
     ):
         """
         Initialize combat simulator.
@@ -60,6 +1231,7 @@ class CombatSimulator:
             armor_formula: 'flat' (reduction) or 'percent' (reduction)
             armor_value: Armor damage reduction value
             max_turns: Maximum turns before combat ends (draw)
+            seed: Random seed for reproducible runs (None = unseeded)
         """
         self.attacker_stats = attacker_stats
         self.defender_stats = defender_stats
@@ -68,6 +1240,27 @@ class CombatSimulator:
         self.armor_formula = armor_formula
         self.armor_value = armor_value
         self.max_turns = max_turns
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.has_effects = any(a.effects for a in self.attacker_abilities + self.defender_abilities)
+        self._kernel: Optional[FightKernel] = None
+
+    def compile(self) -> FightKernel:
+        """
+        Specialized fight kernel for this configuration (built once, then reused).
+
+        The kernel snapshots stats, abilities and armor; call recompile()
+        after changing any of them on an existing simulator.
+        """
+        if self._kernel is None:
+            self._kernel = FightKernel(self)
+        return self._kernel
+
+    def recompile(self) -> FightKernel:
+        """Drop the cached kernel and build one from the current stats, abilities and armor."""
+        self.has_effects = any(a.effects for a in self.attacker_abilities + self.defender_abilities)
+        self._kernel = None
+        return self.compile()
 
     def calculate_damage(self, attacker: CombatStats, defender: CombatStats) -> float:
         """
@@ -80,21 +1273,28 @@ class CombatSimulator:
         Returns:
             Damage dealt after armor
         """
+        return self.roll_damage(attacker, defender)[0]
+
+    def roll_damage(self, attacker: CombatStats, defender: CombatStats) -> Tuple[float, bool]:
+        """
+        Roll crit and calculate damage with armor reduction.
+
+        Args:
+            attacker: Attacking combatant
+            defender: Defending combatant
+
+        Returns:
+            Tuple of (damage after armor, whether it was a critical hit)
+        """
         base_damage = attacker.attack_power
 
         # Check critical hit
-        if random.random() < attacker.critical_chance:
+        crit = self.rng.random() < attacker.critical_chance
+        if crit:
             base_damage *= attacker.critical_multiplier
 
         # Apply armor
-        if self.armor_formula == 'flat':
-            damage = max(1, base_damage - self.armor_value)
-        elif self.armor_formula == 'percent':
-            damage = base_damage * (1 - self.armor_value / 100)
-        else:
-            damage = base_damage
-
-        return damage
+        return self._apply_armor(base_damage), crit
 
     def can_hit(self, combatant: CombatStats, ability: Ability = None) -> bool:
         """
@@ -107,15 +1307,28 @@ class CombatSimulator:
         Returns:
             True if attack hits
         """
+        return self.roll_hit(combatant, ability) == OUTCOME_HIT
+
+    def roll_hit(self, combatant: CombatStats, ability: Ability = None) -> int:
+        """
+        Roll dodge and ability hit chance.
+
+        Args:
+            combatant: Attacking combatant
+            ability: Optional ability being used
+
+        Returns:
+            OUTCOME_HIT, OUTCOME_DODGED or OUTCOME_MISSED
+        """
         # Check dodge
-        if random.random() < combatant.dodge_chance:
-            return False
+        if self.rng.random() < combatant.dodge_chance:
+            return OUTCOME_DODGED
 
         # Check ability hit chance
-        if ability and random.random() > ability.hit_chance:
-            return False
+        if ability and self.rng.random() > ability.hit_chance:
+            return OUTCOME_MISSED
 
-        return True
+        return OUTCOME_HIT
 
     def get_next_action(
         self,
@@ -134,54 +1347,86 @@ class CombatSimulator:
         """
         available = [a for a in abilities if cooldowns.get(a.name, 0) <= 0]
         if available:
-            return random.choice(available)
+            return self.rng.choice(available)
         return None
 
-    def simulate_combat(self) -> Tuple[str, int, float, float]:
+    def simulate_combat(self, trace: Optional[List[Tuple]] = None) -> Tuple[str, int, float, float]:
         """
         Simulate a single combat encounter.
 
+        Args:
+            trace: Optional list that receives one TRACE_RECORD-shaped tuple per
+                   turn (turn, HPs, abilities used, hit outcomes, crits, damage)
+
         Returns:
             Tuple of (winner, turns_taken, attacker_damage_dealt, defender_damage_dealt)
         """
+        if trace is None and self.use_kernel and FightKernel.supported:
+            return self.compile().run(self.rng)
+
         attacker_hp = self.attacker_stats.health
         defender_hp = self.defender_stats.health
 
         attacker_cooldowns = {a.name: 0 for a in self.attacker_abilities}
         defender_cooldowns = {a.name: 0 for a in self.defender_abilities}
+        effects = self.compile().tracker if self.has_effects else None
+        if effects is not None:
+            effects.reset()
 
         attacker_damage_dealt = 0.0
         defender_damage_dealt = 0.0
         turns = 0
 
-        while attacker_hp > 0 and defender_hp > 0 and turns < self.max_turns:
+        while attacker_hp > HP_EPSILON and defender_hp > HP_EPSILON and turns < self.max_turns:
             turns += 1
+            att_damage = def_damage = 0.0
+            att_crit = def_crit = False
 
             # Attacker turn
-            ability = self.get_next_action(self.attacker_abilities, attacker_cooldowns)
-            if self.can_hit(self.attacker_stats, ability):
-                damage_multiplier = ability.damage_multiplier if ability else 1.0
-                damage = self.calculate_damage(self.attacker_stats, self.defender_stats)
-                damage *= damage_multiplier
-                defender_hp -= damage
-                attacker_damage_dealt += damage
+            if effects is not None and effects.stun[0]:
+                effects.stun[0] -= 1
+                att_ability, att_outcome = None, OUTCOME_NO_ACTION
+            else:
+                att_ability = self.get_next_action(self.attacker_abilities, attacker_cooldowns)
+                att_outcome = self.roll_hit(self.attacker_stats, att_ability)
+            if att_outcome == OUTCOME_HIT:
+                damage_multiplier = att_ability.damage_multiplier if att_ability else 1.0
+                att_damage, att_crit = self.roll_damage(self.attacker_stats, self.defender_stats)
+                att_damage *= damage_multiplier
+                if effects is not None:
+                    att_damage = effects.absorb(1, att_damage)
+                defender_hp -= att_damage
+                attacker_damage_dealt += att_damage
 
                 # Set cooldown
-                if ability:
-                    attacker_cooldowns[ability.name] = ability.cooldown
+                if att_ability:
+                    attacker_cooldowns[att_ability.name] = att_ability.cooldown
+                if effects is not None:
+                    self._land_effects(effects, 0, att_ability, turns)
 
             # Defender turn
-            ability = self.get_next_action(self.defender_abilities, defender_cooldowns)
-            if self.can_hit(self.defender_stats, ability) and defender_hp > 0:
-                damage_multiplier = ability.damage_multiplier if ability else 1.0
-                damage = self.calculate_damage(self.defender_stats, self.attacker_stats)
-                damage *= damage_multiplier
-                attacker_hp -= damage
-                defender_damage_dealt += damage
+            if effects is not None and effects.stun[1]:
+                effects.stun[1] -= 1
+                def_ability, def_outcome = None, OUTCOME_NO_ACTION
+            else:
+                def_ability = self.get_next_action(self.defender_abilities, defender_cooldowns)
+                def_outcome = self.roll_hit(self.defender_stats, def_ability)
+                if defender_hp <= HP_EPSILON:
+                    def_outcome = OUTCOME_NO_ACTION
+            if def_outcome == OUTCOME_HIT:
+                damage_multiplier = def_ability.damage_multiplier if def_ability else 1.0
+                def_damage, def_crit = self.roll_damage(self.defender_stats, self.attacker_stats)
+                def_damage *= damage_multiplier
+                if effects is not None:
+                    def_damage = effects.absorb(0, def_damage)
+                attacker_hp -= def_damage
+                defender_damage_dealt += def_damage
 
                 # Set cooldown
-                if ability:
-                    defender_cooldowns[ability.name] = ability.cooldown
+                if def_ability:
+                    defender_cooldowns[def_ability.name] = def_ability.cooldown
+                if effects is not None:
+                    self._land_effects(effects, 1, def_ability, turns)
 
             # Decrease cooldowns
             for key in attacker_cooldowns:
@@ -192,161 +1437,2683 @@ class CombatSimulator:
                 if defender_cooldowns[key] > 0:
                     defender_cooldowns[key] -= 1
 
+            # Dots tick on living targets, then due effects expire
+            if effects is not None:
+                att_tick, def_tick = effects.end_turn(turns)
+                if att_tick and attacker_hp > HP_EPSILON:
+                    attacker_hp -= att_tick
+                    defender_damage_dealt += att_tick
+                if def_tick and defender_hp > HP_EPSILON:
+                    defender_hp -= def_tick
+                    attacker_damage_dealt += def_tick
+
+            if trace is not None:
+                trace.append((
+                    turns, attacker_hp, defender_hp,
+                    self.attacker_abilities.index(att_ability) if att_ability else -1,
+                    att_outcome, att_crit, att_damage,
+                    self.defender_abilities.index(def_ability) if def_ability else -1,
+                    def_outcome, def_crit, def_damage,
+                ))
+
         # Determine winner
-        if attacker_hp > 0:
+        if attacker_hp > HP_EPSILON:
             winner = 'attacker'
-        elif defender_hp > 0:
+        elif defender_hp > HP_EPSILON:
             winner = 'defender'
         else:
             winner = 'draw'
 
         return winner, turns, attacker_damage_dealt, defender_damage_dealt
 
-    def run_simulations(self, num_simulations: int) -> Dict[str, Any]:
+    def _land_effects(self, effects: EffectTracker, source: int, ability: Optional[Ability], turn: int) -> None:
+        """Roll and apply the status effects of a hit by side ``source`` (0 = attacker)."""
+        stats = self.attacker_stats if source == 0 else self.defender_stats
+        for spec in effect_specs(stats, ability):
+            if spec[3] >= 1.0 or self.rng.random() < spec[3]:
+                effects.apply(spec, source, turn)
+
+    def _apply_armor(self, base_damage: float) -> float:
+        """Apply the configured armor formula to a raw damage value."""
+        return apply_armor(base_damage, self.armor_formula, self.armor_value)
+
+    def _ability_arrays(self, abilities: List[Ability]) -> Tuple[Any, Any, Any]:
+        """Pack abilities into (cooldown, damage_multiplier, hit_chance) arrays."""
+        return (
+            np.array([a.cooldown for a in abilities], dtype=np.int32),
+            np.array([a.damage_multiplier for a in abilities], dtype=np.float64),
+            np.array([a.hit_chance for a in abilities], dtype=np.float64),
+        )
+
+    @staticmethod
+    def _pick_abilities(cooldowns: Any, rolls: Any) -> Any:
         """
-        Run multiple combat simulations.
+        Vectorized get_next_action: pick uniformly among off-cooldown abilities.
 
         Args:
-            num_simulations: Number of simulations to run
+            cooldowns: (fights, abilities) cooldown timers
+            rolls: Uniform [0, 1) roll per fight
 
         Returns:
-            Dictionary with aggregated statistics
+            Ability index per fight, or -1 for a basic attack
         """
-        results = {
-            'attacker_wins': 0,
-            'defender_wins': 0,
-            'draws': 0,
-            'total_turns': [],
-            'attacker_damage': [],
-            'defender_damage': [],
-        }
+        if cooldowns.shape[1] == 0:
+            return np.full(cooldowns.shape[0], -1, dtype=np.int64)
+        available = cooldowns <= 0
+        counts = available.sum(axis=1)
+        # The k-th available ability is the first column whose running count exceeds k
+        kth = (rolls * counts).astype(np.int64)
+        picks = np.argmax(np.cumsum(available, axis=1) > kth[:, None], axis=1)
+        return np.where(counts > 0, picks, -1)
 
-        for _ in range(num_simulations):
-            winner, turns, att_dmg, def_dmg = self.simulate_combat()
+    def _batch_attack(
+        self,
+        actor: CombatStats,
+        abilities: Tuple[Any, Any, Any],
+        cooldowns: Any,
+        rolls: Any,
+        can_act: Any,
+    ) -> Any:
+        """
+        Resolve one side's attack for every active fight.
 
-            if winner == 'attacker':
-                results['attacker_wins'] += 1
-                results['attacker_damage'].append(att_dmg)
-            elif winner == 'defender':
-                results['defender_wins'] += 1
-                results['defender_damage'].append(def_dmg)
-            else:
-                results['draws'] += 1
+        Mirrors get_next_action + can_hit + calculate_damage, including putting
+        an ability on cooldown only when it lands.
 
-            results['total_turns'].append(turns)
+        Args:
+            actor: Acting combatant's stats
+            abilities: Packed ability arrays from _ability_arrays
+            cooldowns: (fights, abilities) cooldown timers, updated in place
+            rolls: (4, fights) uniform rolls for pick, dodge, hit and crit
+            can_act: Boolean mask of fights where this side may act
 
-        # Calculate statistics
-        stats = {
-            'simulations': num_simulations,
-            'attacker_win_rate': results['attacker_wins'] / num_simulations,
-            'defender_win_rate': results['defender_wins'] / num_simulations,
-            'draw_rate': results['draws'] / num_simulations,
-            'average_turns': sum(results['total_turns']) / len(results['total_turns']),
-            'avg_attacker_damage': (
-                sum(results['attacker_damage']) / len(results['attacker_damage'])
-                if results['attacker_damage'] else 0
-            ),
-            'avg_defender_damage': (
-                sum(results['defender_damage']) / len(results['defender_damage'])
-                if results['defender_damage'] else 0
-            ),
-            'turns_min': min(results['total_turns']),
-            'turns_max': max(results['total_turns']),
-        }
+        Returns:
+            Damage dealt per fight (0 where the attack missed)
+        """
+        cd_values, multipliers, hit_chances = abilities
+        picks = self._pick_abilities(cooldowns, rolls[0])
+        used = picks >= 0
+        safe = np.where(used, picks, 0)
 
-        return stats
+        hit = can_act & (rolls[1] >= actor.dodge_chance)
+        if len(multipliers):
+            hit &= ~used | (rolls[2] <= hit_chances[safe])
+            multiplier = np.where(used, multipliers[safe], 1.0)
+        else:
+            multiplier = 1.0
 
+        normal = self._apply_armor(actor.attack_power)
+        crit = self._apply_armor(actor.attack_power * actor.critical_multiplier)
+        damage = np.where(rolls[3] < actor.critical_chance, crit, normal) * multiplier
+        damage = np.where(hit, damage, 0.0)
 
-def load_config(config_path: Path) -> Dict[str, Any]:
-    """Load combat configuration from JSON."""
-    with open(config_path, 'r') as f:
-        return json.load(f)
+        landed = np.nonzero(hit & used)[0]
+        if len(landed):
+            cooldowns[landed, picks[landed]] = cd_values[picks[landed]]
+        return damage
 
+    def simulate_batch(
+        self,
+        num_fights: int,
+        rng: Any = None,
+        aligned: bool = False,
+        antithetic: bool = False,
+    ) -> Tuple[Any, Any, Any, Any]:
+        """
+        Simulate many combat encounters at once with NumPy.
 
-def main():
+        All fights advance in lockstep, one turn per iteration, so every active
+        fight is on the same turn number. Finished fights are compacted out of
+        the working arrays so late turns only touch the long-running tail.
+
+        With ``aligned`` every turn draws rolls for the whole batch and indexes
+        them by fight, so roll (turn t, fight k) is the same number for any
+        simulator fed the same generator state: common random numbers for
+        paired comparisons. ``antithetic`` (implies aligned) mirrors the rolls
+        of fight k into fight k + num_fights // 2 as 1 - u.
+
+        Args:
+            num_fights: Number of fights in the batch (even with antithetic)
+            rng: numpy.random.Generator (a fresh unseeded one if omitted)
+            aligned: Key rolls by (turn, fight) instead of by active slot
+            antithetic: Pair fight k with fight k + num_fights // 2 on 1 - u rolls
+
+        Returns:
+            Tuple of arrays (winner_codes, turns, attacker_damage_dealt,
+            defender_damage_dealt), one entry per fight
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for the batch engine")
+        rng = rng if rng is not None else np.random.default_rng()
+
+        att_abilities = self._ability_arrays(self.attacker_abilities)
+        def_abilities = self._ability_arrays(self.defender_abilities)
+
+        winners = np.zeros(num_fights, dtype=np.int8)
+        turns_out = np.zeros(num_fights, dtype=np.int32)
+        att_dealt_out = np.zeros(num_fights, dtype=np.float64)
+        def_dealt_out = np.zeros(num_fights, dtype=np.float64)
+
+        # Working state for fights still in progress
+        ids = np.arange(num_fights)
+        att_hp = np.full(num_fights, float(self.attacker_stats.health))
+        def_hp = np.full(num_fights, float(self.defender_stats.health))
+        att_cd = np.zeros((num_fights, len(self.attacker_abilities)), dtype=np.int32)
+        def_cd = np.zeros((num_fights, len(self.defender_abilities)), dtype=np.int32)
+        att_dealt = np.zeros(num_fights)
+        def_dealt = np.zeros(num_fights)
+
+        turn = 0
+        done = (att_hp <= HP_EPSILON) | (def_hp <= HP_EPSILON) | (self.max_turns <= 0)
+        while True:
+            if done.any():
+                # Retire finished fights and compact the working arrays
+                done_ids = ids[done]
+                winners[done_ids] = np.where(
+                    att_hp[done] > HP_EPSILON, WINNER_ATTACKER,
+                    np.where(def_hp[done] > HP_EPSILON, WINNER_DEFENDER, WINNER_DRAW),
+                )
+                turns_out[done_ids] = turn
+                att_dealt_out[done_ids] = att_dealt[done]
+                def_dealt_out[done_ids] = def_dealt[done]
+
+                keep = ~done
+                ids, att_hp, def_hp = ids[keep], att_hp[keep], def_hp[keep]
+                att_cd, def_cd = att_cd[keep], def_cd[keep]
+                att_dealt, def_dealt = att_dealt[keep], def_dealt[keep]
+
+            if not len(ids):
+                break
+
+            turn += 1
+            if antithetic:
+                half = rng.random((8, num_fights // 2))
+                rolls = np.concatenate((half, 1.0 - half), axis=1)[:, ids]
+            elif aligned:
+                rolls = rng.random((8, num_fights))[:, ids]
+            else:
+                rolls = rng.random((8, len(ids)))
+
+            # Attacker turn
+            damage = self._batch_attack(
+                self.attacker_stats, att_abilities, att_cd, rolls[:4], True
+            )
+            def_hp -= damage
+            att_dealt += damage
+
+            # Defender turn
+            damage = self._batch_attack(
+                self.defender_stats, def_abilities, def_cd, rolls[4:], def_hp > HP_EPSILON
+            )
+            att_hp -= damage
+            def_dealt += damage
+
+            # Decrease cooldowns
+            np.subtract(att_cd, 1, out=att_cd, where=att_cd > 0)
+            np.subtract(def_cd, 1, out=def_cd, where=def_cd > 0)
+
+            done = (att_hp <= HP_EPSILON) | (def_hp <= HP_EPSILON)
+            if turn >= self.max_turns:
+                done[:] = True
+
+        return winners, turns_out, att_dealt_out, def_dealt_out
+
+    def run_simulations(
+        self,
+        num_simulations: int,
+        engine: str = 'auto',
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: int = 1,
+        checkpoint: Optional[Path] = None,
+        checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+        resume: bool = False,
+        progress: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Run multiple combat simulations.
+
+        Fights are split into batches of ``batch_size``. Batch k draws from its
+        own RNG stream derived from (seed, k), and batch accumulators are merged in
+        batch order, so a seeded run returns exactly the same stats whether it
+        runs in one process or is sharded across ``workers`` processes.
+
+        The same property makes long runs resumable: with ``checkpoint`` the
+        merged accumulator, base seed and next batch index are saved every
+        ``checkpoint_interval`` seconds (and on interruption), and ``resume``
+        continues from the saved batch with a result identical to an
+        uninterrupted run. The file is removed when the run completes.
+
+        Args:
+            num_simulations: Number of simulations to run
+            engine: 'python' (one fight at a time), 'numpy' (batched arrays),
+                    or 'auto' (numpy when available)
+            batch_size: Fights per batch (RNG stream and work unit)
+            workers: Number of worker processes (1 = run in this process)
+            checkpoint: Checkpoint file path (None = no checkpointing)
+            checkpoint_interval: Minimum seconds between checkpoint saves
+            resume: Continue from ``checkpoint`` if it exists
+            progress: Show a progress/ETA line on stderr
+
+        Returns:
+            Dictionary with aggregated statistics
+        """
+        engine = self._resolve_engine(engine)
+        accumulator = CombatAccumulator(self.time_resolution)
+        base_seed = None
+        next_index = 0
+
+        saver = None
+        if checkpoint is not None:
+            saver = RunCheckpoint(
+                checkpoint, self._run_identity(engine, num_simulations, batch_size), checkpoint_interval
+            )
+            restored = saver.load() if resume else None
+            if restored is not None:
+                base_seed, next_index, accumulator = restored
+        if base_seed is None:
+            base_seed = self._base_seed()
+        tasks = self._batch_tasks(engine, base_seed, 0, num_simulations, batch_size)[next_index:]
+
+        meter = ProgressMeter(num_simulations, accumulator.simulations) if progress else None
+
+        def on_merge(index: int) -> None:
+            nonlocal next_index
+            next_index = index + 1
+            if meter is not None:
+                meter.update(accumulator.simulations)
+            if saver is not None and saver.due():
+                saver.save(base_seed, next_index, accumulator)
+
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and len(tasks) > 1 else None
+        try:
+            _run_tasks(tasks, accumulator, pool, on_merge)
+        except BaseException:
+            # Pre-empted (Ctrl-C, SIGTERM via SystemExit): keep what was merged
+            if saver is not None:
+                saver.save(base_seed, next_index, accumulator)
+            raise
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            if meter is not None:
+                meter.finish(accumulator.simulations)
+
+        if saver is not None:
+            saver.remove()
+        return self._annotate_stats(accumulator.to_stats())
+
+    def run_until_precision(
+        self,
+        target_width: float,
+        max_simulations: int = DEFAULT_MAX_ADAPTIVE_SIMULATIONS,
+        confidence: float = 0.95,
+        turns_target_width: Optional[float] = None,
+        engine: str = 'auto',
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        workers: int = 1,
+        pilot_batch: int = DEFAULT_PILOT_BATCH,
+    ) -> Dict[str, Any]:
+        """
+        Run simulations in rounds until the estimates are precise enough.
+
+        A pilot round measures the variance; each following round is sized from
+        the 1/sqrt(n) shrinkage of the interval so lopsided matchups stop after
+        a few thousand fights while close ones get the samples they need.
+
+        Args:
+            target_width: Required full width of the attacker_win_rate interval
+            max_simulations: Fight budget; stops here even if not converged
+            confidence: Confidence level of the intervals (e.g. 0.95)
+            turns_target_width: Optional required width of the average_turns interval
+            engine: 'python', 'numpy' or 'auto'
+            batch_size: Fights per batch (RNG stream and work unit)
+            workers: Number of worker processes (1 = run in this process)
+            pilot_batch: Fights in the first round
+
+        Returns:
+            run_simulations stats plus the achieved intervals
+
+        Raises:
+            ValueError: If a target width is not positive
+        """
+        if target_width <= 0 or (turns_target_width is not None and turns_target_width <= 0):
+            raise ValueError("Target interval widths must be positive")
+        engine = self._resolve_engine(engine)
+        base_seed = self._base_seed()
+        z = z_score(confidence)
+
+        accumulator = CombatAccumulator(self.time_resolution)
+        pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        next_index = 0
+        round_size = min(pilot_batch, max_simulations)
+        try:
+            while True:
+                tasks = self._batch_tasks(engine, base_seed, next_index, round_size, batch_size)
+                next_index += len(tasks)
+                _run_tasks(tasks, accumulator, pool)
+
+                win_low, win_high = accumulator.win_rate_interval(z)
+                turns_low, turns_high = accumulator.turns_interval(z)
+                ratios = [(win_high - win_low) / target_width]
+                if turns_target_width:
+                    ratios.append((turns_high - turns_low) / turns_target_width)
+                worst = max(ratios)
+
+                done = accumulator.simulations
+                if worst <= 1.0 or done >= max_simulations:
+                    break
+
+                # Interval width shrinks as 1/sqrt(n); aim 10% past the estimate
+                needed = math.ceil(done * worst * worst * 1.1) - done
+                round_size = min(max(pilot_batch, needed), max_simulations - done)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        stats = accumulator.to_stats()
+        stats.update({
+            'confidence': confidence,
+            'target_ci_width': target_width,
+            'attacker_win_rate_ci': [win_low, win_high],
+            'attacker_win_rate_ci_width': win_high - win_low,
+            'average_turns_ci': [turns_low, turns_high],
+            'average_turns_ci_width': turns_high - turns_low,
+            'target_ci_reached': worst <= 1.0,
+        })
+        if turns_target_width:
+            stats['target_turns_ci_width'] = turns_target_width
+
+        return self._annotate_stats(stats)
+
+    def solve_exact(self, max_states: int = DEFAULT_EXACT_MAX_STATES) -> Dict[str, Any]:
+        """
+        Compute the outcome distribution exactly instead of sampling it.
+
+        Each side's damage output depends only on its own rolls (ability pick,
+        dodge, hit chance, crit) and cooldowns, so the two sides are solved as
+        independent Markov chains over (target HP, cooldown state). Combining
+        their kill-time distributions gives the exact win/draw probabilities
+        and the full turn (TTK) distribution of simulate_combat().
+
+        Args:
+            max_states: Live states allowed per side before giving up
+
+        Returns:
+            Stats dictionary with the same keys as run_simulations(), plus
+            'ttk_distribution' and 'truncated_probability'
+
+        Raises:
+            ValueError: If a side exceeds max_states, or status effects couple
+                        the two sides (use Monte Carlo instead)
+        """
+        if self.has_effects:
+            raise ValueError("Exact solver does not support status effects")
+        att_health = self.attacker_stats.health
+        def_health = self.defender_stats.health
+        max_turns = max(self.max_turns, 0)
+
+        if att_health <= HP_EPSILON or def_health <= HP_EPSILON or max_turns == 0:
+            # The fight loop never runs; simulate_combat is deterministic here
+            winner, _, _, _ = self.simulate_combat()
+            return self._exact_stats(
+                {winner: 1.0}, {0: 1.0}, (0.0, 0.0), (0.0, 0.0), 0.0, 0
+            )
+
+        att = self._kill_time_distribution(
+            self.attacker_stats, self.attacker_abilities, def_health, max_states
+        )
+        dfd = self._kill_time_distribution(
+            self.defender_stats, self.defender_abilities, att_health, max_states
+        )
+
+        outcome = {'attacker': 0.0, 'defender': 0.0}
+        turns = {}
+        att_dmg = [0.0, 0.0]   # E[dmg; attacker wins], E[dmg^2; attacker wins]
+        def_dmg = [0.0, 0.0]
+
+        for t in range(1, max_turns + 1):
+            # The attacker strikes first: it wins on turn t if the defender's
+            # kill time is not earlier than t
+            att_win = att['kill'][t] * dfd['survival'][t - 1]
+            def_win = dfd['kill'][t] * att['survival'][t]
+            if att_win or def_win:
+                turns[t] = att_win + def_win
+            outcome['attacker'] += att_win
+            outcome['defender'] += def_win
+            att_dmg[0] += att['kill_damage'][t] * dfd['survival'][t - 1]
+            att_dmg[1] += att['kill_damage_sq'][t] * dfd['survival'][t - 1]
+            def_dmg[0] += dfd['kill_damage'][t] * att['survival'][t]
+            def_dmg[1] += dfd['kill_damage_sq'][t] * att['survival'][t]
+
+        # Both alive at max_turns: simulate_combat awards the attacker
+        timeout = att['survival'][max_turns] * dfd['survival'][max_turns]
+        if timeout:
+            turns[max_turns] = turns.get(max_turns, 0.0) + timeout
+            outcome['attacker'] += timeout
+            att_dmg[0] += att['live_damage'] * dfd['survival'][max_turns]
+            att_dmg[1] += att['live_damage_sq'] * dfd['survival'][max_turns]
+
+        truncated = max(0.0, 1.0 - outcome['attacker'] - outcome['defender'])
+        return self._exact_stats(
+            outcome, turns, tuple(att_dmg), tuple(def_dmg), truncated,
+            att['states'] + dfd['states'],
+        )
+
+    def _kill_time_distribution(
+        self,
+        actor: CombatStats,
+        abilities: List[Ability],
+        target_health: float,
+        max_states: int,
+    ) -> Dict[str, Any]:
+        """
+        Forward-propagate one side's attack chain turn by turn.
+
+        States are (remaining target HP, cooldown tuple); HP is rounded to 1e-9
+        so paths that deal the same total damage merge, and a target at or
+        below HP_EPSILON is dead, as in the engines.
+
+        Returns:
+            Dict of per-turn lists 'kill' (P[kill on turn t]), 'kill_damage'
+            and 'kill_damage_sq' (damage moments on those paths), 'survival'
+            (P[target alive after turn t]), plus 'live_damage',
+            'live_damage_sq' for paths still alive at max_turns and 'states'
+        """
+        max_turns = self.max_turns
+        kill = [0.0] * (max_turns + 1)
+        kill_damage = [0.0] * (max_turns + 1)
+        kill_damage_sq = [0.0] * (max_turns + 1)
+        survival = [0.0] * (max_turns + 1)
+        survival[0] = 1.0
+
+        normal = self._apply_armor(actor.attack_power)
+        crit = self._apply_armor(actor.attack_power * actor.critical_multiplier)
+        crit_chance = min(max(actor.critical_chance, 0.0), 1.0)
+        dodge_pass = 1.0 - min(max(actor.dodge_chance, 0.0), 1.0)
+        strikes = [(normal, 1.0 - crit_chance), (crit, crit_chance)]
+
+        states = {(round(target_health, 9), (0,) * len(abilities)): 1.0}
+        explored = 0
+
+        for t in range(1, max_turns + 1):
+            next_states: Dict[Tuple[float, Tuple[int, ...]], float] = {}
+            for (hp, cooldowns), prob in states.items():
+                ticked = tuple(c - 1 if c > 0 else c for c in cooldowns)
+                choices = [i for i, c in enumerate(cooldowns) if c <= 0] or [None]
+                pick_prob = prob / len(choices)
+
+                for choice in choices:
+                    if choice is None:
+                        multiplier, hit_prob, after_hit = 1.0, dodge_pass, ticked
+                    else:
+                        ability = abilities[choice]
+                        multiplier = ability.damage_multiplier
+                        hit_prob = dodge_pass * min(max(ability.hit_chance, 0.0), 1.0)
+                        # Cooldown is set on hit, then ticks down at end of turn
+                        cd = ability.cooldown - 1 if ability.cooldown > 0 else ability.cooldown
+                        after_hit = ticked[:choice] + (cd,) + ticked[choice + 1:]
+
+                    if hit_prob < 1.0:
+                        key = (hp, ticked)
+                        next_states[key] = next_states.get(key, 0.0) + pick_prob * (1.0 - hit_prob)
+
+                    for damage, strike_prob in strikes:
+                        branch = pick_prob * hit_prob * strike_prob
+                        if branch <= 0.0:
+                            continue
+                        remaining = hp - damage * multiplier
+                        if remaining <= HP_EPSILON:
+                            dealt = target_health - remaining
+                            kill[t] += branch
+                            kill_damage[t] += branch * dealt
+                            kill_damage_sq[t] += branch * dealt * dealt
+                        else:
+                            key = (round(remaining, 9), after_hit)
+                            next_states[key] = next_states.get(key, 0.0) + branch
+
+            states = {k: p for k, p in next_states.items() if p >= EXACT_PRUNE_PROBABILITY}
+            explored += len(states)
+            if len(states) > max_states:
+                raise ValueError(
+                    f"Exact solver state space too large ({len(states)} live states "
+                    f"at turn {t}, limit {max_states})"
+                )
+            survival[t] = sum(states.values())
+            if not states:
+                break
+
+        live_damage = sum(p * (target_health - hp) for (hp, _), p in states.items())
+        live_damage_sq = sum(p * (target_health - hp) ** 2 for (hp, _), p in states.items())
+
+        return {
+            'kill': kill,
+            'kill_damage': kill_damage,
+            'kill_damage_sq': kill_damage_sq,
+            'survival': survival,
+            'live_damage': live_damage,
+            'live_damage_sq': live_damage_sq,
+            'states': explored,
+        }
+
+    @staticmethod
+    def _exact_stats(
+        outcome: Dict[str, float],
+        turns: Dict[int, float],
+        att_dmg: Tuple[float, float],
+        def_dmg: Tuple[float, float],
+        truncated: float,
+        states: int,
+    ) -> Dict[str, Any]:
+        """Turn exact outcome/turn distributions into a run_simulations-style dict."""
+        attacker = outcome.get('attacker', 0.0)
+        defender = outcome.get('defender', 0.0)
+        total = sum(turns.values())
+
+        mean = sum(t * p for t, p in turns.items()) / total
+        variance = sum((t - mean) ** 2 * p for t, p in turns.items()) / total
+
+        def quantile(q: float) -> int:
+            seen = 0.0
+            for t in sorted(turns):
+                seen += turns[t] / total
+                if seen >= q - 1e-12:
+                    return t
+            return max(turns)
+
+        def moments(sums: Tuple[float, float], prob: float) -> Tuple[float, float]:
+            if prob <= 0:
+                return 0, 0.0
+            avg = sums[0] / prob
+            return avg, max(0.0, sums[1] / prob - avg * avg)
+
+        avg_att, var_att = moments(att_dmg, attacker)
+        avg_def, var_def = moments(def_dmg, defender)
+        support = [t for t, p in turns.items() if p > 0]
+
+        return {
+            'method': 'exact',
+            'simulations': None,
+            'attacker_win_rate': attacker,
+            'defender_win_rate': defender,
+            'draw_rate': outcome.get('draw', 0.0),
+            'average_turns': mean,
+            'avg_attacker_damage': avg_att,
+            'avg_defender_damage': avg_def,
+            'turns_min': min(support),
+            'turns_max': max(support),
+            'turns_variance': variance,
+            'turns_std': math.sqrt(variance),
+            'turns_p50': quantile(0.50),
+            'turns_p90': quantile(0.90),
+            'turns_p99': quantile(0.99),
+            'attacker_damage_variance': var_att,
+            'defender_damage_variance': var_def,
+            'ttk_distribution': {str(t): turns[t] for t in sorted(turns)},
+            'truncated_probability': truncated,
+            'states_explored': states,
+        }
+
+    def _annotate_stats(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Hook for engine-specific fields on a stats dictionary."""
+        return stats
+
+    def _resolve_engine(self, engine: str) -> str:
+        """Map 'auto' to a concrete engine and validate the choice."""
+        if engine == 'auto':
+            engine = 'numpy' if np is not None and not self.has_effects else 'python'
+        if engine == 'numpy' and np is None:
+            raise RuntimeError("NumPy is required for the numpy engine")
+        if engine == 'numpy' and self.has_effects:
+            raise ValueError("Status effects need the python engine")
+        if engine not in ('python', 'numpy'):
+            raise ValueError(f"Unknown engine: {engine}")
+        return engine
+
+    def _base_seed(self) -> int:
+        """Seed all batch streams derive from (drawn from self.rng if unseeded)."""
+        return self.seed if self.seed is not None else self.rng.getrandbits(63)
+
+    def _run_identity(self, engine: str, num_simulations: int, batch_size: int) -> str:
+        """Hash of everything that determines a run's results (checkpoint validation)."""
+        return canonical_hash({
+            'simulator': type(self).__name__,
+            'attacker': asdict(self.attacker_stats),
+            'defender': asdict(self.defender_stats),
+            'attacker_abilities': [asdict(a) for a in self.attacker_abilities],
+            'defender_abilities': [asdict(a) for a in self.defender_abilities],
+            'armor_formula': self.armor_formula,
+            'armor_value': self.armor_value,
+            'max_turns': self.max_turns,
+            'max_time': getattr(self, 'max_time', None),
+            'seed': self.seed,
+            'engine': engine,
+            'simulations': num_simulations,
+            'batch_size': batch_size,
+            'code': source_version(__file__),
+        })
+
+    def _batch_tasks(
+        self,
+        engine: str,
+        base_seed: int,
+        first_index: int,
+        num_fights: int,
+        batch_size: int,
+    ) -> List[Tuple['CombatSimulator', str, int, int, int]]:
+        """Split num_fights into batch tasks numbered from first_index."""
+        return [
+            (self, engine, base_seed, first_index + offset, min(batch_size, num_fights - start))
+            for offset, start in enumerate(range(0, num_fights, batch_size))
+        ]
+
+    def run_batch(self, engine: str, seed: int, index: int, size: int) -> CombatAccumulator:
+        """
+        Run one batch of fights on its own RNG stream and aggregate it.
+
+        Args:
+            engine: 'python' or 'numpy'
+            seed: Base seed of the run
+            index: Batch index (selects the RNG stream)
+            size: Number of fights in the batch
+
+        Returns:
+            CombatAccumulator for the batch
+        """
+        accumulator = CombatAccumulator(self.time_resolution)
+
+        if engine == 'numpy':
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+            accumulator.add_batch(*self.simulate_batch(size, rng))
+            return accumulator
+
+        sim = copy.copy(self)
+        sim.rng = random.Random(f'{seed}:{index}')
+        for _ in range(size):
+            accumulator.add_fight(*sim.simulate_combat())
+
+        return accumulator
+
+
+class TimelineSimulator(CombatSimulator):
+    """
+    Continuous-time combat: each side acts on its own clock.
+
+    Every action occupies max(cast_time, 1 / attack_speed) seconds and lands
+    at the end of that window, and the next action starts right away. Ability
+    cooldowns are in seconds from the start of the cast and, as in the turn
+    engine, only begin when the ability lands. Pending actions sit in an event
+    queue keyed on landing time; on ties the attacker goes first, so with
+    attack_speed 1 and no cast times fights play out exactly like turns.
+
+    Fight length is reported in seconds in the usual 'turns' fields.
+    """
+
+    time_resolution = 0.001
+
+    def __init__(self, *args: Any, max_time: Optional[float] = None, **kwargs: Any):
+        """
+        Initialize timeline simulator.
+
+        Args:
+            *args: CombatSimulator arguments
+            max_time: Seconds before combat ends (default: max_turns)
+            **kwargs: CombatSimulator keyword arguments
+        """
+        super().__init__(*args, **kwargs)
+        if self.has_effects:
+            raise ValueError("Status effects need the turn engine")
+        self.max_time = float(self.max_turns if max_time is None else max_time)
+        for stats in (self.attacker_stats, self.defender_stats):
+            if stats.attack_speed <= 0:
+                raise ValueError("attack_speed must be positive")
+
+    def _durations(self, stats: CombatStats, abilities: List[Ability]) -> Tuple[float, List[float]]:
+        """Seconds taken by a basic attack and by each ability."""
+        swing = 1.0 / stats.attack_speed
+        return swing, [max(a.cast_time, swing) for a in abilities]
+
+    def simulate_combat(self, trace: Optional[List[Tuple]] = None) -> Tuple[str, float, float, float]:
+        """
+        Simulate a single combat encounter on a timeline.
+
+        Args:
+            trace: Not supported (turn records need the turn engine)
+
+        Returns:
+            Tuple of (winner, seconds_elapsed, attacker_damage_dealt, defender_damage_dealt)
+        """
+        if trace is not None:
+            raise ValueError("Per-turn traces are not available for the timeline engine")
+
+        stats = (self.attacker_stats, self.defender_stats)
+        abilities = (self.attacker_abilities, self.defender_abilities)
+        durations = (
+            self._durations(self.attacker_stats, self.attacker_abilities),
+            self._durations(self.defender_stats, self.defender_abilities),
+        )
+        hp = [self.attacker_stats.health, self.defender_stats.health]
+        dealt = [0.0, 0.0]
+        ready = ({a.name: 0.0 for a in abilities[0]}, {a.name: 0.0 for a in abilities[1]})
+        pending = [None, None]
+        starts = [0.0, 0.0]
+        queue = []
+
+        def start_action(side: int, now: float) -> float:
+            """Pick the next action for a side and return when it lands."""
+            available = [a for a in abilities[side] if ready[side][a.name] <= now]
+            ability = self.rng.choice(available) if available else None
+            pending[side] = ability
+            starts[side] = now
+            swing, ability_durations = durations[side]
+            return now + (ability_durations[abilities[side].index(ability)] if ability else swing)
+
+        if hp[0] > HP_EPSILON and hp[1] > HP_EPSILON:
+            queue = [(start_action(0, 0.0), 0), (start_action(1, 0.0), 1)]
+            heapq.heapify(queue)
+
+        elapsed = 0.0
+        while queue:
+            now, side = queue[0]
+            if now > self.max_time:
+                break
+            elapsed = now
+
+            # Resolve the landing action
+            ability = pending[side]
+            target = 1 - side
+            if self.roll_hit(stats[side], ability) == OUTCOME_HIT:
+                damage, _ = self.roll_damage(stats[side], stats[target])
+                damage *= ability.damage_multiplier if ability else 1.0
+                hp[target] -= damage
+                dealt[side] += damage
+                if ability:
+                    ready[side][ability.name] = starts[side] + ability.cooldown
+            if hp[target] <= HP_EPSILON:
+                break
+
+            heapq.heapreplace(queue, (start_action(side, now), side))
+
+        if hp[0] > HP_EPSILON:
+            winner = 'attacker'
+        elif hp[1] > HP_EPSILON:
+            winner = 'defender'
+        else:
+            winner = 'draw'
+
+        return winner, elapsed, dealt[0], dealt[1]
+
+    def simulate_batch(
+        self,
+        num_fights: int,
+        rng: Any = None,
+        aligned: bool = False,
+        antithetic: bool = False,
+    ) -> Tuple[Any, Any, Any, Any]:
+        """
+        Simulate many timeline fights at once with NumPy.
+
+        Each iteration pops the earliest pending action of every active fight
+        (the per-fight event queue holds one action per side) and resolves all
+        of them together, attacker events and defender events as two masked
+        groups. State lives in preallocated per-side arrays and finished fights
+        are compacted out, as in the turn engine.
+
+        Args:
+            num_fights: Number of fights in the batch (even with antithetic)
+            rng: numpy.random.Generator (a fresh unseeded one if omitted)
+            aligned: Key rolls by (event, fight) instead of by active slot
+            antithetic: Pair fight k with fight k + num_fights // 2 on 1 - u rolls
+
+        Returns:
+            Tuple of arrays (winner_codes, seconds, attacker_damage_dealt,
+            defender_damage_dealt), one entry per fight
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for the batch engine")
+        rng = rng if rng is not None else np.random.default_rng()
+
+        def draw_rolls(ids: Any) -> Any:
+            if antithetic:
+                half = rng.random((4, num_fights // 2))
+                return np.concatenate((half, 1.0 - half), axis=1)[:, ids]
+            if aligned:
+                return rng.random((4, num_fights))[:, ids]
+            return rng.random((4, len(ids)))
+
+        stats = (self.attacker_stats, self.defender_stats)
+        packed = []
+        for side_stats, abilities in zip(stats, (self.attacker_abilities, self.defender_abilities)):
+            swing, ability_durations = self._durations(side_stats, abilities)
+            packed.append((
+                np.array([a.cooldown for a in abilities], dtype=np.float64),
+                np.array([a.damage_multiplier for a in abilities], dtype=np.float64),
+                np.array([a.hit_chance for a in abilities], dtype=np.float64),
+                np.array(ability_durations, dtype=np.float64),
+                swing,
+                self._apply_armor(side_stats.attack_power),
+                self._apply_armor(side_stats.attack_power * side_stats.critical_multiplier),
+            ))
+
+        winners = np.zeros(num_fights, dtype=np.int8)
+        elapsed_out = np.zeros(num_fights, dtype=np.float64)
+        dealt_out = [np.zeros(num_fights), np.zeros(num_fights)]
+
+        # Working state for fights still in progress, indexed [side][fight]
+        ids = np.arange(num_fights)
+        hp = [np.full(num_fights, float(s.health)) for s in stats]
+        dealt = [np.zeros(num_fights), np.zeros(num_fights)]
+        ready = [np.zeros((num_fights, len(p[0]))) for p in packed]
+        picks = [np.full(num_fights, -1, dtype=np.int64) for _ in stats]
+        starts = [np.zeros(num_fights), np.zeros(num_fights)]
+        lands = [np.zeros(num_fights), np.zeros(num_fights)]
+        elapsed = np.zeros(num_fights)
+
+        def start_actions(side: int, rows: Any, now: Any, pick_rolls: Any) -> None:
+            """Vectorized action pick for rows of one side starting at now."""
+            cooldowns, _, _, ability_durations, swing, _, _ = packed[side]
+            chosen = self._pick_abilities(ready[side][rows] - now[:, None], pick_rolls)
+            picks[side][rows] = chosen
+            starts[side][rows] = now
+            if len(cooldowns):
+                lands[side][rows] = now + np.where(
+                    chosen >= 0, ability_durations[np.maximum(chosen, 0)], swing
+                )
+            else:
+                lands[side][rows] = now + swing
+
+        def resolve(side: int, rows: Any, rolls: Any) -> None:
+            """Land the pending actions of one side for the given rows."""
+            actor = stats[side]
+            cooldowns, multipliers, hit_chances, _, _, normal, crit = packed[side]
+            chosen = picks[side][rows]
+            used = chosen >= 0
+            safe = np.maximum(chosen, 0)
+
+            hit = rolls[1] >= actor.dodge_chance
+            if len(multipliers):
+                hit &= ~used | (rolls[2] <= hit_chances[safe])
+                multiplier = np.where(used, multipliers[safe], 1.0)
+            else:
+                multiplier = 1.0
+            damage = np.where(rolls[3] < actor.critical_chance, crit, normal) * multiplier
+            damage = np.where(hit, damage, 0.0)
+            hp[1 - side][rows] -= damage
+            dealt[side][rows] += damage
+
+            landed = hit & used
+            if landed.any():
+                landed_rows = rows[landed]
+                ready[side][landed_rows, chosen[landed]] = (
+                    starts[side][landed_rows] + cooldowns[chosen[landed]]
+                )
+
+        all_rows = np.arange(num_fights)
+        zero = np.zeros(num_fights)
+        start_actions(0, all_rows, zero, draw_rolls(ids)[0])
+        start_actions(1, all_rows, zero, draw_rolls(ids)[0])
+
+        done = (hp[0] <= HP_EPSILON) | (hp[1] <= HP_EPSILON)
+        while True:
+            # The next event per fight: defender only when strictly earlier
+            defender_next = lands[1] < lands[0]
+            now = np.where(defender_next, lands[1], lands[0])
+            done |= now > self.max_time
+
+            if done.any():
+                # Retire finished fights and compact the working arrays
+                done_ids = ids[done]
+                winners[done_ids] = np.where(
+                    hp[0][done] > HP_EPSILON, WINNER_ATTACKER,
+                    np.where(hp[1][done] > HP_EPSILON, WINNER_DEFENDER, WINNER_DRAW),
+                )
+                elapsed_out[done_ids] = elapsed[done]
+                for side in (0, 1):
+                    dealt_out[side][done_ids] = dealt[side][done]
+
+                keep = ~done
+                ids, elapsed, now, defender_next = ids[keep], elapsed[keep], now[keep], defender_next[keep]
+                for arrays in (hp, dealt, ready, picks, starts, lands):
+                    arrays[0], arrays[1] = arrays[0][keep], arrays[1][keep]
+
+            if not len(ids):
+                break
+
+            rolls = draw_rolls(ids)
+            elapsed = now
+            for side, rows in ((0, np.nonzero(~defender_next)[0]), (1, np.nonzero(defender_next)[0])):
+                if len(rows):
+                    resolve(side, rows, rolls[:, rows])
+                    start_actions(side, rows, now[rows], rolls[0, rows])
+
+            done = (hp[0] <= HP_EPSILON) | (hp[1] <= HP_EPSILON)
+
+        return winners, elapsed_out, dealt_out[0], dealt_out[1]
+
+    def solve_exact(self, max_states: int = DEFAULT_EXACT_MAX_STATES) -> Dict[str, Any]:
+        """Not available: the exact solver models alternating turns."""
+        raise ValueError("Exact solver does not support the timeline engine")
+
+    def model_ttk(self) -> Dict[str, Dict[str, float]]:
+        """
+        Steady-state basic-attack DPS and time to kill per side.
+
+        Same model as optimizer.py's _dps_formula (expected damage per swing
+        times attack_speed; TTK = target health / DPS), using this simulator's
+        armor formula and including dodge. Abilities are ignored.
+        """
+        model = {}
+        for side, actor, target in (('attacker', self.attacker_stats, self.defender_stats),
+                                    ('defender', self.defender_stats, self.attacker_stats)):
+            per_swing = (
+                (1 - actor.critical_chance) * self._apply_armor(actor.attack_power)
+                + actor.critical_chance * self._apply_armor(actor.attack_power * actor.critical_multiplier)
+            ) * (1 - actor.dodge_chance)
+            dps = per_swing * actor.attack_speed
+            model[side] = {
+                'effective_dps': dps,
+                'ttk': target.health / max(dps, 0.01),
+            }
+        return model
+
+    def _annotate_stats(self, stats: Dict[str, Any]) -> Dict[str, Any]:
+        """Mark fight length as seconds and attach the analytic DPS model."""
+        stats['time_unit'] = 'seconds'
+        stats['model'] = self.model_ttk()
+        return stats
+
+
+class ImportanceSimulator(CombatSimulator):
+    """
+    CombatSimulator whose crit, dodge and ability-miss rolls come from a
+    proposal distribution, tracking the likelihood ratio of each fight.
+
+    Every Bernoulli roll with nominal probability p is drawn with probability
+    q = proposal[category] instead and multiplies the fight's weight by p / q
+    (event) or (1 - p) / (1 - q) (no event), so weighted averages stay
+    unbiased under the nominal rules. Categories are named
+    '<side>.dodge', '<side>.crit' and '<side>.miss:<ability>'.
+    """
+
+    use_kernel = False
+
+    def __init__(self, base: CombatSimulator, proposal: Dict[str, float], rng: random.Random):
+        """
+        Initialize importance simulator.
+
+        Args:
+            base: Simulator with the nominal rules
+            proposal: Biased probability per roll category (missing = nominal)
+            rng: Random stream for the biased fights
+        """
+        super().__init__(
+            attacker_stats=copy.copy(base.attacker_stats),
+            defender_stats=copy.copy(base.defender_stats),
+            attacker_abilities=base.attacker_abilities,
+            defender_abilities=base.defender_abilities,
+            armor_formula=base.armor_formula,
+            armor_value=base.armor_value,
+            max_turns=base.max_turns,
+        )
+        self.rng = rng
+        self.proposal = proposal
+        self.log_weight = 0.0
+        self.counts: Dict[str, List[int]] = {}
+
+    def _side(self, combatant: CombatStats) -> str:
+        return 'attacker' if combatant is self.attacker_stats else 'defender'
+
+    def _roll(self, category: str, p: float) -> bool:
+        """Draw one biased Bernoulli roll and update the weight and counts."""
+        q = self.proposal.get(category, p)
+        event = self.rng.random() < q
+        if 0.0 < p < 1.0:
+            self.log_weight += math.log(p / q) if event else math.log((1 - p) / (1 - q))
+            counts = self.counts.setdefault(category, [0, 0])
+            counts[0] += event
+            counts[1] += 1
+        return event
+
+    def roll_hit(self, combatant: CombatStats, ability: Ability = None) -> int:
+        side = self._side(combatant)
+        if self._roll(f'{side}.dodge', combatant.dodge_chance):
+            return OUTCOME_DODGED
+        if ability and self._roll(f'{side}.miss:{ability.name}', 1 - ability.hit_chance):
+            return OUTCOME_MISSED
+        return OUTCOME_HIT
+
+    def roll_damage(self, attacker: CombatStats, defender: CombatStats) -> Tuple[float, bool]:
+        base_damage = attacker.attack_power
+        crit = self._roll(f'{self._side(attacker)}.crit', attacker.critical_chance)
+        if crit:
+            base_damage *= attacker.critical_multiplier
+        return self._apply_armor(base_damage), crit
+
+    def simulate_weighted(self) -> Tuple[str, int, float, float, float, Dict[str, List[int]]]:
+        """
+        Simulate one biased fight.
+
+        Returns:
+            Tuple of (winner, turns, attacker_damage_dealt, defender_damage_dealt,
+            log likelihood ratio, {category: [events, rolls]})
+        """
+        self.log_weight = 0.0
+        self.counts = {}
+        result = self.simulate_combat()
+        return result + (self.log_weight, self.counts)
+
+    def nominal_probabilities(self) -> Dict[str, float]:
+        """Nominal probability of every biasable roll category."""
+        nominal = {}
+        for side, stats, abilities in (
+            ('attacker', self.attacker_stats, self.attacker_abilities),
+            ('defender', self.defender_stats, self.defender_abilities),
+        ):
+            nominal[f'{side}.dodge'] = stats.dodge_chance
+            nominal[f'{side}.crit'] = stats.critical_chance
+            for ability in abilities:
+                nominal[f'{side}.miss:{ability.name}'] = 1 - ability.hit_chance
+        return {k: p for k, p in nominal.items() if 0.0 < p < 1.0}
+
+
+def estimate_rare_event(
+    sim: CombatSimulator,
+    target: str = 'defender',
+    num_simulations: int = DEFAULT_RARE_SIMULATIONS,
+    confidence: float = 0.95,
+    pilot_size: int = DEFAULT_RARE_PILOT,
+    elite_fraction: float = 0.1,
+    max_iterations: int = 10,
+) -> Dict[str, Any]:
+    """
+    Estimate the probability that ``target`` wins by importance sampling.
+
+    A cross-entropy search first tunes the proposal: each round simulates
+    pilot_size biased fights, keeps the elite fraction that came closest to a
+    ``target`` win (damage dealt to the opponent as a share of its health),
+    and sets every roll category's proposal probability to its
+    likelihood-weighted frequency among the elite fights. Once the elite
+    fights are real target wins, the final num_simulations fights run under
+    that proposal and the weighted mean of the win indicator is the unbiased
+    estimate, with a normal-approximation interval.
+
+    Args:
+        sim: Simulator with the nominal rules (turn engine)
+        target: Side whose (rare) win is estimated: 'attacker' or 'defender'
+        num_simulations: Fights in the final weighted run
+        confidence: Confidence level of the interval
+        pilot_size: Fights per cross-entropy round
+        elite_fraction: Share of pilot fights kept as elite
+        max_iterations: Cross-entropy rounds before giving up on reaching target wins
+
+    Returns:
+        Stats dictionary with the probability, interval and the tuned proposal
+    """
+    if isinstance(sim, TimelineSimulator):
+        raise ValueError("Importance sampling needs the turn engine")
+    if target not in ('attacker', 'defender'):
+        raise ValueError("target must be 'attacker' or 'defender'")
+
+    rng = random.Random(f'{sim._base_seed()}:rare')
+    biased = ImportanceSimulator(sim, {}, rng)
+    nominal = biased.nominal_probabilities()
+    opponent_health = (sim.defender_stats if target == 'attacker' else sim.attacker_stats).health
+    damage_index = 2 if target == 'attacker' else 3
+
+    iterations = 0
+    pilot_fights = 0
+    reached = False
+    while iterations < max_iterations and nominal:
+        iterations += 1
+        pilot = [biased.simulate_weighted() for _ in range(pilot_size)]
+        pilot_fights += pilot_size
+
+        # Score: target win = 1, otherwise damage dealt to the opponent / its health
+        scores = [
+            1.0 if fight[0] == target else min(fight[damage_index] / opponent_health, 1.0 - 1e-9)
+            for fight in pilot
+        ]
+        level = sorted(scores)[int((1 - elite_fraction) * (len(scores) - 1))]
+        reached = level >= 1.0
+        elite = [fight for fight, score in zip(pilot, scores) if score >= level]
+
+        events = {c: 0.0 for c in nominal}
+        rolls = {c: 0.0 for c in nominal}
+        for fight in elite:
+            weight = math.exp(fight[4])
+            for category, (hits, trials) in fight[5].items():
+                events[category] += weight * hits
+                rolls[category] += weight * trials
+        proposal = dict(biased.proposal)
+        for category in nominal:
+            if rolls[category] > 0:
+                updated = min(max(events[category] / rolls[category], 1e-4), 1 - 1e-4)
+                previous = proposal.get(category, nominal[category])
+                proposal[category] = 0.7 * updated + 0.3 * previous
+        biased.proposal = proposal
+        if reached:
+            break
+
+    weighted = RunningStats()
+    hits = 0
+    weight_sum = weight_sq_sum = 0.0
+    for _ in range(num_simulations):
+        fight = biased.simulate_weighted()
+        value = math.exp(fight[4]) if fight[0] == target else 0.0
+        weighted.add(value)
+        if value:
+            hits += 1
+            weight_sum += value
+            weight_sq_sum += value * value
+
+    probability = weighted.mean
+    std_error = math.sqrt(weighted.variance / num_simulations)
+    half = z_score(confidence) * std_error
+    total_fights = pilot_fights + num_simulations
+    naive_fights = probability * (1 - probability) / std_error ** 2 if std_error > 0 else None
+
+    return {
+        'method': 'importance_sampling',
+        'target': target,
+        'probability': probability,
+        'ci': [max(0.0, probability - half), min(1.0, probability + half)],
+        'confidence': confidence,
+        'std_error': std_error,
+        'relative_error': std_error / probability if probability > 0 else None,
+        'simulations': num_simulations,
+        'pilot_simulations': pilot_fights,
+        'ce_iterations': iterations,
+        'proposal_reached_target': reached,
+        'target_hits': hits,
+        'effective_sample_size': weight_sum ** 2 / weight_sq_sum if weight_sq_sum else 0.0,
+        'naive_equivalent_simulations': naive_fights,
+        'speedup': naive_fights / total_fights if naive_fights else None,
+        'proposal': {
+            category: {'nominal': nominal[category], 'proposal': biased.proposal.get(category, nominal[category])}
+            for category in sorted(nominal)
+        },
+    }
+
+
+def _run_tasks(
+    tasks: List[Tuple[CombatSimulator, str, int, int, int]],
+    accumulator: CombatAccumulator,
+    pool: Optional[ProcessPoolExecutor] = None,
+    on_merge: Optional[Callable[[int], None]] = None,
+) -> None:
+    """
+    Run batch tasks (in a pool if given) and merge them in task order.
+
+    on_merge, if given, is called with each task's batch index right after
+    that batch has been merged.
+    """
+    if pool is not None and len(tasks) > 1:
+        # map() yields in submission order, keeping the merge deterministic
+        batches = pool.map(_run_batch_task, tasks)
+    else:
+        batches = map(_run_batch_task, tasks)
+    for task, batch in zip(tasks, batches):
+        accumulator.merge(batch)
+        if on_merge is not None:
+            on_merge(task[3])
+
+
+def _run_batch_task(task: Tuple[CombatSimulator, str, int, int, int]) -> CombatAccumulator:
+    """Process-pool entry point: run one (simulator, engine, seed, index, size) batch."""
+    sim, engine, seed, index, size = task
+    return sim.run_batch(engine, seed, index, size)
+
+
+class RunCheckpoint:
+    """
+    Periodic on-disk snapshot of a run_simulations() job.
+
+    Batch k always draws from the RNG stream derived from (base seed, k), so
+    the merged accumulator, the base seed and the next batch index are the
+    complete state of a run: resuming from them replays exactly the batches
+    an uninterrupted run would have merged next, in the same order.
+    """
+
+    def __init__(self, path: Path, identity: str, interval: float = DEFAULT_CHECKPOINT_INTERVAL):
+        """
+        Initialize checkpoint.
+
+        Args:
+            path: Checkpoint file (written atomically)
+            identity: Hash of everything that determines the run's results
+            interval: Minimum seconds between saves
+        """
+        self.path = Path(path)
+        self.identity = identity
+        self.interval = interval
+        self.last_save = time.monotonic()
+
+    def load(self) -> Optional[Tuple[int, int, CombatAccumulator]]:
+        """
+        Read a saved run.
+
+        Returns:
+            (base_seed, next_batch_index, accumulator), or None if no checkpoint exists
+
+        Raises:
+            ValueError: The checkpoint was written by a different run
+        """
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return None
+        if state.get('identity') != self.identity:
+            raise ValueError(
+                f"{self.path} belongs to a different run (config, simulation count, "
+                f"seed, engine, batch size or simulator code changed)"
+            )
+        return state['base_seed'], state['next_index'], CombatAccumulator.from_state(state['accumulator'])
+
+    def due(self) -> bool:
+        """True once interval seconds have passed since the last save."""
+        return time.monotonic() - self.last_save >= self.interval
+
+    def save(self, base_seed: int, next_index: int, accumulator: CombatAccumulator) -> None:
+        """Write the run state atomically (a crash mid-write keeps the previous checkpoint)."""
+        state = {
+            'identity': self.identity,
+            'base_seed': base_seed,
+            'next_index': next_index,
+            'simulations_done': accumulator.simulations,
+            'accumulator': accumulator.to_state(),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.last_save = time.monotonic()
+
+    def remove(self) -> None:
+        """Delete the checkpoint once the run has finished."""
+        self.path.unlink(missing_ok=True)
+
+
+class ProgressMeter:
+    """Single-line progress/ETA display on stderr, from measured fights per second."""
+
+    def __init__(self, total: int, done: int = 0, min_interval: float = 1.0):
+        """
+        Initialize progress meter.
+
+        Args:
+            total: Fights in the whole run
+            done: Fights already done (e.g. restored from a checkpoint); they
+                  count toward progress but not toward the measured rate
+            min_interval: Minimum seconds between redraws
+        """
+        self.total = total
+        self.start_done = done
+        self.start = time.monotonic()
+        self.min_interval = min_interval
+        self.last_draw = 0.0
+
+    def update(self, done: int, force: bool = False) -> None:
+        """Redraw the line for ``done`` fights (throttled unless force)."""
+        now = time.monotonic()
+        if not force and now - self.last_draw < self.min_interval:
+            return
+        self.last_draw = now
+        elapsed = now - self.start
+        rate = (done - self.start_done) / elapsed if elapsed > 0 else 0.0
+        eta = format_duration((self.total - done) / rate) if rate > 0 else '?'
+        sys.stderr.write(
+            f"\r  {done:,}/{self.total:,} fights ({done / self.total:.1%})  "
+            f"{rate:,.0f} fights/s  ETA {eta}   "
+        )
+        sys.stderr.flush()
+
+    def finish(self, done: int) -> None:
+        """Draw the final state and end the line."""
+        self.update(done, force=True)
+        sys.stderr.write('\n')
+
+
+def format_duration(seconds: float) -> str:
+    """Compact h/m/s rendering for progress lines."""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}h{minutes:02d}m"
+    if minutes:
+        return f"{minutes}m{seconds:02d}s"
+    return f"{seconds}s"
+
+
+TRACE_FIELDS = (
+    'turn', 'attacker_hp', 'defender_hp',
+    'attacker_ability', 'attacker_outcome', 'attacker_crit', 'attacker_damage',
+    'defender_ability', 'defender_outcome', 'defender_crit', 'defender_damage',
+)
+
+
+class TraceWriter:
+    """
+    Writes per-turn fight traces into a preallocated memory-mapped file.
+
+    The file holds a header, a fixed-capacity fight index and a fixed-capacity
+    region of TRACE_RECORD rows. Fights that no longer fit are dropped and the
+    file is flagged as truncated; the unused record tail is trimmed on close.
+    """
+
+    def __init__(self, path: Path, max_fights: int, max_records: int):
+        self.path = Path(path)
+        self.max_fights = max_fights
+        self.max_records = max_records
+        self.fights_written = 0
+        self.records_written = 0
+        self.flags = 0
+        self._records_offset = TRACE_HEADER.size + max_fights * TRACE_INDEX.size
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, 'w+b')
+        self._file.truncate(self._records_offset + max_records * TRACE_RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._write_header()
+
+    def write_fight(self, fight_number: int, winner: str, trace: List[Tuple]) -> bool:
+        """
+        Append one fight's turn records.
+
+        Args:
+            fight_number: Global fight number within the seeded run
+            winner: 'attacker', 'defender' or 'draw'
+            trace: Per-turn tuples from CombatSimulator.simulate_combat
+
+        Returns:
+            False if the file is full (the fight is not written)
+        """
+        if (self.fights_written >= self.max_fights
+                or self.records_written + len(trace) > self.max_records):
+            self.flags |= TRACE_FLAG_TRUNCATED
+            return False
+
+        TRACE_INDEX.pack_into(
+            self._map, TRACE_HEADER.size + self.fights_written * TRACE_INDEX.size,
+            fight_number, self.records_written, len(trace), WINNER_CODES[winner],
+        )
+        offset = self._records_offset + self.records_written * TRACE_RECORD.size
+        for record in trace:
+            TRACE_RECORD.pack_into(self._map, offset, *record)
+            offset += TRACE_RECORD.size
+
+        self.fights_written += 1
+        self.records_written += len(trace)
+        return True
+
+    def close(self) -> None:
+        """Finalize the header and trim unused record capacity."""
+        self._write_header()
+        self._map.flush()
+        self._map.close()
+        self._file.truncate(self._records_offset + self.records_written * TRACE_RECORD.size)
+        self._file.close()
+
+    def _write_header(self) -> None:
+        TRACE_HEADER.pack_into(
+            self._map, 0, TRACE_MAGIC, 1, TRACE_RECORD.size, self.max_fights,
+            self.max_records, self.fights_written, self.records_written, self.flags,
+        )
+
+    def __enter__(self) -> 'TraceWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class TraceReader:
+    """
+    Random-access reader for files written by TraceWriter.
+
+    reader[k] decodes only the k-th stored fight; find() looks a fight up by
+    its fight number in the original run.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, _version, record_size, self.max_fights, _max_records,
+         self.fights_written, self.records_written, flags) = TRACE_HEADER.unpack_from(self._map, 0)
+        if magic != TRACE_MAGIC or record_size != TRACE_RECORD.size:
+            raise ValueError(f"{self.path} is not a combat trace file")
+        self.truncated = bool(flags & TRACE_FLAG_TRUNCATED)
+        self._records_offset = TRACE_HEADER.size + self.max_fights * TRACE_INDEX.size
+
+    def __len__(self) -> int:
+        return self.fights_written
+
+    def __getitem__(self, k: int) -> Dict[str, Any]:
+        return self.fight(k)
+
+    def __iter__(self):
+        for k in range(self.fights_written):
+            yield self.fight(k)
+
+    def fight_number(self, k: int) -> int:
+        """Fight number of the k-th stored fight."""
+        return TRACE_INDEX.unpack_from(self._map, TRACE_HEADER.size + k * TRACE_INDEX.size)[0]
+
+    def fight(self, k: int) -> Dict[str, Any]:
+        """
+        Decode the k-th stored fight.
+
+        Args:
+            k: Position in the file (0 <= k < len(reader))
+
+        Returns:
+            Dict with fight_number, winner, turns and per-turn records
+        """
+        if not 0 <= k < self.fights_written:
+            raise IndexError(f"fight {k} out of range (0..{self.fights_written - 1})")
+
+        fight_number, first, count, winner_code = TRACE_INDEX.unpack_from(
+            self._map, TRACE_HEADER.size + k * TRACE_INDEX.size
+        )
+        winner = next(name for name, code in WINNER_CODES.items() if code == winner_code)
+        offset = self._records_offset + first * TRACE_RECORD.size
+        records = [
+            dict(zip(TRACE_FIELDS, TRACE_RECORD.unpack_from(self._map, offset + i * TRACE_RECORD.size)))
+            for i in range(count)
+        ]
+        for record in records:
+            record['attacker_crit'] = bool(record['attacker_crit'])
+            record['defender_crit'] = bool(record['defender_crit'])
+
+        return {
+            'fight_number': fight_number,
+            'winner': winner,
+            'turns': count,
+            'records': records,
+        }
+
+    def find(self, fight_number: int) -> Optional[Dict[str, Any]]:
+        """Look up a fight by its number in the run (binary search over the index)."""
+        lo, hi = 0, self.fights_written
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.fight_number(mid) < fight_number:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.fights_written and self.fight_number(lo) == fight_number:
+            return self.fight(lo)
+        return None
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'TraceReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def trace_filter(sim: CombatSimulator, policy: str, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Build the sampling predicate for a trace policy.
+
+    Policies: 'all', 'draws', 'attacker_wins', 'defender_wins', 'ttk>N' (more
+    than N turns) and 'ttk>pXX' (turns above the XX-th percentile, taken from
+    the exact solver or a pilot run).
+
+    Args:
+        sim: Simulator whose fights are traced
+        policy: Policy string
+        batch_size: Batch size for the pilot run of percentile policies
+
+    Returns:
+        Tuple of (predicate(winner, turns) -> bool, description)
+    """
+    winners = {'draws': 'draw', 'attacker_wins': 'attacker', 'defender_wins': 'defender'}
+    if policy == 'all':
+        return (lambda winner, turns: True), 'all fights'
+    if policy in winners:
+        wanted = winners[policy]
+        return (lambda winner, turns: winner == wanted), policy.replace('_', ' ')
+    if policy.startswith('ttk>'):
+        threshold = policy[4:]
+        if threshold.startswith('p'):
+            q = float(threshold[1:]) / 100
+            try:
+                ttk = {int(t): p for t, p in sim.solve_exact()['ttk_distribution'].items()}
+                cumulative, limit = 0.0, max(ttk)
+                for t in sorted(ttk):
+                    cumulative += ttk[t]
+                    if cumulative >= q:
+                        limit = t
+                        break
+            except ValueError:
+                # State space too large: estimate the percentile from a pilot run
+                pilot = copy.copy(sim)
+                pilot.rng = random.Random(sim.seed)
+                accumulator = CombatAccumulator()
+                engine = pilot._resolve_engine('auto')
+                _run_tasks(pilot._batch_tasks(engine, pilot._base_seed(), 0, DEFAULT_TRACE_PILOT, batch_size),
+                           accumulator)
+                limit = int(accumulator.turns_sketch.quantile(q))
+        else:
+            limit = int(threshold)
+        return (lambda winner, turns: turns > limit), f'fights longer than {limit} turns'
+    raise ValueError(f"Unknown trace policy: {policy}")
+
+
+def record_traces(
+    sim: CombatSimulator,
+    num_simulations: int,
+    path: Path,
+    policy: str = 'all',
+    max_fights: int = DEFAULT_TRACE_FIGHTS,
+    max_records: Optional[int] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[str, Any]:
+    """
+    Run the python engine and record per-turn traces of sampled fights.
+
+    Batches use the same RNG streams as run_simulations(engine='python'), so
+    the aggregate stats and fight numbers match an untraced seeded run.
+
+    Args:
+        sim: Configured simulator
+        num_simulations: Number of fights to run
+        path: Trace file to write
+        policy: Sampling policy (see trace_filter)
+        max_fights: Fight index capacity of the file
+        max_records: Turn record capacity (default: max_fights * DEFAULT_TRACE_TURNS)
+        batch_size: Fights per batch
+
+    Returns:
+        Stats dictionary with a 'trace' summary
+    """
+    keep, description = trace_filter(sim, policy, batch_size)
+    accumulator = CombatAccumulator()
+    matched = 0
+
+    with TraceWriter(path, max_fights, max_records or max_fights * DEFAULT_TRACE_TURNS) as writer:
+        base_seed = sim._base_seed()
+        fight_number = 0
+        for _, _, _, index, size in sim._batch_tasks('python', base_seed, 0, num_simulations, batch_size):
+            batch = copy.copy(sim)
+            batch.rng = random.Random(f'{base_seed}:{index}')
+            batch_accumulator = CombatAccumulator()
+            for _ in range(size):
+                trace = []
+                winner, turns, att_dmg, def_dmg = batch.simulate_combat(trace)
+                batch_accumulator.add_fight(winner, turns, att_dmg, def_dmg)
+                if keep(winner, turns):
+                    matched += 1
+                    writer.write_fight(fight_number, winner, trace)
+                fight_number += 1
+            accumulator.merge(batch_accumulator)
+
+    results = accumulator.to_stats()
+    results['trace'] = {
+        'path': str(path),
+        'policy': policy,
+        'description': description,
+        'fights_matched': matched,
+        'fights_written': writer.fights_written,
+        'records_written': writer.records_written,
+        'truncated': bool(writer.flags & TRACE_FLAG_TRUNCATED),
+    }
+    return results
+
+
+def load_config(config_path: Path) -> Dict[str, Any]:
+    """Load combat configuration from JSON."""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def parse_combatant(combatant_config: Dict[str, Any]) -> Tuple[CombatStats, List[Ability]]:
+    """
+    Build stats and abilities from an attacker/defender/roster config entry.
+
+    Args:
+        combatant_config: Dict with stat keys and an optional 'abilities' list
+
+    Returns:
+        Tuple of (CombatStats, list of Ability)
+    """
+    if not isinstance(combatant_config, dict):
+        raise TypeError(f'combatant must be a JSON object, got {type(combatant_config).__name__}')
+    stats = CombatStats(
+        health=combatant_config.get('health', 100),
+        attack_power=combatant_config.get('attack_power', 10),
+        armor=combatant_config.get('armor', 0),
+        critical_chance=combatant_config.get('critical_chance', 0.1),
+        critical_multiplier=combatant_config.get('critical_multiplier', 1.5),
+        dodge_chance=combatant_config.get('dodge_chance', 0),
+        attack_speed=combatant_config.get('attack_speed', 1.0),
+    )
+
+    abilities = [
+        Ability(
+            name=a.get('name', f'ability_{i}'),
+            cooldown=a.get('cooldown', 3),
+            damage_multiplier=a.get('damage_multiplier', 1.5),
+            hit_chance=a.get('hit_chance', 1.0),
+            cast_time=a.get('cast_time', 0.0),
+            effects=[
+                StatusEffect(
+                    name=e.get('name', f"{a.get('name', f'ability_{i}')}_{e['kind']}"),
+                    kind=e['kind'],
+                    duration=e.get('duration', 1),
+                    damage_multiplier=e.get('damage_multiplier', 0.0),
+                    amount=e.get('amount', 0.0),
+                    chance=e.get('chance', 1.0),
+                    max_stacks=e.get('max_stacks'),
+                )
+                for e in a.get('effects', [])
+            ],
+        )
+        for i, a in enumerate(combatant_config.get('abilities', []))
+    ]
+    for ability in abilities:
+        for effect in ability.effects:
+            if effect.kind not in EFFECT_KINDS:
+                raise ValueError(f"Unknown status effect kind: {effect.kind}")
+
+    return stats, abilities
+
+
+def simulator_options(config: Dict[str, Any]) -> Dict[str, Any]:
+    """Engine class and shared keyword arguments from a combat or roster config."""
+    options = {
+        'armor_formula': config.get('armor_formula', 'flat'),
+        'armor_value': config.get('armor_value', 0),
+        'max_turns': config.get('max_turns', 1000),
+    }
+    if config.get('timeline'):
+        options['max_time'] = config.get('max_time')
+        return {'cls': TimelineSimulator, **options}
+    return {'cls': CombatSimulator, **options}
+
+
+def build_simulator(config: Dict[str, Any], seed: Optional[int] = None) -> CombatSimulator:
+    """Create a CombatSimulator (TimelineSimulator with "timeline": true) from a config dict."""
+    attacker_stats, attacker_abilities = parse_combatant(config.get('attacker', {}))
+    defender_stats, defender_abilities = parse_combatant(config.get('defender', {}))
+    options = simulator_options(config)
+    cls = options.pop('cls')
+
+    return cls(
+        attacker_stats=attacker_stats,
+        defender_stats=defender_stats,
+        attacker_abilities=attacker_abilities,
+        defender_abilities=defender_abilities,
+        seed=seed,
+        **options,
+    )
+
+
+def check_exact(
+    sim: CombatSimulator,
+    simulations: int = DEFAULT_CHECK_SIMULATIONS,
+    engine: str = 'auto',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_states: int = DEFAULT_EXACT_MAX_STATES,
+) -> Dict[str, Any]:
+    """
+    Check that the exact solver and a Monte Carlo run agree on one matchup.
+
+    The Monte Carlo attacker_win_rate and average_turns are compared with
+    the exact values in units of their exact standard errors. A solver or
+    engine that disagrees on the turn a target dies (e.g. over float residue
+    when a hit lands on exactly 0 HP) shows up as a large z-score.
+
+    Args:
+        sim: Configured simulator (seeded for a reproducible check)
+        simulations: Monte Carlo fights
+        engine: 'python', 'numpy' or 'auto'
+        batch_size: Fights per batch
+        max_states: State limit for the exact solver
+
+    Returns:
+        Dictionary with both result sets, per-metric z-scores, the largest
+        |z| and whether it is within EXACT_CHECK_MAX_Z
+    """
+    exact = sim.solve_exact(max_states=max_states)
+    monte_carlo = sim.run_simulations(simulations, engine=engine, batch_size=batch_size)
+    win_rate = exact['attacker_win_rate']
+    errors = {
+        'attacker_win_rate': math.sqrt(win_rate * (1 - win_rate) / simulations),
+        'average_turns': exact['turns_std'] / math.sqrt(simulations),
+    }
+    z = {
+        metric: (monte_carlo[metric] - exact[metric]) / error if error > 0
+        else (0.0 if monte_carlo[metric] == exact[metric] else math.inf)
+        for metric, error in errors.items()
+    }
+    max_z = max(abs(value) for value in z.values())
+    return {
+        'type': 'exact_check',
+        'simulations': simulations,
+        'exact': exact,
+        'monte_carlo': monte_carlo,
+        'z': z,
+        'max_abs_z': max_z,
+        'passed': max_z <= EXACT_CHECK_MAX_Z,
+    }
+
+
+def run_matchup(
+    sim: CombatSimulator,
+    simulations: Optional[int] = None,
+    exact: bool = False,
+    exact_max_states: int = DEFAULT_EXACT_MAX_STATES,
+    target_ci: Optional[float] = None,
+    target_ci_turns: Optional[float] = None,
+    confidence: float = 0.95,
+    engine: str = 'auto',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = 1,
+    checkpoint: Optional[Path] = None,
+    checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+    resume: bool = False,
+    progress: bool = False,
+) -> Dict[str, Any]:
+    """
+    Evaluate one matchup with the CLI's method selection.
+
+    --exact is tried first (falling back on a too-large state space), then
+    --target-ci adaptive sampling, then a fixed number of simulations (the
+    only mode that checkpoints, see run_simulations).
+
+    Args:
+        sim: Configured simulator
+        simulations: Fixed fight count, or the budget with target_ci
+        exact: Try the exact solver first
+        exact_max_states: State limit for the exact solver
+        target_ci: Required attacker_win_rate interval width (adaptive mode)
+        target_ci_turns: Optional required average_turns interval width
+        confidence: Confidence level for adaptive mode
+        engine: 'python', 'numpy' or 'auto'
+        batch_size: Fights per batch
+        workers: Worker processes for Monte Carlo
+        checkpoint: Checkpoint file for fixed-count runs
+        checkpoint_interval: Minimum seconds between checkpoint saves
+        resume: Continue from checkpoint if it exists
+        progress: Show a progress/ETA line on stderr
+
+    Returns:
+        Stats dictionary (with 'exact_fallback' if the exact solver gave up)
+    """
+    fallback_reason = None
+    if exact:
+        try:
+            return sim.solve_exact(max_states=exact_max_states)
+        except ValueError as e:
+            fallback_reason = str(e)
+
+    if target_ci:
+        results = sim.run_until_precision(
+            target_ci,
+            max_simulations=simulations or DEFAULT_MAX_ADAPTIVE_SIMULATIONS,
+            confidence=confidence,
+            turns_target_width=target_ci_turns,
+            engine=engine,
+            batch_size=batch_size,
+            workers=workers,
+        )
+    else:
+        results = sim.run_simulations(
+            simulations or 1000,
+            engine=engine,
+            batch_size=batch_size,
+            workers=workers,
+            checkpoint=checkpoint,
+            checkpoint_interval=checkpoint_interval,
+            resume=resume,
+            progress=progress,
+        )
+
+    if fallback_reason:
+        results['exact_fallback'] = fallback_reason
+    return results
+
+
+def profile_key(
+    stats: CombatStats,
+    abilities: List[Ability],
+    armor_formula: str,
+    armor_value: float,
+) -> Tuple:
+    """
+    Canonical key for everything that affects a combatant's fights.
+
+    Damage is keyed after armor, so profiles that differ only in fields the
+    configured armor formula ignores (the per-combatant armor stat, names,
+    ability order) share one key and one set of matchup results.
+    """
+    return (
+        stats.health,
+        apply_armor(stats.attack_power, armor_formula, armor_value),
+        apply_armor(stats.attack_power * stats.critical_multiplier, armor_formula, armor_value),
+        stats.critical_chance,
+        stats.dodge_chance,
+        stats.attack_speed,
+        tuple(sorted(
+            (a.cooldown, a.damage_multiplier, a.hit_chance, a.cast_time,
+             # Uncapped stacks as inf so ties on every other field stay comparable
+             tuple(spec[:4] + (math.inf if spec[4] is None else spec[4],) + spec[5:]
+                   for spec in effect_specs(stats, a)))
+            for a in abilities
+        )),
+    )
+
+
+def run_roster(
+    roster_config: Dict[str, Any],
+    seed: Optional[int] = None,
+    workers: int = 1,
+    **matchup_options: Any,
+) -> Dict[str, Any]:
+    """
+    Compute the all-pairs matchup matrix for a roster of combatants.
+
+    Identical profiles (see profile_key) are simulated once; each remaining
+    (attacker profile, defender profile) pair is one task on the process pool.
+    Roles are not folded together because the attacker always strikes first.
+
+    Args:
+        roster_config: {'combatants': [{'name': ..., stats..., 'abilities': [...]}],
+                        'armor_formula', 'armor_value', 'max_turns', 'timeline', 'max_time'}
+        seed: Base seed; each profile pair gets its own derived seed
+        workers: Worker processes to schedule pairs across
+        **matchup_options: Passed to run_matchup (simulations, exact, target_ci, ...)
+
+    Returns:
+        Matrix dictionary; row i / column j is combatant i attacking combatant j.
+        'options' holds each combatant's overall win rate in the format
+        fairness.py reads.
+    """
+    options = simulator_options(roster_config)
+    cls = options.pop('cls')
+    armor_formula = options['armor_formula']
+    armor_value = options['armor_value']
+
+    names: List[str] = []
+    profile_of: List[int] = []
+    profiles: List[Tuple[CombatStats, List[Ability]]] = []
+    profile_index: Dict[Tuple, int] = {}
+    for i, entry in enumerate(roster_config.get('combatants', [])):
+        stats, abilities = parse_combatant(entry)
+        key = profile_key(stats, abilities, armor_formula, armor_value)
+        if key not in profile_index:
+            profile_index[key] = len(profiles)
+            profiles.append((stats, abilities))
+        names.append(entry.get('name', f'combatant_{i}'))
+        profile_of.append(profile_index[key])
+
+    base_seed = seed if seed is not None else random.getrandbits(63)
+    pairs = sorted({(a, d) for a in profile_of for d in profile_of})
+    tasks = []
+    for a, d in pairs:
+        sim = cls(
+            attacker_stats=profiles[a][0],
+            defender_stats=profiles[d][0],
+            attacker_abilities=profiles[a][1],
+            defender_abilities=profiles[d][1],
+            seed=random.Random(f'{base_seed}:{a}:{d}').getrandbits(63),
+            **options,
+        )
+        tasks.append((sim, matchup_options))
+
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            pair_results = dict(zip(pairs, pool.map(_run_matchup_task, tasks)))
+    else:
+        pair_results = dict(zip(pairs, map(_run_matchup_task, tasks)))
+
+    n = len(names)
+    win_rate = [[0.0] * n for _ in range(n)]
+    loss_rate = [[0.0] * n for _ in range(n)]
+    average_turns = [[0.0] * n for _ in range(n)]
+    for i in range(n):
+        for j in range(n):
+            stats = pair_results[(profile_of[i], profile_of[j])]
+            win_rate[i][j] = stats['attacker_win_rate']
+            loss_rate[i][j] = stats['defender_win_rate']
+            average_turns[i][j] = stats['average_turns']
+
+    # Overall strength: win chance against every other combatant, averaged
+    # over attacking and defending so the first-strike edge cancels out
+    options: Dict[str, float] = {}
+    for i, name in enumerate(names):
+        others = [j for j in range(n) if j != i] or [i]
+        options[name] = sum(
+            (win_rate[i][j] + loss_rate[j][i]) / 2 for j in others
+        ) / len(others)
+
+    return {
+        'type': 'roster_matrix',
+        'metric': 'win_rate',
+        'combatants': names,
+        'unique_profiles': len(profiles),
+        'matchups_evaluated': len(pairs),
+        'win_rate': win_rate,
+        'average_turns': average_turns,
+        'options': options,
+    }
+
+
+def _run_matchup_task(task: Tuple[CombatSimulator, Dict[str, Any]]) -> Dict[str, Any]:
+    """Process-pool entry point for one roster matchup."""
+    sim, options = task
+    return run_matchup(sim, **options)
+
+
+def compare_matchups(
+    baseline: CombatSimulator,
+    candidate: CombatSimulator,
+    num_simulations: int,
+    seed: Optional[int] = None,
+    antithetic: bool = False,
+    confidence: float = 0.95,
+    engine: str = 'auto',
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Compare two configs on common random numbers and report the paired delta.
+
+    Fight k of batch b uses the same rolls under both configs, so the noise
+    that both runs share cancels in the per-fight difference and a patch delta
+    resolves with far fewer fights than two independent runs.
+
+    Args:
+        baseline: Simulator for the current config
+        candidate: Simulator for the patched config
+        num_simulations: Fights per config (rounded up to even with antithetic)
+        seed: Base seed shared by both configs
+        antithetic: Also pair each fight with a 1 - u mirrored fight (numpy only)
+        confidence: Confidence level of the delta intervals
+        engine: 'python', 'numpy' or 'auto'
+        batch_size: Fights per batch
+        workers: Worker processes
+
+    Returns:
+        Dict with baseline, candidate and delta statistics
+    """
+    engine = baseline._resolve_engine(engine)
+    if antithetic:
+        if engine != 'numpy':
+            raise ValueError("Antithetic variates require the numpy engine")
+        num_simulations += num_simulations % 2
+        batch_size += batch_size % 2
+
+    base_seed = seed if seed is not None else random.getrandbits(63)
+    tasks = [
+        (baseline, candidate, engine, base_seed, index,
+         min(batch_size, num_simulations - start), antithetic)
+        for index, start in enumerate(range(0, num_simulations, batch_size))
+    ]
+
+    comparison = PairedComparison(baseline.time_resolution)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for batch in pool.map(_run_paired_batch_task, tasks):
+                comparison.merge(batch)
+    else:
+        for task in tasks:
+            comparison.merge(_run_paired_batch_task(task))
+
+    stats = comparison.to_stats(confidence)
+    stats['antithetic'] = antithetic
+    return stats
+
+
+def _run_paired_batch_task(task: Tuple) -> PairedComparison:
+    """Run one batch of both configs on shared random numbers."""
+    baseline, candidate, engine, seed, index, size, antithetic = task
+    comparison = PairedComparison(baseline.time_resolution)
+
+    if engine == 'numpy':
+        outcomes = []
+        for sim in (baseline, candidate):
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+            result = sim.simulate_batch(size, rng, aligned=True, antithetic=antithetic)
+            outcomes.append(result)
+        comparison.baseline.add_batch(*outcomes[0])
+        comparison.candidate.add_batch(*outcomes[1])
+
+        win_delta = (
+            (outcomes[1][0] == WINNER_ATTACKER).astype(np.float64)
+            - (outcomes[0][0] == WINNER_ATTACKER)
+        )
+        turns_delta = outcomes[1][1].astype(np.float64) - outcomes[0][1]
+        if antithetic:
+            half = size // 2
+            win_delta = (win_delta[:half] + win_delta[half:]) / 2
+            turns_delta = (turns_delta[:half] + turns_delta[half:]) / 2
+        comparison.win_delta.add_array(win_delta)
+        comparison.turns_delta.add_array(turns_delta)
+        return comparison
+
+    # Python engine: reseed both simulators identically before every fight
+    sims = [copy.copy(baseline), copy.copy(candidate)]
+    for sim in sims:
+        sim.rng = random.Random()
+    for k in range(size):
+        results = []
+        for sim in sims:
+            sim.rng.seed(f'{seed}:{index}:{k}')
+            results.append(sim.simulate_combat())
+        comparison.baseline.add_fight(*results[0])
+        comparison.candidate.add_fight(*results[1])
+        comparison.win_delta.add(
+            (results[1][0] == 'attacker') - (results[0][0] == 'attacker')
+        )
+        comparison.turns_delta.add(results[1][1] - results[0][1])
+    return comparison
+
+
+def matchup_cache_key(
+    cache: ResultCache,
+    mode: str,
+    seed: Optional[int],
+    engine: str,
+    **inputs: Any,
+) -> Optional[str]:
+    """
+    Result cache key for a CLI run (None for unseeded runs, which are not cached).
+
+    'auto' is keyed as the engine it resolves to here, since numpy and python
+    runs of the same seed differ.
+    """
+    if seed is None:
+        return None
+    if engine == 'auto':
+        engine = 'numpy' if np is not None else 'python'
+    return cache.key(f'combat_sim:{mode}', source_version(__file__),
+                     seed=seed, engine=engine, **inputs)
+
+
+def run_batch(
+    lines: Iterable[str],
+    out: TextIO,
+    seed: Optional[int] = None,
+    timeline: bool = False,
+    workers: int = 1,
+    cache: Optional[ResultCache] = None,
+    **matchup_options: Any,
+) -> Dict[str, int]:
+    """
+    Simulate a stream of JSONL matchup configs, writing one JSON line per result.
+
+    Each input line is a --config document, optionally with an "id" (default:
+    its line number) and a "seed" overriding the run seed. A line gives the
+    same result, and shares the cache entry, as running its config alone with
+    that seed. Matchups are spread across worker processes, one matchup per
+    task, and written as they finish -- in completion order when workers > 1,
+    so match results to inputs by "id". At most a few tasks per worker are in
+    flight and every line is flushed once written, so memory stays flat for
+    any batch size and the output can be piped into other tools.
+
+    A line that fails to parse or simulate produces {"id", "error"} instead
+    of stopping the batch.
+
+    Args:
+        lines: Input lines (a file object or sys.stdin)
+        out: Output stream for result lines
+        seed: Default seed for lines without their own
+        timeline: Use the continuous-time engine for every line (--timeline)
+        workers: Worker processes
+        cache: Result cache (None disables caching; unseeded lines are not cached)
+        **matchup_options: Passed to run_matchup (simulations, exact, target_ci, ...)
+
+    Returns:
+        Counts: matchups, errors, cached
+    """
+    counts = {'matchups': 0, 'errors': 0, 'cached': 0}
+
+    def emit(result: Dict[str, Any], key: Optional[str] = None) -> None:
+        if 'error' in result:
+            counts['errors'] += 1
+        elif key is not None:
+            cache.put(key, {k: v for k, v in result.items() if k != 'id'})
+        counts['matchups'] += 1
+        out.write(json.dumps(result) + '\n')
+        out.flush()
+
+    def tasks():
+        """Yield (task, cache key) per line; cache hits and bad lines are emitted directly."""
+        for line_number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                config = json.loads(line)
+                if not isinstance(config, dict):
+                    raise ValueError('matchup line must be a JSON object')
+            except ValueError as e:
+                emit({'id': line_number, 'error': f'invalid JSON: {e}'})
+                continue
+            matchup_id = config.pop('id', line_number)
+            line_seed = config.pop('seed', seed)
+            config['timeline'] = config.get('timeline') or timeline
+
+            key = None
+            if cache is not None:
+                key = matchup_cache_key(cache, 'matchup', line_seed, matchup_options['engine'],
+                                        config=config, options=matchup_options)
+                cached = cache.get(key) if key is not None else None
+                if key is None:
+                    cache.bypassed += 1
+                elif cached is not None:
+                    counts['cached'] += 1
+                    emit({'id': matchup_id, **cached})
+                    continue
+            yield (matchup_id, config, line_seed, matchup_options), key
+
+    if workers <= 1:
+        for task, key in tasks():
+            emit(_run_batch_line(task), key)
+        return counts
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        pending: Dict[Any, Optional[str]] = {}
+        for task, key in tasks():
+            pending[pool.submit(_run_batch_line, task)] = key
+            if len(pending) >= 4 * workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit(future.result(), pending.pop(future))
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                emit(future.result(), pending.pop(future))
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+    return counts
+
+
+def _run_batch_line(task: Tuple[Any, Dict[str, Any], Optional[int], Dict[str, Any]]) -> Dict[str, Any]:
+    """Process-pool entry point: simulate one --batch line."""
+    matchup_id, config, seed, options = task
+    try:
+        result = run_matchup(build_simulator(config, seed=seed), **options)
+    except Exception as e:  # one bad line must never stop the stream
+        return {'id': matchup_id, 'error': f'{type(e).__name__}: {e}'}
+    return {'id': matchup_id, **result}
+
+
+def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(description='Monte Carlo combat simulator')
     parser.add_argument(
         '--config',
         type=Path,
-        required=True,
+        default=None,
         help='Combat configuration JSON file'
     )
+    parser.add_argument(
+        '--roster',
+        type=Path,
+        default=None,
+        help='Roster JSON ({"combatants": [...]}); computes the all-pairs matchup matrix'
+    )
+    parser.add_argument(
+        '--batch',
+        type=Path,
+        default=None,
+        help='JSONL file of matchup configs (one per line, "-" for stdin); streams one '
+             'JSON result line per matchup to --output (default: stdout)'
+    )
     parser.add_argument(
         '--simulations',
         type=int,
-        default=1000,
-        help='Number of simulations to run'
+        default=None,
+        help=(
+            'Number of simulations to run (default: 1000); with --target-ci, '
+            f'the maximum fight budget (default: {DEFAULT_MAX_ADAPTIVE_SIMULATIONS})'
+        )
+    )
+    parser.add_argument(
+        '--target-ci',
+        type=float,
+        default=None,
+        help='Stop once the attacker win rate interval is narrower than this (e.g. 0.01)'
+    )
+    parser.add_argument(
+        '--target-ci-turns',
+        type=float,
+        default=None,
+        help='With --target-ci, also require this average_turns interval width'
+    )
+    parser.add_argument(
+        '--confidence',
+        type=float,
+        default=0.95,
+        help='Confidence level for --target-ci intervals (default: 0.95)'
+    )
+    parser.add_argument(
+        '--compare',
+        type=Path,
+        default=None,
+        help='Candidate config to compare against --config on common random numbers'
+    )
+    parser.add_argument(
+        '--antithetic',
+        action='store_true',
+        help='With --compare, add antithetic variates (numpy engine)'
+    )
+    parser.add_argument(
+        '--exact',
+        action='store_true',
+        help='Solve the outcome distribution exactly (falls back to Monte Carlo '
+             'when the state space is too large)'
+    )
+    parser.add_argument(
+        '--exact-max-states',
+        type=int,
+        default=DEFAULT_EXACT_MAX_STATES,
+        help=f'Live states per side before --exact falls back (default: {DEFAULT_EXACT_MAX_STATES})'
+    )
+    parser.add_argument(
+        '--check-exact',
+        action='store_true',
+        help='Regression check: compare --exact against a Monte Carlo run '
+             f'(--simulations, default {DEFAULT_CHECK_SIMULATIONS}); exits 1 if any '
+             f'|z| > {EXACT_CHECK_MAX_Z:g}'
+    )
+    parser.add_argument(
+        '--rare-event',
+        choices=['attacker', 'defender'],
+        default=None,
+        help='Estimate the probability that this side wins by importance sampling '
+             f'(for rare upsets; --simulations defaults to {DEFAULT_RARE_SIMULATIONS})'
+    )
+    parser.add_argument(
+        '--timeline',
+        action='store_true',
+        help='Continuous-time engine: attack_speed, cast_time and cooldowns in seconds '
+             '(same as "timeline": true in the config)'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['auto', 'python', 'numpy'],
+        default='auto',
+        help='Simulation engine (default: auto = numpy batch engine when installed)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducibility'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Worker processes to shard simulations across (default: 1)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Fights per batch/shard (default: {DEFAULT_BATCH_SIZE})'
+    )
+    parser.add_argument(
+        '--trace',
+        type=Path,
+        default=None,
+        help='Record per-turn traces of sampled fights to this file (python engine)'
+    )
+    parser.add_argument(
+        '--trace-policy',
+        default='all',
+        help="Which fights to trace: all, draws, attacker_wins, defender_wins, "
+             "ttk>N or ttk>pXX (default: all)"
+    )
+    parser.add_argument(
+        '--trace-capacity',
+        type=int,
+        default=DEFAULT_TRACE_FIGHTS,
+        help=f'Maximum fights stored in the trace file (default: {DEFAULT_TRACE_FIGHTS})'
+    )
+    parser.add_argument(
+        '--read-trace',
+        type=Path,
+        default=None,
+        help='Print a fight from a trace file instead of simulating (see --fight)'
+    )
+    parser.add_argument(
+        '--fight',
+        type=int,
+        default=0,
+        help='Stored fight index to print with --read-trace (default: 0)'
     )
+    parser.add_argument(
+        '--checkpoint',
+        type=Path,
+        default=None,
+        help='Periodically save run state here so a pre-empted run can --resume'
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=float,
+        default=DEFAULT_CHECKPOINT_INTERVAL,
+        help=f'Seconds between checkpoint saves (default: {DEFAULT_CHECKPOINT_INTERVAL:.0f})'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue the run saved in --checkpoint (identical result to an uninterrupted run)'
+    )
+    parser.add_argument(
+        '--progress',
+        action='store_true',
+        help='Show a progress/ETA line (always on with --checkpoint)'
+    )
+    add_cache_arguments(parser)
     parser.add_argument(
         '--output',
         type=Path,
-        default=Path('combat_results.json'),
-        help='Output path for results JSON'
+        default=None,
+        help='Output path for results JSON (default: combat_results.json; '
+             'stdout with --batch)'
     )
 
     args = parser.parse_args()
+    cache = cache_from_args(args)
+    if args.output is None and not args.batch:
+        args.output = Path('combat_results.json')
+
+    if args.resume and args.checkpoint is None:
+        parser.error('--resume needs --checkpoint')
+    if args.target_ci is not None and args.target_ci <= 0:
+        parser.error('--target-ci must be positive')
+    if args.target_ci_turns is not None and args.target_ci_turns <= 0:
+        parser.error('--target-ci-turns must be positive')
+    if args.checkpoint and (args.roster or args.batch or args.compare or args.trace
+                            or args.rare_event or args.exact or args.target_ci):
+        parser.error('--checkpoint applies to fixed-count --config runs only')
+    if args.checkpoint:
+        # Pre-emption usually arrives as SIGTERM; raise SystemExit so the
+        # run saves a final checkpoint on the way out
+        signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    run_options = {
+        'checkpoint': args.checkpoint,
+        'checkpoint_interval': args.checkpoint_interval,
+        'resume': args.resume,
+        'progress': args.progress or args.checkpoint is not None,
+    }
+
+    def cached(mode: str, compute, **inputs: Any) -> Dict[str, Any]:
+        """Run compute() through the result cache (seeded runs only)."""
+        if cache is None:
+            return compute()
+        key = matchup_cache_key(cache, mode, args.seed, args.engine, **inputs)
+        return cache.get_or_compute(key, compute)
+
+    matchup_options = {
+        'simulations': args.simulations,
+        'exact': args.exact,
+        'exact_max_states': args.exact_max_states,
+        'target_ci': args.target_ci,
+        'target_ci_turns': args.target_ci_turns,
+        'confidence': args.confidence,
+        'engine': args.engine,
+        'batch_size': args.batch_size,
+    }
+
+    if args.read_trace:
+        outcomes = {OUTCOME_HIT: 'hit', OUTCOME_DODGED: 'dodged',
+                    OUTCOME_MISSED: 'missed', OUTCOME_NO_ACTION: '-'}
+        with TraceReader(args.read_trace) as reader:
+            fight = reader.fight(args.fight)
+            print(f"Fight {fight['fight_number']} ({args.fight + 1} of {len(reader)} stored"
+                  f"{', file truncated' if reader.truncated else ''}): "
+                  f"{fight['winner']} after {fight['turns']} turns")
+        print(f"  {'turn':>5} {'att hp':>8} {'def hp':>8}  attacker                 defender")
+        for r in fight['records']:
+            sides = []
+            for side in ('attacker', 'defender'):
+                ability = 'basic' if r[f'{side}_ability'] < 0 else f"ability {r[f'{side}_ability']}"
+                crit = ' crit' if r[f'{side}_crit'] else ''
+                sides.append(f"{ability} {outcomes[r[f'{side}_outcome']]}{crit} "
+                             f"{r[f'{side}_damage']:.1f}".ljust(24))
+            print(f"  {r['turn']:>5} {r['attacker_hp']:>8.1f} {r['defender_hp']:>8.1f}  "
+                  f"{sides[0]} {sides[1]}")
+        return
+
+    if args.batch:
+        # Result lines may go to stdout, so progress and summary go to stderr
+        source = sys.stdin if str(args.batch) == '-' else open(args.batch, 'r')
+        if args.output is None or str(args.output) == '-':
+            out = sys.stdout
+        else:
+            args.output.parent.mkdir(parents=True, exist_ok=True)
+            out = open(args.output, 'w')
+        print(f"Running batch matchups from {args.batch} on {args.workers} "
+              f"worker{'s' if args.workers != 1 else ''}...", file=sys.stderr)
+        try:
+            counts = run_batch(source, out, seed=args.seed, timeline=args.timeline,
+                               workers=args.workers, cache=cache, **matchup_options)
+        except BrokenPipeError:
+            # Downstream reader went away (e.g. `| head`); stop quietly
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+        finally:
+            for stream in (source, out):
+                if stream not in (sys.stdin, sys.stdout):
+                    stream.close()
+
+        print(f"\nBatch Results:", file=sys.stderr)
+        print(f"  Matchups: {counts['matchups']} ({counts['cached']} from cache, "
+              f"{counts['errors']} failed)", file=sys.stderr)
+        if cache is not None:
+            print(f"\n{cache.report()}", file=sys.stderr)
+        if out is not sys.stdout:
+            print(f"\nSaved results to: {args.output}", file=sys.stderr)
+        return
+
+    if args.roster:
+        roster_config = load_config(args.roster)
+        roster_config['timeline'] = roster_config.get('timeline') or args.timeline
+        count = len(roster_config.get('combatants', []))
+        print(f"Evaluating {count}x{count} roster matchup matrix...")
+        try:
+            matrix = cached(
+                'roster',
+                lambda: run_roster(roster_config, seed=args.seed, workers=args.workers, **matchup_options),
+                config=roster_config, options=matchup_options,
+            )
+        except ValueError as e:
+            parser.error(f'{args.roster}: {e}')
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(matrix, f, indent=2)
+
+        print(f"\nRoster Results:")
+        print(f"  Combatants: {count} ({matrix['unique_profiles']} unique profiles)")
+        print(f"  Matchups evaluated: {matrix['matchups_evaluated']} of {count * count}")
+        print(f"\n  Overall win rate:")
+        for name, rate in sorted(matrix['options'].items(), key=lambda kv: -kv[1]):
+            print(f"    {name}: {rate:.2%}")
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved matrix to: {args.output}")
+        return
+
+    if args.config is None:
+        parser.error('one of --config, --roster, --batch or --read-trace is required')
 
     # Load configuration
     config = load_config(args.config)
+    config['timeline'] = config.get('timeline') or args.timeline
+    try:
+        sim = build_simulator(config, seed=args.seed)
+    except ValueError as e:
+        parser.error(f'{args.config}: {e}')
+    if args.engine == 'numpy' and sim.has_effects:
+        parser.error('status effects need the python engine (drop --engine numpy)')
 
-    # Create combatant stats
-    attacker_config = config.get('attacker', {})
-    defender_config = config.get('defender', {})
+    if args.compare:
+        candidate_config = load_config(args.compare)
+        candidate_config['timeline'] = config['timeline']
+        try:
+            candidate = build_simulator(candidate_config, seed=args.seed)
+        except ValueError as e:
+            parser.error(f'{args.compare}: {e}')
+        if args.engine == 'numpy' and candidate.has_effects:
+            parser.error('status effects need the python engine (drop --engine numpy)')
+        num_simulations = args.simulations or 1000
+        print(f"Comparing {args.config.name} vs {args.compare.name} on "
+              f"{num_simulations} paired fights...")
+        comparison = cached(
+            'compare',
+            lambda: compare_matchups(
+                sim, candidate, num_simulations,
+                seed=args.seed,
+                antithetic=args.antithetic,
+                confidence=args.confidence,
+                engine=args.engine,
+                batch_size=args.batch_size,
+                workers=args.workers,
+            ),
+            config=config, candidate=candidate_config, simulations=num_simulations,
+            antithetic=args.antithetic, confidence=args.confidence, batch_size=args.batch_size,
+        )
 
-    attacker_stats = CombatStats(
-        health=attacker_config.get('health', 100),
-        attack_power=attacker_config.get('attack_power', 10),
-        armor=attacker_config.get('armor', 0),
-        critical_chance=attacker_config.get('critical_chance', 0.1),
-        critical_multiplier=attacker_config.get('critical_multiplier', 1.5),
-        dodge_chance=attacker_config.get('dodge_chance', 0),
-    )
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(comparison, f, indent=2)
 
-    defender_stats = CombatStats(
-        health=defender_config.get('health', 100),
-        attack_power=defender_config.get('attack_power', 10),
-        armor=defender_config.get('armor', 0),
-        critical_chance=defender_config.get('critical_chance', 0.1),
-        critical_multiplier=defender_config.get('critical_multiplier', 1.5),
-        dodge_chance=defender_config.get('dodge_chance', 0),
-    )
+        print(f"\nPaired Comparison ({args.confidence:.0%} confidence):")
+        for metric, fmt in (('attacker_win_rate', '.2%'), ('average_turns', '.2f')):
+            d = comparison['delta'][metric]
+            base = comparison['baseline'][metric]
+            cand = comparison['candidate'][metric]
+            vrf = d['variance_reduction_factor']
+            print(f"  {metric}: {base:{fmt}} -> {cand:{fmt}}  "
+                  f"delta {d['estimate']:+{fmt}} [{d['ci'][0]:+{fmt}}, {d['ci'][1]:+{fmt}}]"
+                  f"{' (significant)' if d['significant'] else ''}")
+            if vrf:
+                print(f"    variance reduction vs independent runs: {vrf:.1f}x")
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved comparison to: {args.output}")
+        return
 
-    # Create abilities
-    attacker_abilities = [
-        Ability(
-            name=a.get('name', f'ability_{i}'),
-            cooldown=a.get('cooldown', 3),
-            damage_multiplier=a.get('damage_multiplier', 1.5),
-            hit_chance=a.get('hit_chance', 1.0),
-        )
-        for i, a in enumerate(attacker_config.get('abilities', []))
-    ]
+    if args.check_exact:
+        num_simulations = args.simulations or DEFAULT_CHECK_SIMULATIONS
+        print(f"Checking the exact solver against {num_simulations} simulated fights...")
+        check = check_exact(sim, num_simulations, engine=args.engine,
+                            batch_size=args.batch_size, max_states=args.exact_max_states)
 
-    defender_abilities = [
-        Ability(
-            name=a.get('name', f'ability_{i}'),
-            cooldown=a.get('cooldown', 3),
-            damage_multiplier=a.get('damage_multiplier', 1.5),
-            hit_chance=a.get('hit_chance', 1.0),
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(check, f, indent=2)
+
+        print(f"\nExact vs Monte Carlo ({num_simulations} fights):")
+        for metric, z in check['z'].items():
+            print(f"  {metric}: exact {check['exact'][metric]:.6f}, "
+                  f"simulated {check['monte_carlo'][metric]:.6f} (z = {z:+.2f})")
+        print(f"  {'PASS' if check['passed'] else 'FAIL'}: max |z| {check['max_abs_z']:.2f} "
+              f"(limit {EXACT_CHECK_MAX_Z:g})")
+        print(f"\nSaved check to: {args.output}")
+        if not check['passed']:
+            sys.exit(1)
+        return
+
+    if args.rare_event:
+        if isinstance(sim, TimelineSimulator):
+            parser.error('--rare-event needs the turn engine (drop --timeline)')
+        num_simulations = args.simulations or DEFAULT_RARE_SIMULATIONS
+        print(f"Estimating P({args.rare_event} wins) by importance sampling "
+              f"({num_simulations} weighted fights)...")
+        estimate = cached(
+            'rare',
+            lambda: estimate_rare_event(sim, args.rare_event, num_simulations, args.confidence),
+            config=config, target=args.rare_event, simulations=num_simulations,
+            confidence=args.confidence,
         )
-        for i, a in enumerate(defender_config.get('abilities', []))
-    ]
 
-    # Create simulator
-    sim = CombatSimulator(
-        attacker_stats=attacker_stats,
-        defender_stats=defender_stats,
-        attacker_abilities=attacker_abilities,
-        defender_abilities=defender_abilities,
-        armor_formula=config.get('armor_formula', 'flat'),
-        armor_value=config.get('armor_value', 0),
-        max_turns=config.get('max_turns', 1000),
-    )
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(estimate, f, indent=2)
+
+        low, high = estimate['ci']
+        print(f"\nRare Event ({estimate['confidence']:.0%} confidence):")
+        print(f"  P({estimate['target']} wins): {estimate['probability']:.3e} "
+              f"[{low:.3e}, {high:.3e}]")
+        if estimate['relative_error'] is not None:
+            print(f"  Relative error: {estimate['relative_error']:.1%}; "
+                  f"effective samples: {estimate['effective_sample_size']:.0f} "
+                  f"of {estimate['target_hits']} target wins")
+        if estimate['speedup']:
+            print(f"  Plain Monte Carlo would need ~{estimate['naive_equivalent_simulations']:,.0f} "
+                  f"fights ({estimate['speedup']:,.0f}x the "
+                  f"{estimate['simulations'] + estimate['pilot_simulations']} used)")
+        if not estimate['proposal_reached_target']:
+            print(f"  Warning: proposal tuning did not reach {estimate['target']} wins "
+                  f"after {estimate['ce_iterations']} rounds; estimate may be unreliable")
+        print(f"  Biased rolls (nominal -> proposal):")
+        for category, p in estimate['proposal'].items():
+            print(f"    {category}: {p['nominal']:.3f} -> {p['proposal']:.3f}")
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved estimate to: {args.output}")
+        return
+
+    if args.trace and isinstance(sim, TimelineSimulator):
+        parser.error('--trace records turns and needs the turn engine (drop --timeline)')
+    if args.trace:
+        num_simulations = args.simulations or 1000
+        print(f"Running {num_simulations} traced combat simulations "
+              f"(policy: {args.trace_policy})...")
+        results = record_traces(
+            sim, num_simulations, args.trace,
+            policy=args.trace_policy,
+            max_fights=args.trace_capacity,
+            batch_size=args.batch_size,
+        )
+    else:
+        # Run simulations
+        if args.exact:
+            print("Solving combat outcome distribution exactly...")
+        elif args.target_ci:
+            print(
+                f"Running combat simulations until the win rate {args.confidence:.0%} "
+                f"interval is narrower than {args.target_ci} "
+                f"(max {args.simulations or DEFAULT_MAX_ADAPTIVE_SIMULATIONS})..."
+            )
+        elif args.workers > 1:
+            print(f"Running {args.simulations or 1000} combat simulations on {args.workers} workers...")
+        else:
+            print(f"Running {args.simulations or 1000} combat simulations...")
 
-    # Run simulations
-    print(f"Running {args.simulations} combat simulations...")
-    results = sim.run_simulations(args.simulations)
+        if args.resume and args.checkpoint.exists():
+            print(f"Resuming from {args.checkpoint}...")
+        try:
+            results = cached(
+                'matchup',
+                lambda: run_matchup(sim, workers=args.workers, **run_options, **matchup_options),
+                config=config, options=matchup_options,
+            )
+        except ValueError as e:
+            if not args.resume:
+                raise
+            parser.error(str(e))
+        if 'exact_fallback' in results:
+            print(f"{results['exact_fallback']}; fell back to Monte Carlo.")
 
     # Save results
     args.output.parent.mkdir(parents=True, exist_ok=True)
@@ -357,9 +4124,37 @@ def main():
     print(f"  Attacker win rate: {results['attacker_win_rate']:.2%}")
     print(f"  Defender win rate: {results['defender_win_rate']:.2%}")
     print(f"  Draw rate: {results['draw_rate']:.2%}")
-    print(f"  Average turns: {results['average_turns']:.1f}")
+    if results.get('time_unit') == 'seconds':
+        print(f"  Average TTK: {results['average_turns']:.2f}s "
+              f"(std {results['turns_std']:.2f}s, P50/P90/P99 "
+              f"{results['turns_p50']:.2f}/{results['turns_p90']:.2f}/{results['turns_p99']:.2f}s)")
+        print(f"  Model TTK (basic attacks, optimizer formula): "
+              f"attacker {results['model']['attacker']['ttk']:.2f}s, "
+              f"defender {results['model']['defender']['ttk']:.2f}s")
+    else:
+        print(f"  Average turns: {results['average_turns']:.1f} "
+              f"(std {results['turns_std']:.1f}, P50/P90/P99 "
+              f"{results['turns_p50']:.0f}/{results['turns_p90']:.0f}/{results['turns_p99']:.0f})")
     print(f"  Avg attacker damage: {results['avg_attacker_damage']:.1f}")
     print(f"  Avg defender damage: {results['avg_defender_damage']:.1f}")
+    if 'attacker_win_rate_ci' in results:
+        low, high = results['attacker_win_rate_ci']
+        status = 'reached' if results['target_ci_reached'] else 'NOT reached (budget exhausted)'
+        print(f"\nPrecision ({results['confidence']:.0%} confidence):")
+        print(f"  Attacker win rate interval: [{low:.2%}, {high:.2%}] "
+              f"(width {results['attacker_win_rate_ci_width']:.4f})")
+        low, high = results['average_turns_ci']
+        print(f"  Average turns interval: [{low:.2f}, {high:.2f}]")
+        print(f"  Fights used: {results['simulations']}; target {status}")
+    if cache is not None and not args.trace:
+        print(f"\n{cache.report()}")
+    if 'trace' in results:
+        trace = results['trace']
+        print(f"\nTrace ({trace['description']}):")
+        print(f"  Fights matched: {trace['fights_matched']}; stored: {trace['fights_written']} "
+              f"({trace['records_written']} turn records)"
+              f"{'; capacity reached, later fights dropped' if trace['truncated'] else ''}")
+        print(f"  Read with: --read-trace {trace['path']} --fight K")
     print(f"\nSaved results to: {args.output}")
 
 
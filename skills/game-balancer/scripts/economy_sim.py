@@ -4,13 +4,72 @@ Economy flow simulator for game balancing.
 
 Simulates currency flow over time with configurable sources (faucets) and
 drains (sinks). Analyzes inflation/deflation, affordability, and balance.
+
+Faucets and sinks may be limited to a window of turns (start_turn/end_turn)
+or change amount on a schedule. The flow is then piecewise constant, and each
+constant segment is integrated in closed form, so a run costs O(segments)
+rather than O(turns): a per-minute ten-year horizon is as cheap as a year of
+daily turns. The balance history is sampled from the same segments.
+
+Population mode (--population, or any economy-snapshot style config) is an
+agent-based model of a heterogeneous player base instead of one
+representative player. Stochastic mode (--stochastic) draws noisy faucet and
+sink amounts for thousands of trajectories and reports percentile bands.
+Both need NumPy.
+
+Sensitivity mode (--sensitivity) ranks faucets and sinks by the derivative
+of final balance, inflation rate and time to afford with respect to their
+amounts, computed analytically from the same segments in one pass.
+
+Multi-currency mode (a config with "currencies" and "flows") treats faucets,
+sinks and conversions between currencies as a flow graph and reports
+inflation per currency.
 """
 
 import argparse
+import bisect
+import heapq
 import json
 import math
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
+
+from sim_cache import add_cache_arguments, cache_from_args, source_version
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; only population mode needs it
+    np = None
+
+
+# Balance history samples kept by default; shorter runs keep every turn
+DEFAULT_HISTORY_POINTS = 10_000
+
+# Population mode: spread of per-player play time (lognormal sigma around the
+# segment average), day-to-day play time variation (coefficient of variation)
+# and spread of starting balances (lognormal sigma around the segment average)
+DEFAULT_PLAYTIME_SIGMA = 0.5
+DEFAULT_DAILY_PLAYTIME_CV = 0.5
+DEFAULT_BALANCE_SIGMA = 1.0
+
+# Wealth percentiles reported per day in population mode
+WEALTH_PERCENTILES = (10, 25, 50, 75, 90, 99)
+
+# Stochastic mode: trajectories simulated together, and the balance
+# percentiles reported as bands
+DEFAULT_TRAJECTORIES = 10_000
+DEFAULT_BAND_PERCENTILES = (5, 50, 95)
+DISTRIBUTIONS = ('normal', 'lognormal', 'uniform', 'poisson')
+STOCHASTIC_BLOCK_ELEMENTS = 1 << 20  # turns x trajectories drawn per block
+
+# Purchase mode: purchase events kept in the output log
+PURCHASE_LOG_LIMIT = 1000
+
+# Multi-currency mode: turns advanced per matrix product with NumPy, and the
+# largest currency count stepped with dense stacked powers (block x n x n
+# floats); larger graphs step one sparse product per turn
+MULTI_CURRENCY_BLOCK_TURNS = 1024
+MULTI_CURRENCY_DENSE_MAX = 32
 
 
 class EconomySimulator:
@@ -23,22 +82,42 @@ class EconomySimulator:
         sinks: List[Dict[str, float]],
         target_items: Dict[str, float] = None,
         max_turns: int = 365,
+        history_points: Optional[int] = DEFAULT_HISTORY_POINTS,
     ):
         """
         Initialize economy simulator.
 
         Args:
             initial_currency: Starting currency amount per player
-            faucets: List of currency sources, each with 'name' and 'amount' (per turn)
-            sinks: List of currency drains, each with 'name' and 'amount' (per turn)
-            target_items: Dictionary of item names and their costs
+            faucets: List of currency sources, each with 'name' and 'amount' (per turn),
+                     and optionally 'start_turn'/'end_turn' (first/last paying turn,
+                     inclusive) and 'schedule' ([{'from_turn': t, 'amount': a}, ...]
+                     amount changes)
+            sinks: List of currency drains, same format as faucets
+            target_items: Dictionary of item names and their costs (or, for
+                          purchase mode, {'cost', 'priority', 'available_from',
+                          'repeat_every', 'count'} dicts)
             max_turns: Number of turns to simulate
+            history_points: Balance history samples to report (every turn when the
+                            run is shorter; None for every turn, 0 for none)
         """
         self.initial_currency = initial_currency
         self.faucets = faucets
         self.sinks = sinks
         self.target_items = target_items or {}
+        self.item_costs = {
+            name: item['cost'] if isinstance(item, dict) else item
+            for name, item in self.target_items.items()
+        }
         self.max_turns = max_turns
+        self.history_points = history_points
+        self.segments = self.flow_segments()
+        self._segment_starts = [first for first, _, _, _ in self.segments]
+        self._segment_balances = [initial_currency]
+        for first, last, faucet_rate, sink_rate in self.segments[:-1]:
+            self._segment_balances.append(
+                self._segment_balances[-1] + (faucet_rate - sink_rate) * (last - first + 1)
+            )
 
     def calculate_faucet_total(self) -> float:
         """Get total currency generated per turn."""
@@ -48,6 +127,96 @@ class EconomySimulator:
         """Get total currency removed per turn."""
         return sum(s.get('amount', 0) for s in self.sinks)
 
+    def flow_segments(self) -> List[Tuple[int, Optional[int], float, float]]:
+        """
+        Split time into runs of turns with constant faucet and sink totals.
+
+        Returns:
+            (first_turn, last_turn, faucet_rate, sink_rate) per segment, in turn
+            order from turn 1; the last segment is open-ended (last_turn None)
+            and holds the flow after every scheduled change
+        """
+        changes: Dict[int, List[float]] = {1: [0.0, 0.0]}
+        for side, sources in ((0, self.faucets), (1, self.sinks)):
+            for source in sources:
+                previous = 0.0
+                for turn, amount in _source_steps(source):
+                    changes.setdefault(turn, [0.0, 0.0])[side] += amount - previous
+                    previous = amount
+
+        segments = []
+        turns = sorted(changes)
+        faucet_rate = sink_rate = 0.0
+        for i, turn in enumerate(turns):
+            faucet_rate += changes[turn][0]
+            sink_rate += changes[turn][1]
+            last = turns[i + 1] - 1 if i + 1 < len(turns) else None
+            segments.append((turn, last, faucet_rate, sink_rate))
+        return segments
+
+    def balance_at(self, turn: float) -> float:
+        """Balance after ``turn`` turns (fractional turns interpolate linearly)."""
+        if turn <= 0:
+            return self.initial_currency
+        i = bisect.bisect_right(self._segment_starts, turn + 1) - 1
+        first, _, faucet_rate, sink_rate = self.segments[i]
+        return self._segment_balances[i] + (faucet_rate - sink_rate) * (turn - first + 1)
+
+    def time_to_reach(self, amount: float) -> float:
+        """
+        First (fractional) turn at which the balance reaches amount.
+
+        The final segment's flow continues past max_turns, so an amount that
+        needs longer than the horizon still gets a finite answer if the
+        long-run flow is positive.
+
+        Returns:
+            Turns needed (0 if already held, inf if never reached)
+        """
+        if amount <= self.initial_currency:
+            return 0
+        i = self._reach_segment(amount)
+        if i is None:
+            return float('inf')
+        first, _, faucet_rate, sink_rate = self.segments[i]
+        return first - 1 + (amount - self._segment_balances[i]) / (faucet_rate - sink_rate)
+
+    def _reach_segment(self, amount: float) -> Optional[int]:
+        """Index of the segment in which the balance first reaches amount (None: never)."""
+        for i, ((first, last, faucet_rate, sink_rate), start) in enumerate(
+                zip(self.segments, self._segment_balances)):
+            net_flow = faucet_rate - sink_rate
+            if net_flow <= 0:
+                continue
+            if last is None or (amount - start) / net_flow <= last - first + 1:
+                return i
+        return None
+
+    def balance_history(self) -> Tuple[Optional[List[int]], List[float]]:
+        """
+        Balance after every turn, or evenly spaced samples for long runs.
+
+        Returns:
+            (turns, balances); turns is None when every turn is included
+        """
+        turns = self.history_turns()
+        if turns == []:
+            return None, []
+        if turns is None:
+            history = [self.initial_currency]
+            for (first, last, faucet_rate, sink_rate), start in zip(self.segments, self._segment_balances):
+                if first > self.max_turns:
+                    break
+                end = self.max_turns if last is None else min(last, self.max_turns)
+                net_flow = faucet_rate - sink_rate
+                history.extend(start + net_flow * k for k in range(1, end - first + 2))
+            return None, history
+        return turns, [self.balance_at(t) for t in turns]
+
+    def history_turns(self) -> Optional[List[int]]:
+        """Turns sampled for history output (None: every turn; []: no history)."""
+        return history_sample_turns(self.max_turns, self.history_points)
+
     def simulate(self) -> Dict[str, Any]:
         """
         Run economy simulation.
@@ -55,36 +224,41 @@ class EconomySimulator:
         Returns:
             Dictionary with simulation results
         """
-        balance_history = [self.initial_currency]
-        current_balance = self.initial_currency
+        # Balances are linear within a segment, so the extremes over the run
+        # are among the segment boundaries
+        horizon = [s for s in self.segments if s[0] <= self.max_turns]
+        boundary_balances = [self.initial_currency]
+        faucet_sum = sink_sum = 0.0
+        for (first, last, faucet_rate, sink_rate), start in zip(horizon, self._segment_balances):
+            end = self.max_turns if last is None else min(last, self.max_turns)
+            boundary_balances.append(start + (faucet_rate - sink_rate) * (end - first + 1))
+            faucet_sum += faucet_rate * (end - first + 1)
+            sink_sum += sink_rate * (end - first + 1)
 
-        faucet_total = self.calculate_faucet_total()
-        sink_total = self.calculate_sink_total()
+        # Per-turn rates: the constant rate, or the average over the run
+        if len(horizon) == 1 or self.max_turns <= 0:
+            faucet_total = self.segments[0][2]
+            sink_total = self.segments[0][3]
+        else:
+            faucet_total = faucet_sum / self.max_turns
+            sink_total = sink_sum / self.max_turns
         net_flow = faucet_total - sink_total
 
-        # Simulate each turn
-        for turn in range(1, self.max_turns + 1):
-            current_balance += net_flow
-            balance_history.append(current_balance)
-
         # Calculate statistics
-        min_balance = min(balance_history)
-        max_balance = max(balance_history)
-        final_balance = balance_history[-1]
+        min_balance = min(boundary_balances)
+        max_balance = max(boundary_balances)
+        final_balance = boundary_balances[-1]
 
         # Calculate inflation rate
         inflation_rate = (net_flow / max(self.initial_currency, 1)) * 100 if self.max_turns > 0 else 0
 
         # Calculate time to afford items
-        time_to_afford = {}
-        for item_name, cost in self.target_items.items():
-            if cost <= self.initial_currency:
-                time_to_afford[item_name] = 0
-            elif net_flow > 0:
-                turns_needed = (cost - self.initial_currency) / net_flow
-                time_to_afford[item_name] = turns_needed
-            else:
-                time_to_afford[item_name] = float('inf')
+        time_to_afford = {
+            item_name: self.time_to_reach(cost)
+            for item_name, cost in self.item_costs.items()
+        }
+
+        history_turns, balance_history = self.balance_history()
 
         # Build results
         results = {
@@ -101,11 +275,416 @@ class EconomySimulator:
             'balance_history': balance_history,
             'time_to_afford': time_to_afford,
             'economy_status': self._classify_economy(net_flow, inflation_rate),
+            'flow_segments': len(horizon),
+        }
+        if history_turns is not None:
+            results['history_turns'] = history_turns
+
+        return results
+
+    def simulate_stochastic(
+        self,
+        trajectories: int = DEFAULT_TRAJECTORIES,
+        seed: Optional[int] = None,
+        percentiles: Tuple[float, ...] = DEFAULT_BAND_PERCENTILES,
+        by_turn: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Monte Carlo over noisy faucets and sinks, all trajectories at once.
+
+        Each faucet/sink may carry 'cv' (coefficient of variation: standard
+        deviation as a fraction of its 'amount', not a variance) and
+        'distribution' ('normal', clipped at 0, by default; 'lognormal',
+        'uniform' or 'poisson', which ignores cv). Every turn draws an
+        independent amount per trajectory around the scheduled mean. Only the
+        current balances and each trajectory's first turn holding each target
+        item's cost are kept, so memory does not depend on the horizon. Turns
+        are drawn in blocks (within one constant-flow segment) as 2-D arrays
+        to keep the per-turn Python overhead out of long runs.
+
+        Args:
+            trajectories: Number of simulated trajectories
+            seed: Random seed
+            percentiles: Balance percentiles reported as bands
+            by_turn: Deadline for reach_probability, at most max_turns
+                     (default: max_turns)
+
+        Returns:
+            Dictionary with percentile bands over turns (sampled like the
+            balance history), final balance percentiles, and per target item
+            the probability of holding its cost by by_turn and percentiles
+            of the turn it is first held
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for stochastic mode")
+        rng = np.random.default_rng(seed)
+        by_turn = self.max_turns if by_turn is None else by_turn
+        if not 0 <= by_turn <= self.max_turns:
+            raise ValueError(f"by_turn must be between 0 and max_turns ({self.max_turns})")
+
+        sources = []
+        for sign, group in ((1.0, self.faucets), (-1.0, self.sinks)):
+            for source in group:
+                distribution = source.get('distribution', 'normal')
+                if distribution not in DISTRIBUTIONS:
+                    raise ValueError(f"Unknown distribution for {source.get('name')}: {distribution}")
+                steps = _source_steps(source)
+                sources.append((sign, distribution, source.get('cv', 0.0),
+                                [t for t, _ in steps], [a for _, a in steps]))
+
+        balance = np.full(trajectories, float(self.initial_currency))
+        costs = list(self.item_costs.items())
+        first_held = np.full((len(costs), trajectories), np.inf)
+        for held, (_, cost) in zip(first_held, costs):
+            if cost <= self.initial_currency:
+                held[:] = 0
+
+        sample_turns = self.history_turns()
+        if sample_turns is None:
+            sample_turns = list(range(self.max_turns + 1))
+        samples = set(sample_turns)
+        bands: Dict[str, List[float]] = {f'p{q:g}': [] for q in percentiles}
+        mean: List[float] = []
+
+        def record(values: 'np.ndarray') -> None:
+            for q, value in zip(percentiles, np.percentile(values, percentiles)):
+                bands[f'p{q:g}'].append(float(value))
+            mean.append(float(values.mean()))
+
+        if 0 in samples:
+            record(balance)
+        changes = sorted({t for _, _, _, turns, _ in sources for t in turns})
+        block_turns = max(1, STOCHASTIC_BLOCK_ELEMENTS // trajectories)
+        turn = 1
+        while turn <= self.max_turns:
+            next_change = changes[bisect.bisect_right(changes, turn)] if changes and changes[-1] > turn else None
+            end = min(self.max_turns, turn + block_turns - 1)
+            if next_change is not None:
+                end = min(end, next_change - 1)
+            shape = (end - turn + 1, trajectories)
+
+            path = np.zeros(shape)
+            for sign, distribution, spread, turns, amounts in sources:
+                amount = amounts[bisect.bisect_right(turns, turn) - 1]
+                if amount == 0:
+                    continue
+                if distribution == 'poisson':
+                    draw = rng.poisson(amount, shape)
+                elif spread <= 0:
+                    draw = amount
+                elif distribution == 'lognormal':
+                    sigma = math.sqrt(math.log1p(spread * spread))
+                    draw = amount * rng.lognormal(-sigma * sigma / 2, sigma, shape)
+                elif distribution == 'uniform':
+                    half_width = math.sqrt(3) * spread
+                    draw = amount * rng.uniform(1 - half_width, 1 + half_width, shape)
+                else:
+                    draw = np.maximum(rng.normal(amount, spread * abs(amount), shape), 0.0)
+                path += sign * draw
+            np.cumsum(path, axis=0, out=path)
+            path += balance
+
+            for held, (_, cost) in zip(first_held, costs):
+                hit = path >= cost
+                pending = np.isinf(held) & hit.any(axis=0)
+                held[pending] = turn + hit[:, pending].argmax(axis=0)
+            for t in range(turn, end + 1):
+                if t in samples:
+                    record(path[t - turn])
+            balance = path[-1].copy()
+            turn = end + 1
+
+        final = dict(zip((f'p{q:g}' for q in percentiles),
+                         (float(v) for v in np.percentile(balance, percentiles))))
+        final['mean'] = float(balance.mean())
+
+        # Order statistics rather than interpolation: never-held turns are inf
+        reach_probability = {}
+        time_to_afford = {}
+        for (name, _), held in zip(costs, first_held):
+            reach_probability[name] = float((held <= by_turn).mean())
+            held.sort()
+            time_to_afford[name] = {
+                f'p{q:g}': float(held[min(trajectories - 1, int(q / 100 * trajectories))])
+                for q in percentiles
+            }
+
+        return {
+            'type': 'economy_stochastic',
+            'trajectories': trajectories,
+            'max_turns': self.max_turns,
+            'initial_balance': self.initial_currency,
+            'band_turns': sample_turns,
+            'bands': bands,
+            'mean': mean,
+            'final_balance': final,
+            'by_turn': by_turn,
+            'reach_probability': reach_probability,
+            'time_to_afford': time_to_afford,
         }
 
+    def first_turn_reaching(self, amount: float, from_turn: int) -> Optional[int]:
+        """
+        First whole turn >= from_turn (within max_turns) whose balance, before
+        any purchases, is at least amount; None if there is none.
+        """
+        if from_turn <= 0:
+            if self.initial_currency >= amount:
+                return 0
+            from_turn = 1
+        i = bisect.bisect_right(self._segment_starts, from_turn) - 1
+        for (first, last, faucet_rate, sink_rate), start in zip(self.segments[i:], self._segment_balances[i:]):
+            if first > self.max_turns:
+                break
+            end = self.max_turns if last is None else min(last, self.max_turns)
+            net_flow = faucet_rate - sink_rate
+            turn = max(first, from_turn)
+            if start + net_flow * (turn - first + 1) >= amount:
+                return turn
+            if net_flow > 0:
+                turn = first - 1 + math.ceil((amount - start) / net_flow)
+                # Guard against rounding in the division
+                while turn <= end and start + net_flow * (turn - first + 1) < amount:
+                    turn += 1
+                if turn <= end:
+                    return turn
+        return None
+
+    def balance_range(self, first_turn: int, last_turn: int) -> Tuple[float, float]:
+        """Min and max balance (before purchases) over whole turns first_turn..last_turn."""
+        turns = [first_turn, last_turn]
+        i = bisect.bisect_right(self._segment_starts, max(first_turn, 1))
+        while i < len(self._segment_starts) and self._segment_starts[i] <= last_turn:
+            turns.append(self._segment_starts[i] - 1)
+            i += 1
+        balances = [self.balance_at(t) for t in turns]
+        return min(balances), max(balances)
+
+    def simulate_purchases(self) -> Dict[str, Any]:
+        """
+        Simulate a player spending on target_items in priority order.
+
+        The player saves for the highest-priority item currently available
+        and buys it on the first whole turn the balance covers its cost;
+        lower-priority items wait (strict priority). Items are available
+        from 'available_from' (default turn 0) and, with 'repeat_every',
+        again that many turns after each purchase, up to 'count' purchases
+        (default 1, unlimited for repeating items). Priority is 'priority'
+        (lower first) and then config order.
+
+        Nothing is stepped per turn: unlock times sit in a heap, available
+        items in a priority heap, and the next purchase turn is solved from
+        the flow segments, so the cost grows with segments and purchase
+        events, not with the horizon.
+
+        Returns:
+            Dictionary with per-item purchase counts and turns, final/min/max
+            balance after spending, the item still being saved for when the
+            run ends (saving_for), the first PURCHASE_LOG_LIMIT purchases and
+            the balance history (sampled like simulate())
+        """
+        items = []
+        for index, (name, item) in enumerate(self.target_items.items()):
+            item = item if isinstance(item, dict) else {'cost': item}
+            repeat = item.get('repeat_every')
+            items.append({
+                'name': name,
+                'cost': item['cost'],
+                'priority': item.get('priority', 0),
+                'available_from': item.get('available_from', 0),
+                'repeat_every': max(1, repeat) if repeat else None,
+                'count': item.get('count', None if repeat else 1),
+                'purchases': 0,
+                'first_purchase_turn': None,
+                'last_purchase_turn': None,
+                'total_spent': 0.0,
+            })
+
+        unlocks = [(item['available_from'], item['priority'], i) for i, item in enumerate(items)]
+        heapq.heapify(unlocks)
+        available: List[Tuple[float, int]] = []
+        spent = 0.0
+        now = 0
+        log = []
+        events = 0
+        min_balance, max_balance = math.inf, -math.inf
+        saving_for = None
+
+        sample_turns = self.history_turns()
+        if sample_turns is None:
+            sample_turns = list(range(self.max_turns + 1))
+        history: List[float] = []
+
+        def advance(turn: int) -> None:
+            """Account for turns now..turn - 1 at the current spending level."""
+            nonlocal min_balance, max_balance
+            if turn > now:
+                low, high = self.balance_range(now, turn - 1)
+                min_balance = min(min_balance, low - spent)
+                max_balance = max(max_balance, high - spent)
+            while len(history) < len(sample_turns) and sample_turns[len(history)] < turn:
+                history.append(self.balance_at(sample_turns[len(history)]) - spent)
+
+        while True:
+            while unlocks and unlocks[0][0] <= now:
+                _, priority, i = heapq.heappop(unlocks)
+                heapq.heappush(available, (priority, i))
+            next_unlock = unlocks[0][0] if unlocks else None
+            if not available:
+                if next_unlock is None or next_unlock > self.max_turns:
+                    break
+                advance(next_unlock)
+                now = next_unlock
+                continue
+
+            i = available[0][1]
+            item = items[i]
+            turn = self.first_turn_reaching(item['cost'] + spent, now)
+            if next_unlock is not None and next_unlock <= self.max_turns and (
+                    turn is None or next_unlock <= turn):
+                # A newly available item may outrank the one being saved for
+                advance(next_unlock)
+                now = next_unlock
+                continue
+            if turn is None:
+                saving_for = item['name']
+                break
+
+            advance(turn)
+            now = turn
+            spent += item['cost']
+            balance = self.balance_at(turn) - spent
+            min_balance = min(min_balance, balance)
+            events += 1
+            item['purchases'] += 1
+            item['total_spent'] += item['cost']
+            item['last_purchase_turn'] = turn
+            if item['first_purchase_turn'] is None:
+                item['first_purchase_turn'] = turn
+            if len(log) < PURCHASE_LOG_LIMIT:
+                log.append({'turn': turn, 'item': item['name'], 'cost': item['cost'], 'balance': balance})
+
+            heapq.heappop(available)
+            if item['repeat_every'] and (item['count'] is None or item['purchases'] < item['count']):
+                heapq.heappush(unlocks, (turn + item['repeat_every'], item['priority'], i))
+
+        advance(self.max_turns)
+        history.extend(self.balance_at(t) - spent for t in sample_turns[len(history):])
+        final_balance = self.balance_at(self.max_turns) - spent
+
+        results = {
+            'type': 'economy_purchases',
+            'max_turns': self.max_turns,
+            'initial_balance': self.initial_currency,
+            'final_balance': final_balance,
+            'min_balance': min(min_balance, final_balance),
+            'max_balance': max(max_balance, final_balance),
+            'total_spent': spent,
+            'purchase_events': events,
+            'items': {
+                item['name']: {k: item[k] for k in (
+                    'cost', 'priority', 'purchases', 'first_purchase_turn',
+                    'last_purchase_turn', 'total_spent')}
+                for item in items
+            },
+            'unpurchased': [item['name'] for item in items if not item['purchases']],
+            'saving_for': saving_for,
+            'purchase_log': log,
+            'purchase_log_truncated': events > len(log),
+            'balance_history': history,
+        }
+        if self.history_turns():
+            results['history_turns'] = sample_turns
         return results
 
-    def _classify_economy(self, net_flow: float, inflation_rate: float) -> str:
+    def sensitivity(self) -> Dict[str, Any]:
+        """
+        Derivatives of the results with respect to every faucet and sink.
+
+        Final balance and inflation rate are linear in the source amounts and
+        time to afford is (cost - start balance) / net flow within the
+        segment where the cost is reached, so all derivatives are exact and
+        come from the flow segments in one pass: no re-run per perturbed
+        source. Each source is a lever measured two ways: 'per_unit' adds 1
+        to its amount on every turn it pays (within start_turn/end_turn; a
+        schedule shifts as a whole) and 'per_percent' scales all its amounts
+        by 1%. Sink derivatives have the opposite sign of faucet ones.
+
+        Returns:
+            Dictionary with the base final balance, inflation rate and time
+            to afford, and the levers ranked by the size of their 1% effect
+            on the final balance
+        """
+        turns = self.max_turns
+        inflation_scale = 100 / max(self.initial_currency, 1) / turns if turns > 0 else 0.0
+        targets = []
+        for name, cost in self.item_costs.items():
+            i = None if cost <= self.initial_currency else self._reach_segment(cost)
+            targets.append((name, i, self.time_to_reach(cost)))
+
+        levers = []
+        for kind, sign, group in (('faucet', 1.0, self.faucets), ('sink', -1.0, self.sinks)):
+            for index, source in enumerate(group):
+                steps = _source_steps(source)
+                step_turns = [turn for turn, _ in steps]
+                start = max(1, source.get('start_turn', 1))
+                end = source.get('end_turn', math.inf)
+
+                def active(upto: int) -> int:
+                    return max(0, min(end, upto) - start + 1)
+
+                total = _source_total(steps, turns)
+                per_unit = {'final_balance': sign * active(turns),
+                            'inflation_rate': sign * active(turns) * inflation_scale,
+                            'time_to_afford': {}}
+                per_percent = {'final_balance': sign * total / 100,
+                               'inflation_rate': sign * total * inflation_scale / 100,
+                               'time_to_afford': {}}
+                for name, i, reach in targets:
+                    if i is None:
+                        # Already held (no change) or never reached (undefined)
+                        value = 0.0 if reach == 0 else None
+                        per_unit['time_to_afford'][name] = per_percent['time_to_afford'][name] = value
+                        continue
+                    first, _, faucet_rate, sink_rate = self.segments[i]
+                    net_flow = faucet_rate - sink_rate
+                    into_segment = reach - first + 1
+                    # d(time) = -(d(start balance) + turns into segment x d(net flow)) / net flow
+                    paying = 1 if start <= first <= end else 0
+                    amount = steps[bisect.bisect_right(step_turns, first) - 1][1]
+                    per_unit['time_to_afford'][name] = (
+                        0.0 - sign * (active(first - 1) + into_segment * paying) / net_flow)
+                    per_percent['time_to_afford'][name] = (
+                        0.0 - sign * (_source_total(steps, first - 1) + into_segment * amount) / net_flow / 100)
+
+                levers.append({
+                    'name': source.get('name', f'{kind}_{index}'),
+                    'type': kind,
+                    'amount': source.get('amount', 0),
+                    'active_turns': active(turns),
+                    'total': total,
+                    'per_unit': per_unit,
+                    'per_percent': per_percent,
+                })
+
+        levers.sort(key=lambda lever: -abs(lever['per_percent']['final_balance']))
+        for rank, lever in enumerate(levers, 1):
+            lever['rank'] = rank
+
+        return {
+            'type': 'economy_sensitivity',
+            'max_turns': turns,
+            'final_balance': self.balance_at(turns),
+            'inflation_rate': sum(
+                (1 if lever['type'] == 'faucet' else -1) * lever['total'] for lever in levers
+            ) * inflation_scale,
+            'time_to_afford': {name: reach for name, _, reach in targets},
+            'ranked_by': 'per_percent.final_balance',
+            'levers': levers,
+        }
+
+    @staticmethod
+    def _classify_economy(net_flow: float, inflation_rate: float) -> str:
         """Classify economy health."""
         if abs(net_flow) < 0.01:
             return 'balanced'
@@ -120,6 +699,591 @@ class EconomySimulator:
             return 'deflation'
 
 
+class MultiCurrencySimulator:
+    """
+    Several currencies linked by faucets, sinks and conversions.
+
+    Each flow moves value per turn: a fixed 'amount' (which may follow the
+    start_turn/end_turn/schedule rules of single-currency faucets) and/or a
+    'fraction' of the source currency's balance. A flow with only 'to' is a
+    faucet, with only 'from' a sink, with both a conversion that credits
+    'rate' units of 'to' per unit of 'from'. The model is linear: balances
+    may go negative, as in EconomySimulator.
+
+    Fraction flows compile into a sparse transfer matrix (one entry per
+    graph edge, merged), fixed amounts into a per-turn vector, so one turn is
+    b <- M b + c. With NumPy and at most MULTI_CURRENCY_DENSE_MAX
+    currencies, a block of turns is one product with stacked powers of M;
+    otherwise each turn walks the sparse entries (vectorized with NumPy), so
+    cost stays proportional to the number of edges.
+    """
+
+    def __init__(
+        self,
+        currencies: Dict[str, Dict[str, float]],
+        flows: List[Dict[str, Any]],
+        max_turns: int = 365,
+        history_points: Optional[int] = DEFAULT_HISTORY_POINTS,
+    ):
+        """
+        Initialize multi-currency simulator.
+
+        Args:
+            currencies: {name: {'initial': balance}}
+            flows: List of {'name', 'from', 'to', 'amount', 'fraction', 'rate',
+                   'start_turn', 'end_turn', 'schedule'}
+            max_turns: Number of turns to simulate
+            history_points: Balance history samples per currency (as in
+                            EconomySimulator)
+        """
+        self.names = list(currencies)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.initial = [float(currencies[name].get('initial', 0)) for name in self.names]
+        self.flows = flows
+        self.max_turns = max_turns
+        self.history_points = history_points
+
+        for flow in flows:
+            for end in ('from', 'to'):
+                if flow.get(end) is not None and flow[end] not in self.index:
+                    raise ValueError(f"Flow {flow.get('name')} references unknown currency {flow[end]}")
+            if flow.get('from') is None and flow.get('to') is None:
+                raise ValueError(f"Flow {flow.get('name')} needs 'from' and/or 'to'")
+
+        # Sparse transfer entries (row, column, weight) of M - I
+        transfer: Dict[Tuple[int, int], float] = {}
+        for flow in flows:
+            fraction = flow.get('fraction', 0.0)
+            if not fraction or flow.get('from') is None:
+                continue
+            source = self.index[flow['from']]
+            transfer[(source, source)] = transfer.get((source, source), 0.0) - fraction
+            if flow.get('to') is not None:
+                target = self.index[flow['to']]
+                transfer[(target, source)] = transfer.get((target, source), 0.0) + fraction * flow.get('rate', 1.0)
+        self.transfer = [(row, col, weight) for (row, col), weight in transfer.items() if weight]
+
+    def amount_segments(self) -> List[Tuple[int, int, List[float]]]:
+        """
+        (first_turn, last_turn, per-turn vector c) runs over 1..max_turns in
+        which every fixed amount is constant.
+        """
+        changes: Dict[int, List[float]] = {1: [0.0] * len(self.names)}
+        for flow in self.flows:
+            if 'amount' not in flow:
+                continue
+            previous = 0.0
+            for turn, amount in _source_steps(flow):
+                delta = changes.setdefault(turn, [0.0] * len(self.names))
+                if flow.get('from') is not None:
+                    delta[self.index[flow['from']]] -= amount - previous
+                if flow.get('to') is not None:
+                    delta[self.index[flow['to']]] += (amount - previous) * flow.get('rate', 1.0)
+                previous = amount
+
+        segments = []
+        turns = sorted(t for t in changes if t <= self.max_turns)
+        vector = [0.0] * len(self.names)
+        for i, turn in enumerate(turns):
+            vector = [v + d for v, d in zip(vector, changes[turn])]
+            last = turns[i + 1] - 1 if i + 1 < len(turns) else self.max_turns
+            segments.append((turn, last, vector))
+        return segments
+
+    def simulate(self) -> Dict[str, Any]:
+        """
+        Run the multi-currency simulation.
+
+        Returns:
+            Dictionary with per-currency balances, faucet/sink/conversion
+            totals and inflation rate, per-flow totals, and each currency's
+            balance history (sampled like EconomySimulator)
+        """
+        n = len(self.names)
+        sample_turns = self.history_turns()
+        samples = set(range(self.max_turns + 1) if sample_turns is None else sample_turns)
+        history: List[List[float]] = []
+        balance = list(self.initial)
+        low, high = list(balance), list(balance)
+        # Sum over turns of the balance at the start of each turn, for the
+        # totals moved by fraction flows
+        start_sums = [0.0] * n
+        if 0 in samples:
+            history.append(list(balance))
+
+        if np is not None and n <= MULTI_CURRENCY_DENSE_MAX:
+            matrix = np.eye(n)
+            for row, col, weight in self.transfer:
+                matrix[row, col] += weight
+            block = min(MULTI_CURRENCY_BLOCK_TURNS, max(1, self.max_turns))
+            powers = np.empty((block, n, n))   # M^k, k = 1..block
+            sums = np.empty((block, n, n))     # I + M + ... + M^(k-1)
+            powers[0], sums[0] = matrix, np.eye(n)
+            for k in range(1, block):
+                powers[k] = matrix @ powers[k - 1]
+                sums[k] = sums[k - 1] + powers[k - 1]
+            powers = powers.reshape(block * n, n)
+            sums = sums.reshape(block * n, n)
+
+            current = np.array(balance)
+            for first, last, vector in self.amount_segments():
+                constant = np.array(vector)
+                turn = first
+                while turn <= last:
+                    size = min(block, last - turn + 1)
+                    rows = (powers[:size * n] @ current + sums[:size * n] @ constant).reshape(size, n)
+                    start_sums = [s + v for s, v in zip(start_sums, current + rows[:-1].sum(axis=0))]
+                    low = np.minimum(low, rows.min(axis=0)).tolist()
+                    high = np.maximum(high, rows.max(axis=0)).tolist()
+                    for t in range(turn, turn + size):
+                        if t in samples:
+                            history.append(rows[t - turn].tolist())
+                    current = rows[-1]
+                    turn += size
+            balance = current.tolist()
+        elif np is not None:
+            rows = np.array([row for row, _, _ in self.transfer], dtype=np.intp)
+            cols = np.array([col for _, col, _ in self.transfer], dtype=np.intp)
+            weights = np.array([weight for _, _, weight in self.transfer], dtype=float)
+            current = np.array(balance)
+            low_array, high_array = current.copy(), current.copy()
+            start_array = np.zeros(n)
+            for first, last, vector in self.amount_segments():
+                constant = np.array(vector)
+                for turn in range(first, last + 1):
+                    start_array += current
+                    current = current + constant + np.bincount(rows, weights * current[cols], minlength=n)
+                    np.minimum(low_array, current, out=low_array)
+                    np.maximum(high_array, current, out=high_array)
+                    if turn in samples:
+                        history.append(current.tolist())
+            balance = current.tolist()
+            low, high = low_array.tolist(), high_array.tolist()
+            start_sums = start_array.tolist()
+        else:
+            for first, last, vector in self.amount_segments():
+                for turn in range(first, last + 1):
+                    start_sums = [s + b for s, b in zip(start_sums, balance)]
+                    updated = [b + c for b, c in zip(balance, vector)]
+                    for row, col, weight in self.transfer:
+                        updated[row] += weight * balance[col]
+                    balance = updated
+                    low = [min(a, b) for a, b in zip(low, balance)]
+                    high = [max(a, b) for a, b in zip(high, balance)]
+                    if turn in samples:
+                        history.append(list(balance))
+
+        # Totals per flow: fixed amounts from their steps, fractions from the
+        # summed start-of-turn balances
+        flow_results = []
+        faucets, sinks = [0.0] * n, [0.0] * n
+        converted_in, converted_out = [0.0] * n, [0.0] * n
+        for flow in self.flows:
+            moved = 0.0
+            if 'amount' in flow:
+                steps = _source_steps(flow) + [(self.max_turns + 1, 0.0)]
+                for (turn, amount), (next_turn, _) in zip(steps, steps[1:]):
+                    active = min(next_turn, self.max_turns + 1) - min(turn, self.max_turns + 1)
+                    moved += amount * max(0, active)
+            if flow.get('fraction') and flow.get('from') is not None:
+                moved += flow['fraction'] * start_sums[self.index[flow['from']]]
+            credited = moved * flow.get('rate', 1.0)
+            source = self.index.get(flow.get('from'))
+            target = self.index.get(flow.get('to'))
+            if source is not None and target is not None:
+                converted_out[source] += moved
+                converted_in[target] += credited
+            elif target is not None:
+                faucets[target] += credited
+            else:
+                sinks[source] += moved
+            flow_results.append({
+                'name': flow.get('name'),
+                'from': flow.get('from'),
+                'to': flow.get('to'),
+                'total': moved,
+                'per_turn': moved / self.max_turns if self.max_turns > 0 else 0.0,
+            })
+
+        currencies = {}
+        for i, name in enumerate(self.names):
+            net_flow = (balance[i] - self.initial[i]) / self.max_turns if self.max_turns > 0 else 0.0
+            inflation_rate = (net_flow / max(self.initial[i], 1)) * 100 if self.max_turns > 0 else 0
+            currencies[name] = {
+                'initial_balance': self.initial[i],
+                'final_balance': balance[i],
+                'min_balance': low[i],
+                'max_balance': high[i],
+                'faucets': faucets[i],
+                'sinks': sinks[i],
+                'converted_in': converted_in[i],
+                'converted_out': converted_out[i],
+                'net_flow_per_turn': net_flow,
+                'inflation_rate': inflation_rate,
+                'economy_status': EconomySimulator._classify_economy(net_flow, inflation_rate),
+            }
+
+        results = {
+            'type': 'economy_multi_currency',
+            'max_turns': self.max_turns,
+            'currencies': currencies,
+            'flows': flow_results,
+            'balance_history': {
+                name: [row[i] for row in history] for i, name in enumerate(self.names)
+            },
+        }
+        if sample_turns:
+            results['history_turns'] = sample_turns
+        return results
+
+    def history_turns(self) -> Optional[List[int]]:
+        """Turns sampled for history output (None: every turn; []: no history)."""
+        return history_sample_turns(self.max_turns, self.history_points)
+
+
+def population_flows(config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Per-player daily faucets and sinks for population mode.
+
+    Accepts the economy snapshot format (economy-designer's
+    economy-snapshot.json: faucets/sinks keyed by name, with per-hour or
+    per-day amounts and estimated participant counts) as well as the plain
+    list format, whose amounts apply to every player every turn.
+
+    Participation is participants / active_players. Hourly faucets pay
+    rate x daily hours and, like every per-day sink, scale with the player's
+    play time; flat daily faucets (login bonuses) do not. Per-event sinks
+    (gc_per_respec) fire as a Poisson process. A sink given only as a daily
+    total is levied as that share of each player's earnings (taxes).
+
+    Args:
+        config: Economy config
+
+    Returns:
+        Flow dicts: name, sink, amount, steps (list format's start_turn/
+        end_turn/schedule as (from_turn, amount)), participation, scaled,
+        poisson, earnings_share, total_per_day (snapshot figure, if any)
+    """
+    players = config.get('active_players')
+    flows = []
+    for sink, group in ((False, config.get('faucets', [])), (True, config.get('sinks', []))):
+        entries = group.items() if isinstance(group, dict) else [(f.get('name'), f) for f in group]
+        for name, entry in entries:
+            flow = {'name': name, 'sink': sink, 'amount': 0.0, 'participation': 1.0,
+                    'scaled': False, 'poisson': False, 'earnings_share': 0.0,
+                    'total_per_day': entry.get('total_gc_per_day')}
+            counts = [v for k, v in entry.items() if k.startswith('estimated_active_')]
+            if counts and players:
+                flow['participation'] = min(1.0, counts[0] / players)
+
+            per_day = [v for k, v in entry.items() if k.startswith('gc_per_day_per_')]
+            if 'amount' in entry:
+                flow['amount'] = entry['amount']
+                flow['steps'] = _source_steps(entry)
+            elif 'gc_per_hour_per_player' in entry:
+                flow['amount'] = entry['gc_per_hour_per_player'] * entry.get('daily_hours_per_player', 1.0)
+                flow['scaled'] = True
+            elif per_day:
+                flow['amount'] = per_day[0]
+                flow['scaled'] = sink
+            elif 'gc_per_respec' in entry and players:
+                flow['amount'] = entry['gc_per_respec']
+                flow['participation'] = entry.get('estimated_respecs_per_day', 0) / players
+                flow['poisson'] = True
+            elif flow['total_per_day'] and players:
+                if sink:
+                    flow['earnings_share'] = flow['total_per_day']
+                else:
+                    flow['amount'] = flow['total_per_day'] / players
+            flow.setdefault('steps', [(1, flow['amount'])])
+            flows.append(flow)
+
+    # Earnings-proportional sinks are levied at total / expected daily earnings
+    expected_earnings = sum(
+        f['amount'] * f['participation'] for f in flows if not f['sink']
+    ) * (players or 0)
+    for f in flows:
+        if f['earnings_share']:
+            f['earnings_share'] = f['earnings_share'] / expected_earnings if expected_earnings > 0 else 0.0
+    return flows
+
+
+class PopulationSimulator:
+    """
+    Agent-based economy of many heterogeneous players, vectorized with NumPy.
+
+    Every player has a segment, a play time multiplier, a starting balance and
+    a fixed yes/no participation in each faucet and sink, drawn once with
+    probability participation ratio x play time multiplier. Each turn (a day) draws the day's play
+    time, pays faucets, then charges sinks in config order, never below a
+    zero balance. Only per-day distribution statistics are kept, so memory
+    does not grow with the number of turns.
+    """
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        players: Optional[int] = None,
+        max_turns: int = 365,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize population simulator.
+
+        Args:
+            config: Economy config (snapshot or list format). Optional keys:
+                    player_segments ({name: {percent_of_players,
+                    avg_daily_playtime_hours, avg_balance}}), initial_currency
+                    or aggregate.mean_player_balance (starting balance without
+                    segments), population ({playtime_sigma, daily_playtime_cv,
+                    balance_sigma})
+            players: Players to simulate (default: active_players, else 10000)
+            max_turns: Days to simulate
+            seed: Random seed
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for population mode")
+        self.config = config
+        self.players = players or config.get('active_players') or 10_000
+        self.max_turns = max_turns
+        self.flows = population_flows(config)
+        self.rng = np.random.default_rng(seed)
+
+        tuning = config.get('population', {})
+        self.playtime_sigma = tuning.get('playtime_sigma', DEFAULT_PLAYTIME_SIGMA)
+        self.daily_playtime_cv = tuning.get('daily_playtime_cv', DEFAULT_DAILY_PLAYTIME_CV)
+        self.balance_sigma = tuning.get('balance_sigma', DEFAULT_BALANCE_SIGMA)
+
+    def _lognormal(self, sigma: float, size: int) -> 'np.ndarray':
+        """Lognormal multipliers with mean 1."""
+        return self.rng.lognormal(-sigma * sigma / 2, sigma, size)
+
+    def spawn_players(self) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray', List[str]]:
+        """
+        Draw segments, play time multipliers and starting balances.
+
+        Returns:
+            (segment index per player, play time relative to the population
+            mean, starting balances, segment names)
+        """
+        n = self.players
+        segments = self.config.get('player_segments', {})
+        if segments:
+            names = list(segments)
+            weights = np.array([segments[s].get('percent_of_players', 0) for s in names], dtype=float)
+            segment = self.rng.choice(len(names), size=n, p=weights / weights.sum())
+            hours = np.array([segments[s].get('avg_daily_playtime_hours', 1.0) for s in names])[segment]
+            balance = np.array([segments[s].get('avg_balance', 0.0) for s in names], dtype=float)[segment]
+        else:
+            names = ['all']
+            segment = np.zeros(n, dtype=np.int64)
+            hours = np.ones(n)
+            initial = self.config.get('initial_currency',
+                                      self.config.get('aggregate', {}).get('mean_player_balance', 1000))
+            balance = np.full(n, float(initial))
+
+        playtime = hours * self._lognormal(self.playtime_sigma, n)
+        playtime /= playtime.mean()
+        if self.balance_sigma > 0:
+            balance = balance * self._lognormal(self.balance_sigma, n)
+        return segment, playtime, balance, names
+
+    def simulate(self) -> Dict[str, Any]:
+        """
+        Run the population simulation.
+
+        Returns:
+            Dictionary with per-day wealth distribution series (percentiles,
+            mean, Gini, top 1% share, total supply), per-flow daily averages
+            (scaled to the snapshot's active players) and per-segment results
+        """
+        n = self.players
+        segment, playtime, balance, segment_names = self.spawn_players()
+        initial_mean = float(balance.mean())
+        # Players who play more are more likely to join an activity; each
+        # flow's amount is then renormalized so that at full balances the
+        # expected daily total stays participation x amount x players
+        participants = []
+        factors = []
+        for flow in self.flows:
+            if flow['poisson'] or flow['earnings_share']:
+                participants.append(None)
+                factors.append(1.0)
+                continue
+            joined = self.rng.random(n) < np.minimum(1.0, flow['participation'] * playtime)
+            weight = float((playtime * joined).sum() if flow['scaled'] else joined.sum())
+            participants.append(joined)
+            factors.append(flow['participation'] * n / weight if weight > 0 else 0.0)
+        step_turns = [[turn for turn, _ in flow['steps']] for flow in self.flows]
+        flow_totals = np.zeros(len(self.flows))
+        unmet_demand = np.zeros(len(self.flows))
+
+        shape = 1.0 / self.daily_playtime_cv ** 2 if self.daily_playtime_cv > 0 else None
+        wealth: Dict[str, List[float]] = {
+            'mean': [], 'gini': [], 'top_1_percent_share': [], 'total_supply': [],
+            **{f'p{q}': [] for q in WEALTH_PERCENTILES},
+        }
+        self._record_wealth(balance, wealth)
+
+        for turn in range(1, self.max_turns + 1):
+            today = playtime * self.rng.gamma(shape, 1.0 / shape, n) if shape else playtime
+            amounts = [
+                factor * flow['steps'][bisect.bisect_right(turns, turn) - 1][1]
+                for flow, factor, turns in zip(self.flows, factors, step_turns)
+            ]
+            earned = np.zeros(n)
+            for i, (flow, joined) in enumerate(zip(self.flows, participants)):
+                if flow['sink']:
+                    continue
+                if joined is None:
+                    earned += amounts[i]
+                    flow_totals[i] += amounts[i] * n
+                    continue
+                paid = np.where(joined, amounts[i] * (today if flow['scaled'] else 1.0), 0.0)
+                earned += paid
+                flow_totals[i] += paid.sum()
+            balance += earned
+
+            for i, (flow, joined) in enumerate(zip(self.flows, participants)):
+                if not flow['sink']:
+                    continue
+                if flow['poisson']:
+                    demand = self.rng.poisson(flow['participation'], n) * flow['amount']
+                elif flow['earnings_share']:
+                    demand = earned * flow['earnings_share']
+                else:
+                    demand = np.where(joined, amounts[i] * (today if flow['scaled'] else 1.0), 0.0)
+                spent = np.minimum(demand, balance)
+                balance -= spent
+                flow_totals[i] += spent.sum()
+                unmet_demand[i] += demand.sum() - spent.sum()
+
+            self._record_wealth(balance, wealth)
+
+        # Per-flow daily averages, rescaled to the snapshot's player count
+        days = max(self.max_turns, 1)
+        scale = (self.config.get('active_players') or n) / n
+        flows = []
+        for flow, total, unmet in zip(self.flows, flow_totals, unmet_demand):
+            entry = {
+                'name': flow['name'],
+                'type': 'sink' if flow['sink'] else 'faucet',
+                'simulated_per_day': float(total) / days * scale,
+                'snapshot_per_day': flow['total_per_day'],
+            }
+            if flow['sink']:
+                entry['unmet_demand_per_day'] = float(unmet) / days * scale
+            flows.append(entry)
+
+        supply = wealth['total_supply']
+        growth = (supply[-1] / supply[0]) ** (1.0 / days) - 1 if supply[0] > 0 and supply[-1] > 0 else 0.0
+        by_segment = {
+            name: {
+                'players': int((segment == k).sum()),
+                'mean_balance': float(balance[segment == k].mean()) if (segment == k).any() else 0.0,
+                'median_balance': float(np.median(balance[segment == k])) if (segment == k).any() else 0.0,
+            }
+            for k, name in enumerate(segment_names)
+        }
+
+        return {
+            'type': 'economy_population',
+            'players': n,
+            'max_turns': self.max_turns,
+            'initial_mean_balance': initial_mean,
+            'final_mean_balance': wealth['mean'][-1],
+            'final_median_balance': wealth['p50'][-1],
+            'final_gini': wealth['gini'][-1],
+            'supply_growth_per_turn': growth,
+            'monthly_inflation_percent': ((1 + growth) ** 30 - 1) * 100,
+            'wealth': {'turn': list(range(self.max_turns + 1)), **wealth},
+            'flows': flows,
+            'segments': by_segment,
+        }
+
+    @staticmethod
+    def _record_wealth(balance: 'np.ndarray', wealth: Dict[str, List[float]]) -> None:
+        """Append one day's distribution statistics (one sort of the balances)."""
+        ordered = np.sort(balance)
+        n = len(ordered)
+        total = float(ordered.sum())
+        for q in WEALTH_PERCENTILES:
+            wealth[f'p{q}'].append(float(ordered[min(n - 1, int(q / 100 * n))]))
+        wealth['mean'].append(total / n)
+        wealth['total_supply'].append(total)
+        if total > 0:
+            ranks = np.arange(1, n + 1)
+            wealth['gini'].append(float(2 * np.dot(ranks, ordered) / (n * total) - (n + 1) / n))
+            wealth['top_1_percent_share'].append(float(ordered[n - max(1, n // 100):].sum() / total))
+        else:
+            wealth['gini'].append(0.0)
+            wealth['top_1_percent_share'].append(0.0)
+
+
+def history_sample_turns(max_turns: int, points: Optional[int]) -> Optional[List[int]]:
+    """
+    Evenly spaced turns 0..max_turns to report history at.
+
+    Args:
+        max_turns: Length of the run
+        points: Samples wanted (None for every turn, 0 for none, 1 for the
+                final turn only)
+
+    Returns:
+        Sorted turns, None when every turn fits, or [] for no history
+    """
+    if points is not None and points < 0:
+        raise ValueError(f"history points must be non-negative, got {points}")
+    if points == 0:
+        return []
+    if points is None or points >= max_turns + 1:
+        return None
+    if points == 1:
+        return [max_turns]
+    return sorted({round(i * max_turns / (points - 1)) for i in range(points)})
+
+
+def _source_steps(source: Dict[str, Any]) -> List[Tuple[int, float]]:
+    """
+    Per-turn amount of one faucet or sink as (from_turn, amount) steps.
+
+    Applies the optional schedule and start_turn/end_turn window; the amount
+    is 0 outside the window.
+    """
+    steps = [(1, source.get('amount', 0))]
+    for step in sorted(source.get('schedule', []), key=lambda s: s['from_turn']):
+        steps.append((max(1, step['from_turn']), step.get('amount', 0)))
+
+    start = max(1, source.get('start_turn', 1))
+    end = source.get('end_turn')
+    if end is not None and end < start:
+        return [(1, 0.0)]
+    window = []
+    for i, (turn, amount) in enumerate(steps):
+        next_turn = steps[i + 1][0] if i + 1 < len(steps) else None
+        if next_turn is not None and next_turn <= start:
+            continue
+        if end is not None and turn > end:
+            break
+        window.append((max(turn, start), amount))
+    if start > 1:
+        window.insert(0, (1, 0.0))
+    if end is not None:
+        window.append((end + 1, 0.0))
+    return window
+
+
+def _source_total(steps: List[Tuple[int, float]], turns: int) -> float:
+    """Sum of a _source_steps() amount over turns 1..turns."""
+    total = 0.0
+    for i, (turn, amount) in enumerate(steps):
+        last = steps[i + 1][0] - 1 if i + 1 < len(steps) else turns
+        if turn > turns:
+            break
+        total += amount * (min(last, turns) - turn + 1)
+    return total
+
+
 def calculate_sink_faucet_analysis(results: Dict[str, Any]) -> Dict[str, Any]:
     """
     Analyze sink and faucet balance.
@@ -162,12 +1326,13 @@ def _get_balance_recommendation(ratio: float) -> str:
         return 'Consider adding currency sinks or reducing sources'
 
 
-def calculate_velocity(balance_history: List[float]) -> float:
+def calculate_velocity(balance_history: List[float], turns: Optional[int] = None) -> float:
     """
     Calculate velocity of currency change (average change per turn).
 
     Args:
-        balance_history: List of balance values per turn
+        balance_history: List of balance values per turn (or samples spanning the run)
+        turns: Turns between the first and last entry (default: one per entry)
 
     Returns:
         Average change per turn
@@ -176,7 +1341,8 @@ def calculate_velocity(balance_history: List[float]) -> float:
         return 0
 
     total_change = balance_history[-1] - balance_history[0]
-    turns = len(balance_history) - 1
+    if turns is None:
+        turns = len(balance_history) - 1
 
     return total_change / turns if turns > 0 else 0
 
@@ -202,6 +1368,62 @@ def main():
         default=365,
         help='Number of turns to simulate'
     )
+    parser.add_argument(
+        '--history-points',
+        type=int,
+        default=DEFAULT_HISTORY_POINTS,
+        help='Balance history samples in the output; runs with fewer turns keep '
+             'every turn, 1 keeps the final turn only, 0 omits the history '
+             f'(default: {DEFAULT_HISTORY_POINTS})'
+    )
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument(
+        '--population',
+        type=int,
+        default=None,
+        help='Agent-based mode: simulate this many heterogeneous players per day '
+             '(default for snapshot-format configs: active_players)'
+    )
+    modes.add_argument(
+        '--purchases',
+        action='store_true',
+        help='Spend on target_items in priority order as they become affordable '
+             '(items may set priority, available_from, repeat_every, count)'
+    )
+    modes.add_argument(
+        '--sensitivity',
+        action='store_true',
+        help='Rank faucets and sinks by their effect on final balance, inflation rate '
+             'and time to afford (analytic derivatives, one run)'
+    )
+    modes.add_argument(
+        '--stochastic',
+        type=int,
+        default=None,
+        metavar='TRAJECTORIES',
+        help='Monte Carlo over faucet/sink "cv"/"distribution" with this many '
+             f'trajectories (e.g. {DEFAULT_TRAJECTORIES}); reports percentile bands'
+    )
+    parser.add_argument(
+        '--percentiles',
+        type=float,
+        nargs='+',
+        default=list(DEFAULT_BAND_PERCENTILES),
+        help='Balance percentile bands for --stochastic (default: 5 50 95)'
+    )
+    parser.add_argument(
+        '--by-turn',
+        type=int,
+        default=None,
+        help='With --stochastic, deadline for the target item reach probabilities, '
+             'at most --turns (default: --turns)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for population and stochastic modes'
+    )
     parser.add_argument(
         '--output',
         type=Path,
@@ -213,11 +1435,107 @@ def main():
         action='store_true',
         help='Generate matplotlib chart'
     )
+    add_cache_arguments(parser)
 
     args = parser.parse_args()
+    if args.history_points < 0:
+        parser.error('--history-points must be non-negative')
 
     # Load configuration
     config = load_economy_config(args.config)
+    cache = cache_from_args(args)
+
+    snapshot = isinstance(config.get('faucets'), dict)
+    mode = next((flag for flag, used in (
+        ('--population', args.population), ('--purchases', args.purchases),
+        ('--sensitivity', args.sensitivity), ('--stochastic', args.stochastic),
+    ) if used), None)
+    if 'currencies' in config and mode:
+        parser.error(f'{mode} does not apply to multi-currency configs')
+    if snapshot and mode and mode != '--population':
+        parser.error(f'{mode} does not apply to snapshot-format configs (population mode)')
+
+    if 'currencies' in config:
+        multi = MultiCurrencySimulator(
+            currencies=config['currencies'],
+            flows=config.get('flows', []),
+            max_turns=args.turns,
+            history_points=args.history_points,
+        )
+        print(f"Simulating {len(multi.names)} currencies and {len(multi.flows)} flows "
+              f"for {args.turns} turns...")
+        if cache is None:
+            results = multi.simulate()
+        else:
+            key = cache.key('economy_sim:multi', source_version(__file__), config=config,
+                            turns=args.turns, history_points=args.history_points)
+            results = cache.get_or_compute(key, multi.simulate)
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        print("\nMulti-Currency Results:")
+        print(f"  {'currency':<20} {'initial':>12} {'final':>14} {'net/turn':>11} "
+              f"{'inflation':>10}  status")
+        for name, currency in results['currencies'].items():
+            print(f"  {str(name)[:20]:<20} {currency['initial_balance']:>12,.1f} "
+                  f"{currency['final_balance']:>14,.1f} {currency['net_flow_per_turn']:>11,.2f} "
+                  f"{currency['inflation_rate']:>9.2f}%  {currency['economy_status']}")
+        print(f"\nFlow totals over {results['max_turns']} turns:")
+        for flow in results['flows']:
+            route = f"{flow['from'] or 'faucet'} -> {flow['to'] or 'sink'}"
+            print(f"  {str(flow['name'])[:28]:<28} {route:<32} {flow['total']:>14,.1f}")
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved results to: {args.output}")
+        return
+
+    if args.population or snapshot:
+        if np is None:
+            parser.error('population mode needs NumPy')
+        population = PopulationSimulator(config, players=args.population,
+                                         max_turns=args.turns, seed=args.seed)
+        print(f"Simulating {population.players:,} players for {args.turns} days...")
+        if cache is None:
+            results = population.simulate()
+        else:
+            key = None
+            if args.seed is not None:
+                key = cache.key('economy_sim:population', source_version(__file__), config=config,
+                                players=population.players, turns=args.turns, seed=args.seed)
+            results = cache.get_or_compute(key, population.simulate)
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        wealth = results['wealth']
+        print("\nPopulation Economy Results:")
+        print(f"  Players: {results['players']:,}; days: {results['max_turns']}")
+        print(f"  Mean balance: {wealth['mean'][0]:,.0f} -> {wealth['mean'][-1]:,.0f}")
+        print(f"  Median balance: {wealth['p50'][0]:,.0f} -> {wealth['p50'][-1]:,.0f}")
+        print(f"  Gini: {wealth['gini'][0]:.3f} -> {wealth['gini'][-1]:.3f}; "
+              f"top 1% hold {wealth['top_1_percent_share'][-1]:.1%}")
+        print(f"  Money supply growth: {results['monthly_inflation_percent']:.2f}% per 30 days")
+
+        print(f"\nFlows (per day, scaled to {config.get('active_players') or results['players']:,} players):")
+        print(f"  {'flow':<26} {'type':<7} {'simulated':>12} {'snapshot':>12}")
+        for flow in results['flows']:
+            snapshot = flow['snapshot_per_day']
+            unmet = flow.get('unmet_demand_per_day')
+            print(f"  {str(flow['name'])[:26]:<26} {flow['type']:<7} {flow['simulated_per_day']:>12,.0f} "
+                  f"{f'{snapshot:,.0f}' if snapshot is not None else '-':>12}"
+                  f"{f'  (unmet {unmet:,.0f})' if unmet else ''}")
+
+        print(f"\nSegments:")
+        for name, segment in results['segments'].items():
+            print(f"  {name}: {segment['players']:,} players, mean {segment['mean_balance']:,.0f}, "
+                  f"median {segment['median_balance']:,.0f}")
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved results to: {args.output}")
+        return
 
     # Create simulator
     sim = EconomySimulator(
@@ -226,15 +1544,169 @@ def main():
         sinks=config.get('sinks', []),
         target_items=config.get('target_items', {}),
         max_turns=args.turns,
+        history_points=args.history_points,
     )
 
-    # Run simulation
-    print(f"Simulating economy for {args.turns} turns...")
-    results = sim.simulate()
+    if args.purchases:
+        print(f"Simulating purchases over {args.turns} turns...")
+        if cache is None:
+            results = sim.simulate_purchases()
+        else:
+            key = cache.key('economy_sim:purchases', source_version(__file__), config=config,
+                            turns=args.turns, history_points=args.history_points)
+            results = cache.get_or_compute(key, sim.simulate_purchases)
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        print("\nPurchase Simulation Results:")
+        print(f"  Initial balance: {results['initial_balance']:.2f}")
+        print(f"  Final balance: {results['final_balance']:.2f}")
+        print(f"  Min balance: {results['min_balance']:.2f}")
+        print(f"  Total spent: {results['total_spent']:.2f} over {results['purchase_events']} purchases")
+        print(f"\n  {'item':<28} {'cost':>10} {'bought':>7} {'first turn':>11}")
+        for name, item in results['items'].items():
+            first = item['first_purchase_turn']
+            print(f"  {str(name)[:28]:<28} {item['cost']:>10,.0f} {item['purchases']:>7} "
+                  f"{first if first is not None else '-':>11}")
+        if results['saving_for']:
+            print(f"\n  Still saving for {results['saving_for']} at turn {results['max_turns']} "
+                  f"(lower-priority items wait)")
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved results to: {args.output}")
+        return
+
+    if args.sensitivity:
+        print(f"Computing sensitivities over {args.turns} turns...")
+        if cache is None:
+            results = sim.sensitivity()
+        else:
+            key = cache.key('economy_sim:sensitivity', source_version(__file__), config=config,
+                            turns=args.turns)
+            results = cache.get_or_compute(key, sim.sensitivity)
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        items = list(results['time_to_afford'])
+        print("\nSensitivity Results:")
+        print(f"  Final balance: {results['final_balance']:,.2f}; "
+              f"inflation rate: {results['inflation_rate']:.4f}% per turn")
+        for item, turns in results['time_to_afford'].items():
+            print(f"  Time to afford {item}: {turns:,.1f} turns")
+        print(f"\nLevers (effect of +1% of each faucet/sink, ranked by final balance):")
+        print(f"  {'#':>3} {'lever':<24} {'type':<7} {'final bal.':>12} {'inflation':>11}"
+              + ''.join(f' {str(item)[:14] + " turns":>20}' for item in items))
+        for lever in results['levers']:
+            effect = lever['per_percent']
+            cells = ''
+            for item in items:
+                change = effect['time_to_afford'][item]
+                cells += f" {'-' if change is None else f'{change:+,.2f}':>20}"
+            print(f"  {lever['rank']:>3} {str(lever['name'])[:24]:<24} {lever['type']:<7} "
+                  f"{effect['final_balance']:>+12,.2f} {effect['inflation_rate']:>+10.4f}%{cells}")
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved results to: {args.output}")
+        return
 
-    # Add analysis
-    results['sink_faucet_analysis'] = calculate_sink_faucet_analysis(results)
-    results['velocity'] = calculate_velocity(results['balance_history'])
+    if args.stochastic:
+        if np is None:
+            parser.error('--stochastic needs NumPy')
+        if args.by_turn is not None and not 0 <= args.by_turn <= args.turns:
+            parser.error('--by-turn must be between 0 and --turns (trajectories stop at --turns)')
+        percentiles = tuple(args.percentiles)
+        print(f"Simulating {args.stochastic:,} economy trajectories for {args.turns} turns...")
+
+        def run_stochastic() -> Dict[str, Any]:
+            return sim.simulate_stochastic(args.stochastic, seed=args.seed,
+                                           percentiles=percentiles, by_turn=args.by_turn)
+
+        if cache is None:
+            results = run_stochastic()
+        else:
+            key = None
+            if args.seed is not None:
+                key = cache.key('economy_sim:stochastic', source_version(__file__), config=config,
+                                turns=args.turns, history_points=args.history_points,
+                                trajectories=args.stochastic, percentiles=percentiles,
+                                by_turn=args.by_turn, seed=args.seed)
+            results = cache.get_or_compute(key, run_stochastic)
+
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+        names = list(results['bands'])
+        print("\nStochastic Economy Results:")
+        print(f"  Trajectories: {results['trajectories']:,}")
+        print(f"  {'turn':>8} " + ' '.join(f'{name:>12}' for name in names))
+        band_turns = results['band_turns']
+        shown = sorted({round(i * (len(band_turns) - 1) / 4) for i in range(5)}) if band_turns else []
+        for i in shown:
+            print(f"  {band_turns[i]:>8} " + ' '.join(f"{results['bands'][name][i]:>12,.1f}" for name in names))
+        final = results['final_balance']
+        print(f"  Final balance: mean {final['mean']:,.1f}; "
+              + ', '.join(f"{name.upper()} {final[name]:,.1f}" for name in names))
+
+        if results['reach_probability']:
+            print(f"\nTarget Items (held by turn {results['by_turn']}):")
+            for item, probability in results['reach_probability'].items():
+                turns = results['time_to_afford'][item]
+                print(f"  {item}: {probability:.1%}; first held at turn "
+                      + ', '.join(f"{name.upper()} {turns[name]:g}" for name in names))
+
+        if args.plot:
+            try:
+                import matplotlib.pyplot as plt
+
+                low, high = results['bands'][names[0]], results['bands'][names[-1]]
+                middle = results['bands'][names[len(names) // 2]]
+                plt.figure(figsize=(12, 6))
+                plt.fill_between(band_turns, low, high, alpha=0.3,
+                                 label=f'{names[0].upper()}-{names[-1].upper()}')
+                plt.plot(band_turns, middle, linewidth=2, label=names[len(names) // 2].upper())
+                plt.xlabel('Turn', fontsize=12)
+                plt.ylabel('Currency Balance', fontsize=12)
+                plt.title('Economy Balance Bands', fontsize=14, fontweight='bold')
+                plt.legend()
+                plt.grid(True, alpha=0.3)
+                plt.tight_layout()
+
+                chart_path = args.output.with_suffix('.png')
+                plt.savefig(chart_path, dpi=150, format='png')
+                print(f"\nSaved chart to: {chart_path}")
+                plt.close()
+
+            except ImportError:
+                print("\nmatplotlib not available. Skipping chart generation.")
+
+        if cache is not None:
+            print(f"\n{cache.report()}")
+        print(f"\nSaved results to: {args.output}")
+        return
+
+    def run() -> Dict[str, Any]:
+        results = sim.simulate()
+
+        # Add analysis
+        results['sink_faucet_analysis'] = calculate_sink_faucet_analysis(results)
+        results['velocity'] = calculate_velocity(
+            [results['initial_balance'], results['final_balance']], turns=args.turns
+        )
+        return results
+
+    # Run simulation (deterministic, so every run is cacheable)
+    print(f"Simulating economy for {args.turns} turns...")
+    if cache is None:
+        results = run()
+    else:
+        key = cache.key('economy_sim', source_version(__file__), config=config, turns=args.turns,
+                        history_points=args.history_points)
+        results = cache.get_or_compute(key, run)
 
     # Save results
     args.output.parent.mkdir(parents=True, exist_ok=True)
@@ -280,7 +1752,7 @@ def main():
             import matplotlib.pyplot as plt
 
             plt.figure(figsize=(12, 6))
-            turns = range(len(results['balance_history']))
+            turns = results.get('history_turns', range(len(results['balance_history'])))
             plt.plot(turns, results['balance_history'], linewidth=2)
             plt.xlabel('Turn', fontsize=12)
             plt.ylabel('Currency Balance', fontsize=12)
@@ -296,6 +1768,8 @@ def main():
         except ImportError:
             print("\nmatplotlib not available. Skipping chart generation.")
 
+    if cache is not None:
+        print(f"\n{cache.report()}")
     print(f"\nSaved results to: {args.output}")
 
 
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Batch encounter simulation over level-designer encounter files.
+
+Reads every encounter definition (level-designer/templates/encounter.json
+format) in a zone directory, translates it into a party_sim config -- the
+assumed player state against the enemy composition and its spawn waves --
+and simulates all encounters in parallel. Results go through the shared
+sim_cache keyed by the encounter content, run options and simulator code,
+so unchanged encounters are not simulated again.
+
+Outputs per-encounter win rate, duration and player death rate next to the
+designer's playtime target.
+"""
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import combat_sim
+import party_sim
+from party_sim import PARTY, build_party_simulator
+from sim_cache import ResultCache, add_cache_arguments, cache_from_args, canonical_hash, source_version
+
+
+def is_encounter(data: Any) -> bool:
+    """True for encounter-definition files (anything with an enemy_composition list)."""
+    return isinstance(data, dict) and isinstance(data.get('enemy_composition'), list)
+
+
+def find_encounters(zone_dir: Path) -> List[Path]:
+    """All encounter definition files under a zone directory, in path order."""
+    paths = []
+    for path in sorted(zone_dir.rglob('*.json')):
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        if is_encounter(data):
+            paths.append(path)
+    return paths
+
+
+def encounter_to_config(
+    encounter: Dict[str, Any],
+    party_size: int = 1,
+    max_time: float = 600.0,
+) -> Dict[str, Any]:
+    """
+    Translate an encounter definition into a party_sim config.
+
+    The player is built from difficulty.assumed_player_state (expected_hp,
+    expected_dps as attack_power at one attack per second, no crits since the
+    expected DPS already includes them). Each enemy_composition entry becomes
+    'count' enemies with stats.hp/damage/armor/speed (armor as a percent
+    reduction), spawning after spawn_delay_seconds. Enemy abilities are
+    folded into sustained damage: each adds damage / cooldown_seconds to the
+    enemy's DPS.
+
+    Args:
+        encounter: Parsed encounter definition
+        party_size: Number of identical players
+        max_time: Seconds before the fight is called a draw
+
+    Returns:
+        party_sim config dict
+    """
+    player_state = encounter.get('difficulty', {}).get('assumed_player_state', {})
+    player = {
+        'name': 'player',
+        'count': party_size,
+        'health': player_state.get('expected_hp', 100),
+        'attack_power': player_state.get('expected_dps', 10),
+        'armor': player_state.get('armor', 0),
+        'attack_speed': 1.0,
+        'critical_chance': 0.0,
+    }
+
+    enemies = []
+    for i, enemy in enumerate(encounter.get('enemy_composition', [])):
+        stats = enemy.get('stats', {})
+        speed = stats.get('speed', 1.0)
+        ability_dps = sum(
+            a.get('damage', 0) / a['cooldown_seconds']
+            for a in enemy.get('abilities', [])
+            if a.get('cooldown_seconds')
+        )
+        enemies.append({
+            'name': enemy.get('name', enemy.get('enemy_id', f'enemy_{i}')),
+            'count': enemy.get('count', 1),
+            'health': stats.get('hp', 100),
+            'attack_power': stats.get('damage', 10) + ability_dps / speed,
+            'armor': stats.get('armor', 0),
+            'attack_speed': speed,
+            'critical_chance': 0.0,
+            'spawn_time': enemy.get('spawn_delay_seconds', 0),
+        })
+
+    return {
+        'party': [player],
+        'enemies': enemies,
+        'party_targeting': 'lowest_hp',
+        'enemy_targeting': 'random',
+        'armor_formula': 'percent',
+        'max_time': max_time,
+    }
+
+
+def simulate_encounter(encounter: Dict[str, Any], options: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Simulate one encounter and compare it against the designer's targets.
+
+    A seeded run derives the encounter's own seed from its content hash, so
+    results do not depend on file order or worker count.
+
+    Args:
+        encounter: Parsed encounter definition
+        options: simulations, seed, party_size, max_time, engine
+
+    Returns:
+        Result dictionary for the encounter
+    """
+    config = encounter_to_config(encounter, options['party_size'], options['max_time'])
+    seed = None
+    if options['seed'] is not None:
+        seed = int(canonical_hash(encounter)[:15], 16) ^ options['seed']
+    sim = build_party_simulator(config, seed=seed)
+    stats = sim.run_simulations(options['simulations'], engine=options['engine'])
+
+    metadata = encounter.get('metadata', {})
+    difficulty = encounter.get('difficulty', {})
+    playtime = encounter.get('identity', {}).get('estimated_playtime_seconds', {})
+    players = [e for e in stats['entities'] if e['team'] == 'party']
+
+    result = {
+        'id': metadata.get('id'),
+        'name': metadata.get('name'),
+        'recommended_player_level': difficulty.get('recommended_player_level', {}).get('target'),
+        'enemies': len(sim.entities) - sim.entities.team.count(PARTY),
+        'party_win_rate': stats['party_win_rate'],
+        'average_duration': stats['average_duration'],
+        'duration_p90': stats['duration_p90'],
+        'player_death_rate': sum(p['death_rate'] for p in players) / len(players),
+        'stats': stats,
+    }
+    if playtime:
+        result['playtime_target'] = playtime
+        result['duration_in_range'] = (
+            playtime.get('min', 0) <= stats['average_duration'] <= playtime.get('max', float('inf'))
+        )
+    return result
+
+
+def _simulate_task(task: Tuple[Dict[str, Any], Dict[str, Any]]) -> Dict[str, Any]:
+    """Process-pool entry point: simulate one (encounter, options)."""
+    return simulate_encounter(*task)
+
+
+def run_zone(
+    paths: List[Path],
+    options: Dict[str, Any],
+    cache: Optional[ResultCache] = None,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Simulate a set of encounter files, reusing cached results.
+
+    Args:
+        paths: Encounter definition files
+        options: simulations, seed, party_size, max_time, engine
+        cache: Result cache (None disables caching; unseeded runs are not cached)
+        workers: Worker processes (one encounter per task)
+
+    Returns:
+        Batch dictionary with per-encounter results and cache counts
+    """
+    version = source_version(__file__, party_sim.__file__, combat_sim.__file__)
+    results: Dict[int, Dict[str, Any]] = {}
+    pending = []
+    for i, path in enumerate(paths):
+        with open(path, 'r') as f:
+            encounter = json.load(f)
+        key = None
+        if cache is not None and options['seed'] is not None:
+            key = cache.key('encounter_sim', version, encounter=encounter, options=options)
+            cached = cache.get(key)
+            if cached is not None:
+                cached['cached'] = True
+                results[i] = cached
+                continue
+        elif cache is not None:
+            cache.bypassed += 1
+        pending.append((i, key, (encounter, options)))
+
+    tasks = [task for _, _, task in pending]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            simulated = list(pool.map(_simulate_task, tasks))
+    else:
+        simulated = [_simulate_task(task) for task in tasks]
+
+    for (i, key, _), result in zip(pending, simulated):
+        if key is not None:
+            cache.put(key, result)
+        result['cached'] = False
+        results[i] = result
+
+    encounters = []
+    for i, path in enumerate(paths):
+        results[i]['file'] = str(path)
+        encounters.append(results[i])
+
+    return {
+        'type': 'encounter_batch',
+        'options': options,
+        'encounters': encounters,
+        'cache': {'hits': len(paths) - len(pending), 'misses': len(pending)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch encounter simulation over a zone directory')
+    parser.add_argument(
+        'zone',
+        type=Path,
+        help='Zone directory (searched recursively) or a single encounter file'
+    )
+    parser.add_argument(
+        '--simulations',
+        type=int,
+        default=2000,
+        help='Fights per encounter (default: 2000)'
+    )
+    parser.add_argument(
+        '--party-size',
+        type=int,
+        default=1,
+        help='Players per encounter, each with the assumed player state (default: 1)'
+    )
+    parser.add_argument(
+        '--max-time',
+        type=float,
+        default=600.0,
+        help='Seconds before a fight is called a draw (default: 600)'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['auto', 'python', 'numpy'],
+        default='auto',
+        help='Simulation engine (default: auto = numpy batch engine when installed)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Base random seed; each encounter derives its own (default: 0)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Worker processes; encounters are spread across them (default: 1)'
+    )
+    add_cache_arguments(parser)
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=Path('encounter_results.json'),
+        help='Output path for results JSON'
+    )
+
+    args = parser.parse_args()
+    if args.party_size < 1:
+        parser.error('--party-size must be at least 1')
+
+    paths = [args.zone] if args.zone.is_file() else find_encounters(args.zone)
+    if not paths:
+        parser.error(f'no encounter definitions found in {args.zone}')
+
+    cache = cache_from_args(args)
+    options = {
+        'simulations': args.simulations,
+        'seed': args.seed,
+        'party_size': args.party_size,
+        'max_time': args.max_time,
+        'engine': args.engine,
+    }
+
+    print(f"Simulating {len(paths)} encounters ({args.simulations} fights each)...")
+    batch = run_zone(paths, options, cache=cache, workers=args.workers)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(batch, f, indent=2)
+
+    print(f"\nEncounter Results:")
+    print(f"  {'encounter':<32} {'lvl':>4} {'win':>7} {'duration':>9} {'deaths':>7}  target")
+    for result in batch['encounters']:
+        playtime = result.get('playtime_target')
+        target = (f"{playtime.get('min')}-{playtime.get('max')}s"
+                  f"{'' if result['duration_in_range'] else ' (out of range)'}") if playtime else '-'
+        print(f"  {str(result['name'] or result['id'])[:32]:<32} "
+              f"{str(result['recommended_player_level'] or '-'):>4} "
+              f"{result['party_win_rate']:>7.1%} {result['average_duration']:>8.1f}s "
+              f"{result['player_death_rate']:>7.1%}  {target}")
+    if cache is not None:
+        print(f"\n  {cache.report()}")
+    print(f"\nSaved results to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+Level-range combat sweep driven by stat_curves.py curve definitions.
+
+Each side's stats are given as curves (the stat_curves.py curve types) or
+constants. Every curve is evaluated once for the whole level range, each
+level's attacker-vs-defender matchup is built from the curve values, and all
+levels are simulated as one task list across the process pool. Levels whose
+stats resolve to the same fight (stepped or capped curves) are simulated once.
+
+Results are cached per matchup through sim_cache, keyed by the level's
+resolved stats, so re-running a sweep after editing one curve only simulates
+the levels that curve actually changed.
+
+Outputs a level -> (win rate, TTK) table; the parallel 'levels' /
+'attacker_win_rate' / 'average_turns' arrays plot directly with
+visualize.py --x-key levels --y-key attacker_win_rate.
+"""
+
+import argparse
+import json
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import combat_sim
+import stat_curves
+from combat_sim import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_EXACT_MAX_STATES,
+    build_simulator,
+    load_config,
+    parse_combatant,
+    profile_key,
+    simulator_options,
+)
+from sim_cache import ResultCache, add_cache_arguments, cache_from_args, canonical_hash, source_version
+
+
+# Stats that are probabilities; curve values are clamped to [0, 1]
+CHANCE_STATS = ('critical_chance', 'dodge_chance')
+
+# Config keys shared by every level's matchup
+MATCHUP_KEYS = ('armor_formula', 'armor_value', 'max_turns', 'timeline', 'max_time')
+
+
+def sweep_levels(sweep_config: Dict[str, Any]) -> List[int]:
+    """Attacker levels covered by a sweep (min_level..max_level every step)."""
+    min_level = sweep_config.get('min_level', 1)
+    max_level = sweep_config.get('max_level', 100)
+    step = sweep_config.get('step', 1)
+    if min_level < 1 or max_level < min_level or step < 1:
+        raise ValueError("Sweep needs 1 <= min_level <= max_level and step >= 1")
+    return list(range(min_level, max_level + 1, step))
+
+
+def evaluate_curves(side_config: Dict[str, Any], max_level: int) -> Dict[str, Dict[int, float]]:
+    """
+    Evaluate every stat curve of one side for levels 1..max_level.
+
+    Args:
+        side_config: Combatant config whose 'curves' maps stat name to
+                     {'type', 'base', 'growth', 'cap'} (stat_curves.py
+                     parameters) or to a constant
+        max_level: Highest level needed
+
+    Returns:
+        Dictionary mapping stat name to {level: value}
+    """
+    values = {}
+    for stat, curve in side_config.get('curves', {}).items():
+        if isinstance(curve, (int, float)):
+            values[stat] = {level: float(curve) for level in range(1, max_level + 1)}
+            continue
+        values[stat] = stat_curves.generate_curve(
+            curve_type=curve.get('type', 'linear'),
+            base=curve['base'],
+            max_level=max_level,
+            growth=curve.get('growth', 0.0),
+            cap=curve.get('cap'),
+        )
+    for stat in CHANCE_STATS:
+        if stat in values:
+            values[stat] = {level: min(max(v, 0.0), 1.0) for level, v in values[stat].items()}
+    return values
+
+
+def combatant_at(side_config: Dict[str, Any], curves: Dict[str, Dict[int, float]], level: int) -> Dict[str, Any]:
+    """Plain combat_sim combatant config for one side at one level."""
+    combatant = {k: v for k, v in side_config.items() if k != 'curves'}
+    for stat, by_level in curves.items():
+        combatant[stat] = by_level[level]
+    return combatant
+
+
+def level_configs(sweep_config: Dict[str, Any]) -> List[Tuple[int, int, Dict[str, Any]]]:
+    """
+    Resolve a sweep into one combat_sim config per level.
+
+    The defender fights at attacker level + defender_level_offset (at least 1).
+
+    Args:
+        sweep_config: Sweep definition (see module docstring)
+
+    Returns:
+        List of (attacker_level, defender_level, combat config)
+    """
+    levels = sweep_levels(sweep_config)
+    offset = sweep_config.get('defender_level_offset', 0)
+    defender_levels = [max(1, level + offset) for level in levels]
+    attacker_side = sweep_config.get('attacker', {})
+    defender_side = sweep_config.get('defender', {})
+    attacker_curves = evaluate_curves(attacker_side, max(levels))
+    defender_curves = evaluate_curves(defender_side, max(defender_levels))
+    shared = {k: sweep_config[k] for k in MATCHUP_KEYS if k in sweep_config}
+
+    return [
+        (level, defender_level, {
+            **shared,
+            'attacker': combatant_at(attacker_side, attacker_curves, level),
+            'defender': combatant_at(defender_side, defender_curves, defender_level),
+        })
+        for level, defender_level in zip(levels, defender_levels)
+    ]
+
+
+def matchup_key(config: Dict[str, Any]) -> Tuple:
+    """Key under which two level configs produce the same fights."""
+    options = simulator_options(config)
+    return (options['cls'].__name__, options['max_turns'], options.get('max_time')) + tuple(
+        profile_key(*parse_combatant(config[side]), options['armor_formula'], options['armor_value'])
+        for side in ('attacker', 'defender')
+    )
+
+
+def _simulate_task(task: Tuple[Dict[str, Any], Optional[int], Dict[str, Any]]) -> Dict[str, Any]:
+    """Process-pool entry point: simulate one level's matchup."""
+    config, seed, matchup_options = task
+    return combat_sim.run_matchup(build_simulator(config, seed=seed), **matchup_options)
+
+
+def run_sweep(
+    sweep_config: Dict[str, Any],
+    matchup_options: Dict[str, Any],
+    seed: Optional[int] = None,
+    cache: Optional[ResultCache] = None,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Simulate every level of a sweep.
+
+    A seeded run derives each matchup's seed from its resolved stats, so a
+    level's result does not depend on the level range, step or worker count
+    (and can be reused from the cache by any sweep that contains it).
+
+    Args:
+        sweep_config: Sweep definition
+        matchup_options: Passed to combat_sim.run_matchup (simulations,
+                         exact, target_ci, engine, ...)
+        seed: Base random seed (None = unseeded and uncached)
+        cache: Result cache (None disables caching)
+        workers: Worker processes (one matchup per task)
+
+    Returns:
+        Sweep dictionary with the per-level table
+    """
+    configs = level_configs(sweep_config)
+    version = source_version(__file__, combat_sim.__file__, stat_curves.__file__)
+
+    # One task per distinct matchup
+    unique: Dict[Tuple, int] = {}
+    matchups: List[Dict[str, Any]] = []
+    matchup_of: List[int] = []
+    for _, _, config in configs:
+        key = matchup_key(config)
+        if key not in unique:
+            unique[key] = len(matchups)
+            matchups.append(config)
+        matchup_of.append(unique[key])
+
+    results: Dict[int, Dict[str, Any]] = {}
+    pending = []
+    for m, config in enumerate(matchups):
+        cache_key = None
+        if cache is not None and seed is not None:
+            cache_key = cache.key('level_sweep', version, config=config, seed=seed, options=matchup_options)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                results[m] = cached
+                continue
+        elif cache is not None:
+            cache.bypassed += 1
+        matchup_seed = None if seed is None else int(canonical_hash(config)[:15], 16) ^ seed
+        pending.append((m, cache_key, (config, matchup_seed, matchup_options)))
+
+    tasks = [task for _, _, task in pending]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            simulated = list(pool.map(_simulate_task, tasks))
+    else:
+        simulated = [_simulate_task(task) for task in tasks]
+
+    for (m, cache_key, _), result in zip(pending, simulated):
+        if cache_key is not None:
+            cache.put(cache_key, result)
+        results[m] = result
+
+    table = []
+    for (level, defender_level, config), m in zip(configs, matchup_of):
+        stats = results[m]
+        table.append({
+            'level': level,
+            'defender_level': defender_level,
+            'attacker_win_rate': stats['attacker_win_rate'],
+            'defender_win_rate': stats['defender_win_rate'],
+            'draw_rate': stats['draw_rate'],
+            'average_turns': stats['average_turns'],
+            'turns_p90': stats['turns_p90'],
+            'time_unit': stats.get('time_unit', 'turns'),
+            'attacker': {k: v for k, v in config['attacker'].items() if k != 'abilities'},
+            'defender': {k: v for k, v in config['defender'].items() if k != 'abilities'},
+        })
+
+    # Levels where the attacker's win rate crosses 50%
+    crossovers = [
+        row['level'] for prev, row in zip(table, table[1:])
+        if (prev['attacker_win_rate'] - 0.5) * (row['attacker_win_rate'] - 0.5) < 0
+    ]
+
+    return {
+        'type': 'level_sweep',
+        'levels': [row['level'] for row in table],
+        'attacker_win_rate': [row['attacker_win_rate'] for row in table],
+        'average_turns': [row['average_turns'] for row in table],
+        'table': table,
+        'crossover_levels': crossovers,
+        'matchups_evaluated': len(matchups),
+        'cache': {'hits': len(matchups) - len(pending), 'misses': len(pending)},
+    }
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Level-range combat sweep from stat curves')
+    parser.add_argument(
+        '--config',
+        type=Path,
+        required=True,
+        help='Sweep JSON: attacker/defender with "curves" per stat, min_level, max_level, step'
+    )
+    parser.add_argument(
+        '--simulations',
+        type=int,
+        default=1000,
+        help='Fights per level (default: 1000)'
+    )
+    parser.add_argument(
+        '--exact',
+        action='store_true',
+        help='Solve each level exactly (falls back to Monte Carlo on large state spaces)'
+    )
+    parser.add_argument(
+        '--exact-max-states',
+        type=int,
+        default=DEFAULT_EXACT_MAX_STATES,
+        help=f'Live states per side before --exact falls back (default: {DEFAULT_EXACT_MAX_STATES})'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['auto', 'python', 'numpy'],
+        default='auto',
+        help='Simulation engine (default: auto = numpy batch engine when installed)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='Base random seed; each level derives its own (default: 0)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Worker processes; levels are spread across them (default: 1)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Fights per batch (default: {DEFAULT_BATCH_SIZE})'
+    )
+    add_cache_arguments(parser)
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=Path('level_sweep.json'),
+        help='Output path for results JSON'
+    )
+
+    args = parser.parse_args()
+
+    sweep_config = load_config(args.config)
+    try:
+        levels = sweep_levels(sweep_config)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache = cache_from_args(args)
+    matchup_options = {
+        'simulations': args.simulations,
+        'exact': args.exact,
+        'exact_max_states': args.exact_max_states,
+        'engine': args.engine,
+        'batch_size': args.batch_size,
+    }
+
+    print(f"Sweeping levels {levels[0]}-{levels[-1]} ({len(levels)} matchups, "
+          f"{'exact' if args.exact else f'{args.simulations} fights each'})...")
+    sweep = run_sweep(sweep_config, matchup_options, seed=args.seed, cache=cache, workers=args.workers)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(sweep, f, indent=2)
+
+    table = sweep['table']
+    unit = 's' if table[0]['time_unit'] == 'seconds' else ''
+    stride = max(1, len(table) // 20)
+    shown = set(range(0, len(table), stride)) | {len(table) - 1}
+    shown |= {i for i, row in enumerate(table) if row['level'] in sweep['crossover_levels']}
+    print(f"\nLevel Sweep:")
+    print(f"  {'level':>5} {'def lvl':>7} {'att win':>8} {'def win':>8} {'TTK':>8} {'P90':>8}")
+    for i in sorted(shown):
+        row = table[i]
+        print(f"  {row['level']:>5} {row['defender_level']:>7} {row['attacker_win_rate']:>8.1%} "
+              f"{row['defender_win_rate']:>8.1%} {row['average_turns']:>7.1f}{unit or ' '} "
+              f"{row['turns_p90']:>7.1f}{unit or ' '}")
+    if len(shown) < len(table):
+        print(f"  ({len(table) - len(shown)} more levels in {args.output})")
+    if sweep['crossover_levels']:
+        print(f"\n  Attacker win rate crosses 50% at level(s): "
+              f"{', '.join(str(level) for level in sweep['crossover_levels'])}")
+    print(f"  Distinct matchups simulated: {sweep['matchups_evaluated']} of {len(table)} levels")
+    if cache is not None:
+        print(f"\n  {cache.report()}")
+    print(f"\nSaved sweep to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -10,10 +10,13 @@ and time-to-drop calculations.
 import argparse
 import json
 import math
+import random
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 from collections import Counter
 
+from sim_cache import add_cache_arguments, cache_from_args, source_version
+
 
 class LootItem:
     """Represents a lootable item with drop rate."""
@@ -35,14 +38,16 @@ class LootItem:
 class LootTable:
     """Manages loot item definitions and probabilities."""
 
-    def __init__(self, items: List[LootItem]):
+    def __init__(self, items: List[LootItem], seed: Optional[int] = None):
         """
         Initialize loot table.
 
         Args:
             items: List of LootItem objects
+            seed: Random seed for reproducible drops (None = unseeded)
         """
         self.items = items
+        self.rng = random.Random(seed)
         self._normalize_weights()
 
     def _normalize_weights(self):
@@ -78,8 +83,7 @@ class LootTable:
         Returns:
             Name of dropped item
         """
-        import random
-        r = random.random()
+        r = self.rng.random()
         cumulative = 0
 
         for item in self.items:
@@ -250,6 +254,13 @@ def main():
         default=10.0,
         help='Kills per hour (for time-to-drop calculations)'
     )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducibility (required for caching)'
+    )
+    add_cache_arguments(parser)
     parser.add_argument(
         '--output',
         type=Path,
@@ -272,20 +283,32 @@ def main():
         )
         items.append(item)
 
-    loot_table = LootTable(items)
+    loot_table = LootTable(items, seed=args.seed)
+
+    def run() -> Dict[str, Any]:
+        results = simulate_drops(loot_table, args.drops)
+
+        # Add time-to-drop calculations
+        results['time_to_drop'] = {}
+        for item_name, expected_rate in results['expected_rates'].items():
+            results['time_to_drop'][item_name] = calculate_time_to_drop(
+                expected_rate,
+                args.kill_rate,
+                target_quantity=1
+            )
+        return results
 
     # Simulate drops
     print(f"Simulating {args.drops} drops...")
-    results = simulate_drops(loot_table, args.drops)
-
-    # Add time-to-drop calculations
-    results['time_to_drop'] = {}
-    for item_name, expected_rate in results['expected_rates'].items():
-        results['time_to_drop'][item_name] = calculate_time_to_drop(
-            expected_rate,
-            args.kill_rate,
-            target_quantity=1
-        )
+    cache = cache_from_args(args)
+    if cache is None:
+        results = run()
+    else:
+        key = None
+        if args.seed is not None:
+            key = cache.key('loot_sim', source_version(__file__), config=config,
+                            drops=args.drops, kill_rate=args.kill_rate, seed=args.seed)
+        results = cache.get_or_compute(key, run)
 
     # Save results
     args.output.parent.mkdir(parents=True, exist_ok=True)
@@ -315,6 +338,8 @@ def main():
     print(f"  χ² = {chi['chi_squared']:.4f}")
     print(f"  Significant? {chi['significant']}")
 
+    if cache is not None:
+        print(f"\n{cache.report()}")
     print(f"\nSaved results to: {args.output}")
 
 
@@ -0,0 +1,536 @@
+#!/usr/bin/env python3
+"""
+Player-to-player market simulator for game economy balancing.
+
+Agents post buy and sell limit orders for items; each item has a limit order
+book (a bid heap and an ask heap with price-time priority) that is matched
+every tick. Trades pay a transaction tax and listings a listing fee, both
+removed from the economy (sinks); unsold listings go to the NPC vendor when
+they expire (a faucet).
+
+Model:
+    - Every agent earns daily_income (lognormal across agents) at the start
+      of each day and starts with starting_cash.
+    - Sell orders arrive at supply_per_day per item (loot drops listed right
+      away), asking the item's reference price with lognormal noise, never
+      below vendor_price. The listing fee is paid when posting.
+    - Buy orders arrive at demand_per_day per item. A buyer values the item at
+      base_price x (cash / starting_cash) ^ wealth_elasticity with lognormal
+      noise, so a growing money supply raises bids. The bid is escrowed;
+      orders the agent cannot pay for are rejected.
+    - A trade executes at the price of the earlier order; the buyer gets the
+      difference to their bid back and consumes the item.
+    - The reference price follows the tick's average trade price, or the
+      mid price when the book has both sides but nothing traded.
+
+Order generation and cash bookkeeping are vectorized with NumPy per tick; the
+books are heapq heaps, and only the crossing top of each book is touched
+when matching. Expired orders are dropped lazily at the top of the book and
+swept once per day, so a day of millions of orders runs in seconds on one
+core.
+
+The output is one entry per day in the format inflation_tracker.py
+(economy-designer) reads: period, currency_supply (cash plus escrowed bids),
+transaction_volume (currency traded) and price_index (a fixed basket of each
+item's demand_per_day, 100 = every item trading at base_price), plus trade,
+sink and per-item price details.
+
+Usage:
+    python market_sim.py --config market.json --days 30 --seed 42
+    python ../../economy-designer/scripts/inflation_tracker.py --data market_periods.json
+"""
+
+import argparse
+import heapq
+import json
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+from sim_cache import add_cache_arguments, cache_from_args, source_version
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional at import time; simulating needs it
+    np = None
+
+
+# Market defaults: ticks (matching rounds) per day, order lifetime in ticks,
+# lognormal spread of bid/ask prices, and how strongly an agent's bids follow
+# their cash relative to starting_cash
+DEFAULT_TICKS_PER_DAY = 96
+DEFAULT_PRICE_SPREAD = 0.15
+DEFAULT_WEALTH_ELASTICITY = 0.5
+
+# Sinks: share of each sale taken as tax, share of each ask paid to list
+DEFAULT_TAX_RATE = 0.05
+DEFAULT_LISTING_FEE = 0.0
+
+# Agents and their cash: starting cash, daily income and lognormal spreads
+DEFAULT_AGENTS = 10_000
+DEFAULT_STARTING_CASH = 1000.0
+DEFAULT_CASH_SIGMA = 1.0
+DEFAULT_DAILY_INCOME = 100.0
+DEFAULT_INCOME_SIGMA = 0.5
+
+# Order book keys: prices are whole ticks of base_price / PRICE_RESOLUTION,
+# packed above a SEQ_BITS order sequence number into one int so that a single
+# comparison gives price-time priority. Prices are capped at MAX_PRICE_TICKS
+# (about 6700x base_price) to keep keys within 63 bits
+PRICE_RESOLUTION = 10_000
+SEQ_BITS = 36
+SEQ_MASK = (1 << SEQ_BITS) - 1
+MAX_PRICE_TICKS = (1 << (62 - SEQ_BITS)) - 1
+
+
+def _affordable(agents: 'np.ndarray', spend: 'np.ndarray', cash: 'np.ndarray') -> 'np.ndarray':
+    """
+    Orders each agent can pay for out of their cash, in order.
+
+    An order is accepted when the agent's running total of spend up to and
+    including it fits in their cash, so several orders by one agent in the
+    same tick can never overdraw.
+
+    Args:
+        agents: Agent index per order
+        spend: Cash the order needs (escrowed bid or listing fee)
+        cash: Cash per agent
+
+    Returns:
+        Boolean mask of accepted orders
+    """
+    order = np.argsort(agents, kind='stable')
+    sorted_agents = agents[order]
+    sorted_spend = spend[order]
+    running = np.cumsum(sorted_spend)
+    start = np.ones(len(order), dtype=bool)
+    start[1:] = sorted_agents[1:] != sorted_agents[:-1]
+    first = np.maximum.accumulate(np.where(start, np.arange(len(order)), 0))
+    spent = running - (running - sorted_spend)[first]
+    accepted = np.empty(len(order), dtype=bool)
+    accepted[order] = spent <= cash[sorted_agents]
+    return accepted
+
+
+class MarketSimulator:
+    """Agent-based player market with one limit order book per item."""
+
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        days: int = 30,
+        agents: Optional[int] = None,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize market simulator.
+
+        Args:
+            config: Market config: items ([{name, base_price, vendor_price,
+                    supply_per_day, demand_per_day}]) and optional agents,
+                    starting_cash, cash_sigma, daily_income, income_sigma,
+                    tax_rate, listing_fee, ticks_per_day, order_ttl (ticks,
+                    default one day), price_spread, wealth_elasticity
+            days: Days to simulate (one output period per day)
+            agents: Agents to simulate (default: config agents, else 10000)
+            seed: Random seed
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for market simulation")
+        self.config = config
+        self.days = days
+        self.agents = agents or config.get('agents', DEFAULT_AGENTS)
+        self.rng = np.random.default_rng(seed)
+
+        self.items = config.get('items', [])
+        if not self.items:
+            raise ValueError("Market config needs at least one item")
+        self.names = [item.get('name', f'item_{i}') for i, item in enumerate(self.items)]
+        self.base_price = np.array([float(item['base_price']) for item in self.items])
+        self.vendor_price = np.array([float(item.get('vendor_price', 0.0)) for item in self.items])
+        self.supply = np.array([float(item.get('supply_per_day', 0.0)) for item in self.items])
+        self.demand = np.array([float(item.get('demand_per_day', 0.0)) for item in self.items])
+
+        self.starting_cash = config.get('starting_cash', DEFAULT_STARTING_CASH)
+        self.cash_sigma = config.get('cash_sigma', DEFAULT_CASH_SIGMA)
+        self.daily_income = config.get('daily_income', DEFAULT_DAILY_INCOME)
+        self.income_sigma = config.get('income_sigma', DEFAULT_INCOME_SIGMA)
+        self.tax_rate = config.get('tax_rate', DEFAULT_TAX_RATE)
+        self.listing_fee = config.get('listing_fee', DEFAULT_LISTING_FEE)
+        self.ticks_per_day = config.get('ticks_per_day', DEFAULT_TICKS_PER_DAY)
+        self.order_ttl = config.get('order_ttl', self.ticks_per_day)
+        self.price_spread = config.get('price_spread', DEFAULT_PRICE_SPREAD)
+        self.wealth_elasticity = config.get('wealth_elasticity', DEFAULT_WEALTH_ELASTICITY)
+
+    def _lognormal(self, sigma: float, size: int) -> 'np.ndarray':
+        """Lognormal multipliers with mean 1."""
+        return self.rng.lognormal(-sigma * sigma / 2, sigma, size)
+
+    def spawn_agents(self) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        Draw starting cash and daily income per agent.
+
+        Returns:
+            (cash, daily income) arrays
+        """
+        cash = self.starting_cash * self._lognormal(self.cash_sigma, self.agents)
+        income = self.daily_income * self._lognormal(self.income_sigma, self.agents)
+        return cash, income
+
+    def _remember_agents(self, seqs: 'np.ndarray', agents: 'np.ndarray', end_seq: int) -> None:
+        """
+        Record the agent of each new order in the ring buffer indexed by seq.
+
+        The buffer covers every order that can still be in a book (seq from
+        self._oldest_seq on) and doubles when a tick would overrun it.
+
+        Args:
+            seqs: Sequence numbers of the new orders
+            agents: Agent per order
+            end_seq: One past the largest sequence number in use
+        """
+        ring = self._order_agent
+        if end_seq - self._oldest_seq > len(ring):
+            capacity = len(ring)
+            while end_seq - self._oldest_seq > capacity:
+                capacity *= 2
+            kept = np.arange(self._oldest_seq, end_seq - len(seqs))
+            grown = np.zeros(capacity, dtype=np.int64)
+            grown[kept & (capacity - 1)] = ring[kept & (len(ring) - 1)]
+            ring = self._order_agent = grown
+        ring[seqs & (len(ring) - 1)] = agents
+
+    def _apply_credits(self, cash: 'np.ndarray') -> None:
+        """Pay out the cash movements collected since the last call."""
+        if self._credit_seqs:
+            seqs = np.array(self._credit_seqs, dtype=np.int64)
+            agents = self._order_agent[seqs & (len(self._order_agent) - 1)]
+            cash += np.bincount(agents, self._credit_amounts, minlength=len(cash))
+            self._credit_seqs.clear()
+            self._credit_amounts.clear()
+
+    def _match(self, item: int, cutoff: int) -> Tuple[int, float]:
+        """
+        Match one item's book until its best bid and ask no longer cross.
+
+        Orders with a sequence number below cutoff have expired; those met at
+        the top of the book are removed: bids refund their escrow, asks sell
+        to the vendor. Cash movements are appended to self._credit_seqs /
+        self._credit_amounts (keyed by order) and paid out per tick.
+
+        Args:
+            item: Item index
+            cutoff: First sequence number still live
+
+        Returns:
+            (trades, traded volume)
+        """
+        bids = self._bids[item]
+        asks = self._asks[item]
+        credit_seqs = self._credit_seqs
+        credit_amounts = self._credit_amounts
+        unit = self._unit[item]
+        keep = (1.0 - self.tax_rate) * unit
+        vendor = self._vendor[item]
+        heappop = heapq.heappop
+        bits, mask = SEQ_BITS, SEQ_MASK
+        trades = volume = released = vendor_sales = 0
+        while bids and asks:
+            bid = bids[0]
+            bid_seq = bid & mask
+            if bid_seq < cutoff:
+                heappop(bids)
+                refund = -(bid >> bits)
+                credit_seqs.append(bid_seq)
+                credit_amounts.append(refund * unit)
+                released += refund
+                continue
+            ask = asks[0]
+            ask_seq = ask & mask
+            if ask_seq < cutoff:
+                heappop(asks)
+                if vendor:
+                    credit_seqs.append(ask_seq)
+                    credit_amounts.append(vendor)
+                    vendor_sales += 1
+                continue
+            bid_price = -(bid >> bits)
+            ask_price = ask >> bits
+            if bid_price < ask_price:
+                break
+            heappop(bids)
+            heappop(asks)
+            price = ask_price if ask_seq < bid_seq else bid_price
+            credit_seqs.append(ask_seq)
+            credit_amounts.append(price * keep)
+            if price != bid_price:
+                credit_seqs.append(bid_seq)
+                credit_amounts.append((bid_price - price) * unit)
+            released += bid_price
+            trades += 1
+            volume += price
+        self._escrow -= released * unit
+        self._vendor_paid += vendor * vendor_sales
+        return trades, volume * unit
+
+    def _sweep(self, cutoff: int) -> None:
+        """Remove every expired order from all books (refunds and vendor sales)."""
+        for item in range(len(self.items)):
+            for books, is_bid in ((self._bids, True), (self._asks, False)):
+                keys = np.array(books[item], dtype=np.int64)
+                expired = (keys & SEQ_MASK) < cutoff
+                if not expired.any():
+                    continue
+                gone = keys[expired]
+                if is_bid:
+                    refunds = -(gone >> SEQ_BITS) * self._unit[item]
+                    self._credit_seqs.extend((gone & SEQ_MASK).tolist())
+                    self._credit_amounts.extend(refunds.tolist())
+                    self._escrow -= float(refunds.sum())
+                elif self._vendor[item]:
+                    self._credit_seqs.extend((gone & SEQ_MASK).tolist())
+                    self._credit_amounts.extend([self._vendor[item]] * len(gone))
+                    self._vendor_paid += self._vendor[item] * len(gone)
+                live = keys[~expired].tolist()
+                heapq.heapify(live)
+                books[item] = live
+
+    def simulate(self) -> List[Dict[str, Any]]:
+        """
+        Run the market simulation.
+
+        Returns:
+            One dictionary per day: period, currency_supply,
+            transaction_volume, price_index (inflation_tracker.py format) and
+            orders, rejected_orders, trades, income, tax_collected,
+            listing_fees, vendor_paid, open_orders and per-item prices
+        """
+        n = self.agents
+        n_items = len(self.items)
+        rng = self.rng
+        ticks_per_day = self.ticks_per_day
+        cash, income = self.spawn_agents()
+        buy_rate = self.demand / ticks_per_day
+        sell_rate = self.supply / ticks_per_day
+        item_index = np.arange(n_items)
+        unit = self.base_price / PRICE_RESOLUTION
+        vendor_ticks = np.ceil(self.vendor_price / unit)
+        reference = self.base_price.copy()
+        prices = self.base_price.copy()
+        basket = self.demand if self.demand.sum() > 0 else np.ones(n_items)
+        base_cost = float((basket * self.base_price).sum())
+        spread = self.price_spread
+
+        self._bids: List[List[int]] = [[] for _ in range(n_items)]
+        self._asks: List[List[int]] = [[] for _ in range(n_items)]
+        self._unit = unit.tolist()
+        self._vendor = self.vendor_price.tolist()
+        self._escrow = 0.0
+        self._vendor_paid = 0.0
+        self._credit_seqs: List[int] = []
+        self._credit_amounts: List[float] = []
+        self._order_agent = np.zeros(1 << 16, dtype=np.int64)
+        self._oldest_seq = 0
+        tick_first_seq: List[int] = []
+        heappush = heapq.heappush
+        seq = 0
+
+        periods = []
+        for day in range(self.days):
+            cash += income
+            self._vendor_paid = 0.0
+            orders = rejected = trades = 0
+            volume = fees = 0.0
+            item_trades = np.zeros(n_items, dtype=np.int64)
+            item_volume = np.zeros(n_items)
+
+            for t in range(ticks_per_day):
+                tick = day * ticks_per_day + t
+                tick_first_seq.append(seq)
+                expired_tick = tick - self.order_ttl
+                cutoff = tick_first_seq[expired_tick + 1] if expired_tick >= 0 else 0
+
+                buy_items = np.repeat(item_index, rng.poisson(buy_rate))
+                sell_items = np.repeat(item_index, rng.poisson(sell_rate))
+                nb, ns = len(buy_items), len(sell_items)
+                buyers = rng.integers(0, n, nb)
+                sellers = rng.integers(0, n, ns)
+
+                wealth = np.maximum(cash[buyers], 0.0) / self.starting_cash
+                bids = (self.base_price[buy_items] * wealth ** self.wealth_elasticity
+                        * np.exp(spread * rng.standard_normal(nb)))
+                bid_ticks = np.minimum(np.floor(bids / unit[buy_items]), MAX_PRICE_TICKS).astype(np.int64)
+                asks = reference[sell_items] * np.exp(spread * rng.standard_normal(ns))
+                ask_ticks = np.clip(np.ceil(asks / unit[sell_items]), vendor_ticks[sell_items],
+                                    MAX_PRICE_TICKS).astype(np.int64)
+                escrow = bid_ticks * unit[buy_items]
+                listing = ask_ticks * unit[sell_items] * self.listing_fee
+
+                payers = np.concatenate((buyers, sellers))
+                spend = np.concatenate((escrow, listing))
+                accepted = _affordable(payers, spend, cash)
+                accepted[:nb] &= bid_ticks > 0
+                cash -= np.bincount(payers[accepted], spend[accepted], minlength=n)
+                bid_ok, ask_ok = accepted[:nb], accepted[nb:]
+                self._escrow += float(escrow[bid_ok].sum())
+                fees += float(listing[ask_ok].sum())
+                orders += nb + ns
+                rejected += nb + ns - int(accepted.sum())
+
+                # Random arrival order within the tick decides time priority;
+                # keys pack price and sequence so one int comparison orders
+                # by price, then time (bids negated to pop the highest first)
+                order_seq = seq + rng.permutation(nb + ns)
+                seq += nb + ns
+                self._remember_agents(order_seq, payers, seq)
+                bid_keys = -(bid_ticks[bid_ok] << SEQ_BITS) + order_seq[:nb][bid_ok]
+                ask_keys = (ask_ticks[ask_ok] << SEQ_BITS) + order_seq[nb:][ask_ok]
+                bid_counts = np.bincount(buy_items[bid_ok], minlength=n_items)
+                ask_counts = np.bincount(sell_items[ask_ok], minlength=n_items)
+                for books, keys, counts in ((self._bids, bid_keys, bid_counts),
+                                            (self._asks, ask_keys, ask_counts)):
+                    # Items arrive grouped (np.repeat), so each book gets a slice
+                    keys = keys.tolist()
+                    start = 0
+                    for item, count in enumerate(counts.tolist()):
+                        if count:
+                            book = books[item]
+                            for key in keys[start:start + count]:
+                                heappush(book, key)
+                            start += count
+
+                for item in np.flatnonzero(bid_counts + ask_counts).tolist():
+                    count, traded = self._match(item, cutoff)
+                    if count:
+                        item_trades[item] += count
+                        item_volume[item] += traded
+                        reference[item] = traded / count
+                    elif self._bids[item] and self._asks[item]:
+                        best_bid = -(self._bids[item][0] >> SEQ_BITS)
+                        best_ask = self._asks[item][0] >> SEQ_BITS
+                        reference[item] = (best_bid + best_ask) / 2 * unit[item]
+                    trades += count
+                    volume += traded
+                self._apply_credits(cash)
+
+            # Daily sweep of orders that expired deeper in the books
+            last_tick = (day + 1) * ticks_per_day - 1
+            expired_tick = last_tick + 1 - self.order_ttl
+            if expired_tick >= 0:
+                self._sweep(tick_first_seq[expired_tick])
+                self._apply_credits(cash)
+                self._oldest_seq = tick_first_seq[expired_tick]
+
+            tax = volume * self.tax_rate
+            traded = item_trades > 0
+            prices[traded] = item_volume[traded] / item_trades[traded]
+            periods.append({
+                'period': day,
+                'currency_supply': round(float(cash.sum()) + self._escrow, 2),
+                'transaction_volume': round(volume, 2),
+                'price_index': round(100.0 * float((basket * prices).sum()) / base_cost, 4),
+                'orders': orders,
+                'rejected_orders': rejected,
+                'trades': trades,
+                'income': round(float(income.sum()), 2),
+                'tax_collected': round(tax, 2),
+                'listing_fees': round(fees, 2),
+                'vendor_paid': round(self._vendor_paid, 2),
+                'open_orders': sum(len(b) for b in self._bids) + sum(len(a) for a in self._asks),
+                'items': {
+                    name: {'price': round(float(price), 4), 'trades': int(count)}
+                    for name, price, count in zip(self.names, prices, item_trades)
+                },
+            })
+        return periods
+
+
+def load_market_config(config_path: Path) -> Dict[str, Any]:
+    """Load market configuration from JSON."""
+    with open(config_path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    """Main CLI entry point."""
+    parser = argparse.ArgumentParser(description='Player market (limit order book) simulator')
+    parser.add_argument(
+        '--config',
+        type=Path,
+        required=True,
+        help='Market configuration JSON file'
+    )
+    parser.add_argument(
+        '--days',
+        type=int,
+        default=30,
+        help='Days to simulate; one output period per day (default: 30)'
+    )
+    parser.add_argument(
+        '--agents',
+        type=int,
+        default=None,
+        help=f'Trading agents (default: config "agents", else {DEFAULT_AGENTS})'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed (runs are cached only when seeded)'
+    )
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=Path('market_periods.json'),
+        help='Output path for the per-day series (inflation_tracker.py --data format)'
+    )
+    add_cache_arguments(parser)
+
+    args = parser.parse_args()
+
+    config = load_market_config(args.config)
+    cache = cache_from_args(args)
+    if np is None:
+        parser.error('market simulation needs NumPy')
+    sim = MarketSimulator(config, days=args.days, agents=args.agents, seed=args.seed)
+
+    orders_per_day = float(sim.supply.sum() + sim.demand.sum())
+    print(f"Simulating {sim.agents:,} agents trading {len(sim.items)} items for {args.days} days "
+          f"(~{orders_per_day:,.0f} orders/day)...")
+    if cache is None:
+        periods = sim.simulate()
+    else:
+        key = None
+        if args.seed is not None:
+            key = cache.key('market_sim', source_version(__file__), config=config,
+                            days=args.days, agents=sim.agents, seed=args.seed)
+        # The cache stores dictionaries; the series is wrapped for storage
+        periods = cache.get_or_compute(key, lambda: {'periods': sim.simulate()})['periods']
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(periods, f, indent=2)
+
+    first, last = periods[0], periods[-1]
+    print("\nMarket Results:")
+    print(f"  Currency supply: {first['currency_supply']:,.0f} -> {last['currency_supply']:,.0f}")
+    print(f"  Price index: {first['price_index']:.2f} -> {last['price_index']:.2f}")
+    print(f"  Orders: {sum(p['orders'] for p in periods):,} "
+          f"({sum(p['rejected_orders'] for p in periods):,} rejected); "
+          f"trades: {sum(p['trades'] for p in periods):,}")
+    print(f"  Traded volume: {sum(p['transaction_volume'] for p in periods):,.0f}")
+    print(f"  Sinks: tax {sum(p['tax_collected'] for p in periods):,.0f}, "
+          f"listing fees {sum(p['listing_fees'] for p in periods):,.0f}; "
+          f"faucets: income {sum(p['income'] for p in periods):,.0f}, "
+          f"vendor {sum(p['vendor_paid'] for p in periods):,.0f}")
+
+    print(f"\n  {'item':<24} {'base':>10} {'final price':>12} {'trades/day':>11}")
+    for name, base in zip(sim.names, sim.base_price):
+        item = last['items'][name]
+        print(f"  {str(name)[:24]:<24} {base:>10,.2f} {item['price']:>12,.2f} {item['trades']:>11,}")
+    if cache is not None:
+        print(f"\n{cache.report()}")
+    print(f"\nSaved market series to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
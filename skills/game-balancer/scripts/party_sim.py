@@ -0,0 +1,746 @@
+#!/usr/bin/env python3
+"""
+Party-vs-group combat simulator for game balancing.
+
+Simulates a party of players against a group of enemies (raids, ambushes,
+spawn waves) on a continuous timeline: every entity attacks once per
+1 / attack_speed seconds after it spawns, choosing a target with a pluggable
+targeting policy. Entities are stored column-wise (structure of arrays), so
+the NumPy engine advances thousands of fights with all their entities at once.
+
+Outputs party win rate, time to finish, per-entity damage share and survival
+curves. Seeded runs are cached with sim_cache, keyed by the config, run options
+and simulator code.
+"""
+
+import argparse
+import copy
+import heapq
+import json
+import math
+import random
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+import combat_sim
+from combat_sim import (
+    HP_EPSILON,
+    WINNER_DRAW,
+    CombatStats,
+    QuantileSketch,
+    RunningStats,
+    apply_armor,
+    load_config,
+    parse_combatant,
+)
+from sim_cache import add_cache_arguments, cache_from_args, source_version
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; the pure-Python engine always works
+    np = None
+
+
+# Team indices
+PARTY = 0
+ENEMIES = 1
+
+# Winner codes (draw shared with combat_sim)
+WINNER_PARTY = 1
+WINNER_ENEMIES = 2
+
+# Fights per batch. Batch state is (fights x entities), so this is smaller than
+# combat_sim's 1v1 batch size.
+DEFAULT_PARTY_BATCH = 4096
+
+# Actors whose targets are scored at once; bounds the (actors x entities)
+# priority matrix of one instant
+TARGET_CHUNK = 65536
+
+# Survival curves: histogram bucket width (seconds) and points reported
+SURVIVAL_RESOLUTION = 0.1
+DEFAULT_CURVE_POINTS = 20
+
+
+# ---------------------------------------------------------------------------
+# Targeting policies
+# ---------------------------------------------------------------------------
+#
+# A policy maps (hp, threat, index, roll) of a candidate target to a priority;
+# the living, spawned enemy with the LOWEST priority is attacked (ties go to
+# the lower entity index). Policies are elementwise, so the same function
+# scores one candidate (floats) in the Python engine and an (actors x
+# entities) matrix in the NumPy engine. ``roll`` is a fresh uniform [0, 1)
+# number per actor and candidate.
+
+def _target_random(hp: Any, threat: Any, index: Any, roll: Any) -> Any:
+    """Uniformly random living enemy."""
+    return roll
+
+
+def _target_lowest_hp(hp: Any, threat: Any, index: Any, roll: Any) -> Any:
+    """Finish off the weakest enemy."""
+    return hp
+
+
+def _target_highest_threat(hp: Any, threat: Any, index: Any, roll: Any) -> Any:
+    """Enemy with the highest expected damage per second."""
+    return -threat
+
+
+def _target_focus(hp: Any, threat: Any, index: Any, roll: Any) -> Any:
+    """Focus fire in entity order (list order in the config)."""
+    return index
+
+
+TARGETING_POLICIES: Dict[str, Callable[[Any, Any, Any, Any], Any]] = {
+    'random': _target_random,
+    'lowest_hp': _target_lowest_hp,
+    'highest_threat': _target_highest_threat,
+    'focus': _target_focus,
+}
+
+
+def resolve_policy(policy: Any) -> Callable[[Any, Any, Any, Any], Any]:
+    """Look up a policy by name (callables are passed through)."""
+    if callable(policy):
+        return policy
+    if policy not in TARGETING_POLICIES:
+        raise ValueError(f"Unknown targeting policy: {policy} "
+                         f"(choose from {', '.join(TARGETING_POLICIES)})")
+    return TARGETING_POLICIES[policy]
+
+
+# ---------------------------------------------------------------------------
+# Entities
+# ---------------------------------------------------------------------------
+
+class EntityTable:
+    """
+    Structure-of-arrays store for every combatant in an encounter.
+
+    Each stat is one column (a list, or a NumPy array via columns()) indexed by
+    entity, instead of one object per entity.
+    """
+
+    __slots__ = (
+        'names', 'team', 'health', 'attack_power', 'armor', 'critical_chance',
+        'critical_multiplier', 'dodge_chance', 'attack_speed', 'spawn_time',
+    )
+
+    def __init__(self):
+        for column in self.__slots__:
+            setattr(self, column, [])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str, team: int, stats: CombatStats, spawn_time: float = 0.0) -> None:
+        """
+        Append one entity.
+
+        Args:
+            name: Display name (unique names keep reports readable)
+            team: PARTY or ENEMIES
+            stats: Combat stats; armor is the entity's own armor here
+            spawn_time: Seconds before the entity joins the fight
+        """
+        if stats.attack_speed <= 0:
+            raise ValueError(f"{name}: attack_speed must be positive")
+        self.names.append(name)
+        self.team.append(team)
+        self.health.append(float(stats.health))
+        self.attack_power.append(float(stats.attack_power))
+        self.armor.append(float(stats.armor))
+        self.critical_chance.append(float(stats.critical_chance))
+        self.critical_multiplier.append(float(stats.critical_multiplier))
+        self.dodge_chance.append(float(stats.dodge_chance))
+        self.attack_speed.append(float(stats.attack_speed))
+        self.spawn_time.append(float(spawn_time))
+
+    def threat(self) -> List[float]:
+        """Expected damage per second before armor, per entity."""
+        return [
+            ap * speed * (1 + crit * (mult - 1))
+            for ap, speed, crit, mult in zip(
+                self.attack_power, self.attack_speed,
+                self.critical_chance, self.critical_multiplier,
+            )
+        ]
+
+    def columns(self) -> Dict[str, Any]:
+        """All columns as NumPy arrays (plus 'threat')."""
+        columns = {name: np.asarray(getattr(self, name)) for name in self.__slots__ if name != 'names'}
+        columns['threat'] = np.asarray(self.threat())
+        return columns
+
+
+# ---------------------------------------------------------------------------
+# Aggregation
+# ---------------------------------------------------------------------------
+
+class PartyAccumulator:
+    """Constant-memory, mergeable aggregate over party fights."""
+
+    def __init__(self, num_entities: int):
+        self.wins = {WINNER_DRAW: 0, WINNER_PARTY: 0, WINNER_ENEMIES: 0}
+        self.duration = RunningStats()
+        self.duration_sketch = QuantileSketch(0.001)
+        self.damage = [0.0] * num_entities
+        self.deaths = [0] * num_entities
+        # Per entity: {bucket: deaths}, bucket = ceil(death_time / SURVIVAL_RESOLUTION)
+        self.death_buckets: List[Dict[int, int]] = [{} for _ in range(num_entities)]
+
+    @property
+    def simulations(self) -> int:
+        """Number of fights aggregated so far."""
+        return sum(self.wins.values())
+
+    def add_fight(self, winner: int, duration: float, dealt: List[float], deaths: List[float]) -> None:
+        """Add one simulate_fight() result."""
+        self.wins[winner] += 1
+        self.duration.add(duration)
+        self.duration_sketch.add(duration)
+        for i, (damage, death) in enumerate(zip(dealt, deaths)):
+            self.damage[i] += damage
+            if death != math.inf:
+                self.deaths[i] += 1
+                bucket = math.ceil(death / SURVIVAL_RESOLUTION - 1e-9)
+                self.death_buckets[i][bucket] = self.death_buckets[i].get(bucket, 0) + 1
+
+    def add_batch(self, winners: Any, durations: Any, dealt: Any, deaths: Any) -> None:
+        """Add the arrays returned by PartySimulator.simulate_batch()."""
+        for code in self.wins:
+            self.wins[code] += int(np.count_nonzero(winners == code))
+        self.duration.add_array(durations)
+        self.duration_sketch.add_array(durations)
+        totals = dealt.sum(axis=0)
+        for i in range(dealt.shape[1]):
+            self.damage[i] += float(totals[i])
+            times = deaths[:, i]
+            times = times[np.isfinite(times)]
+            self.deaths[i] += len(times)
+            buckets, counts = np.unique(
+                np.ceil(times / SURVIVAL_RESOLUTION - 1e-9).astype(np.int64), return_counts=True
+            )
+            for bucket, count in zip(buckets.tolist(), counts.tolist()):
+                self.death_buckets[i][bucket] = self.death_buckets[i].get(bucket, 0) + count
+
+    def merge(self, other: 'PartyAccumulator') -> None:
+        """Merge another accumulator into this one in place."""
+        for code in self.wins:
+            self.wins[code] += other.wins[code]
+        self.duration.merge(other.duration)
+        self.duration_sketch.merge(other.duration_sketch)
+        for i in range(len(self.damage)):
+            self.damage[i] += other.damage[i]
+            self.deaths[i] += other.deaths[i]
+            for bucket, count in other.death_buckets[i].items():
+                self.death_buckets[i][bucket] = self.death_buckets[i].get(bucket, 0) + count
+
+    def survival_curve(self, i: int, times: List[float]) -> List[List[float]]:
+        """[[t, P(entity i alive at t)], ...] for the given times."""
+        fights = self.simulations
+        buckets = sorted(self.death_buckets[i].items())
+        curve, dead, k = [], 0, 0
+        for t in times:
+            limit = t / SURVIVAL_RESOLUTION + 1e-9
+            while k < len(buckets) and buckets[k][0] <= limit:
+                dead += buckets[k][1]
+                k += 1
+            curve.append([round(t, 6), 1 - dead / fights])
+        return curve
+
+    def to_stats(self, entities: EntityTable, curve_points: int = DEFAULT_CURVE_POINTS) -> Dict[str, Any]:
+        """Build the run_simulations stats dictionary."""
+        fights = self.simulations
+        team_damage = [0.0, 0.0]
+        for team, damage in zip(entities.team, self.damage):
+            team_damage[team] += damage
+
+        horizon = self.duration.max or 0.0
+        step = horizon / curve_points if curve_points else 0.0
+        times = [step * k for k in range(curve_points + 1)] if step > 0 else [0.0]
+
+        return {
+            'simulations': fights,
+            'party_win_rate': self.wins[WINNER_PARTY] / fights,
+            'enemy_win_rate': self.wins[WINNER_ENEMIES] / fights,
+            'draw_rate': self.wins[WINNER_DRAW] / fights,
+            'average_duration': self.duration.mean,
+            'duration_std': math.sqrt(self.duration.variance),
+            'duration_min': self.duration.min,
+            'duration_max': self.duration.max,
+            'duration_p50': self.duration_sketch.quantile(0.50),
+            'duration_p90': self.duration_sketch.quantile(0.90),
+            'duration_p99': self.duration_sketch.quantile(0.99),
+            'entities': [
+                {
+                    'name': name,
+                    'team': 'party' if team == PARTY else 'enemies',
+                    'avg_damage': self.damage[i] / fights,
+                    'damage_share': self.damage[i] / team_damage[team] if team_damage[team] else 0.0,
+                    'death_rate': self.deaths[i] / fights,
+                    'survival': self.survival_curve(i, times),
+                }
+                for i, (name, team) in enumerate(zip(entities.names, entities.team))
+            ],
+        }
+
+
+# ---------------------------------------------------------------------------
+# Simulator
+# ---------------------------------------------------------------------------
+
+class PartySimulator:
+    """
+    Simulates party-vs-group encounters.
+
+    Attacks that land at the same instant resolve simultaneously (every actor
+    picks its target from the state before that instant), so entities killed
+    at time t still deal their time-t damage. Dodge uses the target's
+    dodge_chance and armor the target's own armor stat. A fight ends when one
+    side is wiped (not-yet-spawned entities count as alive) or at max_time,
+    which is a draw.
+    """
+
+    def __init__(
+        self,
+        entities: EntityTable,
+        party_targeting: Any = 'lowest_hp',
+        enemy_targeting: Any = 'random',
+        armor_formula: str = 'flat',
+        max_time: float = 600.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Initialize party simulator.
+
+        Args:
+            entities: Every combatant (both teams)
+            party_targeting: Policy name or callable for party members
+            enemy_targeting: Policy name or callable for enemies
+            armor_formula: 'flat' or 'percent', applied with the target's armor
+            max_time: Seconds before the fight is called a draw
+            seed: Random seed for reproducible runs (None = unseeded)
+        """
+        self.entities = entities
+        self.policies = (resolve_policy(party_targeting), resolve_policy(enemy_targeting))
+        self.armor_formula = armor_formula
+        self.max_time = max_time
+        self.seed = seed
+        self.rng = random.Random(seed)
+
+    def simulate_fight(self) -> Tuple[int, float, List[float], List[float]]:
+        """
+        Simulate a single encounter.
+
+        Returns:
+            Tuple of (winner_code, duration, damage dealt per entity,
+            death time per entity (inf if it survived))
+        """
+        e = self.entities
+        n = len(e)
+        rng = self.rng
+        threat = e.threat()
+        hp = list(e.health)
+        dealt = [0.0] * n
+        deaths = [0.0 if h <= HP_EPSILON else math.inf for h in hp]
+        queue = [(e.spawn_time[i] + 1 / e.attack_speed[i], i) for i in range(n) if hp[i] > HP_EPSILON]
+        heapq.heapify(queue)
+
+        def alive(team: int) -> bool:
+            return any(hp[j] > HP_EPSILON for j in range(n) if e.team[j] == team)
+
+        now = 0.0
+        while queue and alive(PARTY) and alive(ENEMIES):
+            if queue[0][0] > self.max_time:
+                break
+            now = queue[0][0]
+            actors = []
+            while queue and queue[0][0] == now:
+                actors.append(heapq.heappop(queue)[1])
+
+            # Everyone acting now targets the state before this instant
+            actors = [a for a in actors if hp[a] > HP_EPSILON]
+            hits = []
+            for a in actors:
+                policy = self.policies[e.team[a]]
+                best = None
+                for j in range(n):
+                    if e.team[j] == e.team[a] or hp[j] <= HP_EPSILON or e.spawn_time[j] > now:
+                        continue
+                    priority = policy(hp[j], threat[j], j, rng.random())
+                    if best is None or priority < best[0]:
+                        best = (priority, j)
+                if best is not None:
+                    target = best[1]
+                    if rng.random() >= e.dodge_chance[target]:
+                        damage = e.attack_power[a]
+                        if rng.random() < e.critical_chance[a]:
+                            damage *= e.critical_multiplier[a]
+                        hits.append((a, target, apply_armor(damage, self.armor_formula, e.armor[target])))
+
+            for a, target, damage in hits:
+                hp[target] -= damage
+                dealt[a] += damage
+            for a in actors:
+                if hp[a] > HP_EPSILON:
+                    heapq.heappush(queue, (now + 1 / e.attack_speed[a], a))
+            for j in range(n):
+                if hp[j] <= HP_EPSILON and deaths[j] == math.inf:
+                    deaths[j] = now
+
+        party_alive, enemies_alive = alive(PARTY), alive(ENEMIES)
+        if party_alive and not enemies_alive:
+            winner = WINNER_PARTY
+        elif enemies_alive and not party_alive:
+            winner = WINNER_ENEMIES
+        else:
+            winner = WINNER_DRAW
+
+        return winner, now, dealt, deaths
+
+    def simulate_batch(self, num_fights: int, rng: Any = None) -> Tuple[Any, Any, Any, Any]:
+        """
+        Simulate many encounters at once with NumPy.
+
+        State is held as (fights x entities) arrays. Each iteration advances
+        every active fight to its next instant and resolves all entities acting
+        then together; finished fights are compacted out of the arrays.
+
+        Args:
+            num_fights: Number of fights in the batch
+            rng: numpy.random.Generator (a fresh unseeded one if omitted)
+
+        Returns:
+            Tuple of arrays (winner_codes, durations, dealt (fights x entities),
+            death_times (fights x entities, inf if survived))
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for the batch engine")
+        rng = rng if rng is not None else np.random.default_rng()
+
+        c = self.entities.columns()
+        n = len(self.entities)
+        index = np.arange(n)
+        is_party = c['team'] == PARTY
+        swing = 1.0 / c['attack_speed']
+
+        winners = np.zeros(num_fights, dtype=np.int8)
+        duration_out = np.zeros(num_fights)
+        dealt_out = np.zeros((num_fights, n))
+        deaths_out = np.full((num_fights, n), np.inf)
+
+        # Working state for fights still in progress
+        ids = np.arange(num_fights)
+        hp = np.tile(c['health'], (num_fights, 1))
+        next_time = np.tile(c['spawn_time'] + swing, (num_fights, 1))
+        next_time[hp <= HP_EPSILON] = np.inf
+        dealt = np.zeros((num_fights, n))
+        deaths = np.where(hp <= HP_EPSILON, 0.0, np.inf)
+        now = np.zeros(num_fights)
+
+        while True:
+            party_alive = (hp[:, is_party] > HP_EPSILON).any(axis=1)
+            enemies_alive = (hp[:, ~is_party] > HP_EPSILON).any(axis=1)
+            upcoming = next_time.min(axis=1)
+            done = ~party_alive | ~enemies_alive | (upcoming > self.max_time)
+
+            if done.any():
+                # Retire finished fights and compact the working arrays
+                done_ids = ids[done]
+                winners[done_ids] = np.where(
+                    party_alive[done] & ~enemies_alive[done], WINNER_PARTY,
+                    np.where(enemies_alive[done] & ~party_alive[done], WINNER_ENEMIES, WINNER_DRAW),
+                )
+                duration_out[done_ids] = now[done]
+                dealt_out[done_ids] = dealt[done]
+                deaths_out[done_ids] = deaths[done]
+
+                keep = ~done
+                ids, hp, next_time = ids[keep], hp[keep], next_time[keep]
+                dealt, deaths, upcoming = dealt[keep], deaths[keep], upcoming[keep]
+
+            if not len(ids):
+                break
+
+            now = upcoming
+            fight, actor = np.nonzero(next_time == now[:, None])
+            target = np.full(len(actor), -1)
+            for start in range(0, len(actor), TARGET_CHUNK):
+                chunk = slice(start, start + TARGET_CHUNK)
+                f, a = fight[chunk], actor[chunk]
+                candidates = (
+                    (hp[f] > HP_EPSILON)
+                    & (c['team'][None, :] != c['team'][a][:, None])
+                    & (c['spawn_time'][None, :] <= now[f][:, None])
+                )
+                priority = np.full(candidates.shape, np.inf)
+                rolls = rng.random(candidates.shape)
+                for team, policy in enumerate(self.policies):
+                    rows = np.nonzero(c['team'][a] == team)[0]
+                    if len(rows):
+                        priority[rows] = policy(hp[f[rows]], c['threat'][None, :], index[None, :], rolls[rows])
+                priority = np.where(candidates, priority, np.inf)
+                target[chunk] = np.where(candidates.any(axis=1), np.argmin(priority, axis=1), -1)
+
+            rolls = rng.random((2, len(actor)))
+            safe = np.maximum(target, 0)
+            hit = (target >= 0) & (rolls[0] >= c['dodge_chance'][safe])
+            damage = c['attack_power'][actor] * np.where(
+                rolls[1] < c['critical_chance'][actor], c['critical_multiplier'][actor], 1.0
+            )
+            if self.armor_formula == 'flat':
+                damage = np.maximum(1, damage - c['armor'][safe])
+            elif self.armor_formula == 'percent':
+                damage = damage * (1 - c['armor'][safe] / 100)
+            damage = np.where(hit, damage, 0.0)
+
+            np.add.at(hp, (fight, safe), -damage)
+            dealt[fight, actor] += damage
+            next_time[fight, actor] = now[fight] + swing[actor]
+
+            died = (hp <= HP_EPSILON) & np.isinf(deaths)
+            deaths = np.where(died, now[:, None], deaths)
+            next_time[hp <= HP_EPSILON] = np.inf
+
+        return winners, duration_out, dealt_out, deaths_out
+
+    def run_batch(self, engine: str, seed: int, index: int, size: int) -> PartyAccumulator:
+        """
+        Run one batch of fights on its own RNG stream and aggregate it.
+
+        Args:
+            engine: 'python' or 'numpy'
+            seed: Base seed of the run
+            index: Batch index (selects the RNG stream)
+            size: Number of fights in the batch
+
+        Returns:
+            PartyAccumulator for the batch
+        """
+        accumulator = PartyAccumulator(len(self.entities))
+
+        if engine == 'numpy':
+            rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(index,)))
+            accumulator.add_batch(*self.simulate_batch(size, rng))
+            return accumulator
+
+        sim = copy.copy(self)
+        sim.rng = random.Random(f'{seed}:{index}')
+        for _ in range(size):
+            accumulator.add_fight(*sim.simulate_fight())
+
+        return accumulator
+
+    def run_simulations(
+        self,
+        num_simulations: int,
+        engine: str = 'auto',
+        batch_size: int = DEFAULT_PARTY_BATCH,
+        workers: int = 1,
+        curve_points: int = DEFAULT_CURVE_POINTS,
+    ) -> Dict[str, Any]:
+        """
+        Run multiple encounter simulations and aggregate results.
+
+        As in combat_sim, every batch has its own RNG stream and batches merge
+        in order, so a seeded run is identical for any number of workers.
+
+        Args:
+            num_simulations: Number of fights to simulate
+            engine: 'python', 'numpy' or 'auto' (numpy when installed)
+            batch_size: Fights per batch (RNG stream and work unit)
+            workers: Number of worker processes (1 = run in this process)
+            curve_points: Points per survival curve
+
+        Returns:
+            Dictionary with aggregated statistics
+        """
+        if engine == 'auto':
+            engine = 'numpy' if np is not None else 'python'
+        elif engine == 'numpy' and np is None:
+            raise RuntimeError("NumPy is not installed; use --engine python")
+
+        base_seed = self.seed if self.seed is not None else self.rng.getrandbits(63)
+        tasks = [
+            (self, engine, base_seed, index, min(batch_size, num_simulations - start))
+            for index, start in enumerate(range(0, num_simulations, batch_size))
+        ]
+
+        accumulator = PartyAccumulator(len(self.entities))
+        if workers > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for batch in pool.map(_run_batch_task, tasks):
+                    accumulator.merge(batch)
+        else:
+            for batch in map(_run_batch_task, tasks):
+                accumulator.merge(batch)
+
+        return accumulator.to_stats(self.entities, curve_points)
+
+
+def _run_batch_task(task: Tuple[PartySimulator, str, int, int, int]) -> PartyAccumulator:
+    """Process-pool entry point: run one (simulator, engine, seed, index, size) batch."""
+    sim, engine, seed, index, size = task
+    return sim.run_batch(engine, seed, index, size)
+
+
+def build_party_simulator(config: Dict[str, Any], seed: Optional[int] = None) -> PartySimulator:
+    """
+    Create a PartySimulator from a party configuration dict.
+
+    Each entry of 'party' and 'enemies' takes combat_sim combatant fields plus
+    'name', 'count' (copies, numbered "name #k") and 'spawn_time' (seconds).
+    """
+    entities = EntityTable()
+    for team, key in ((PARTY, 'party'), (ENEMIES, 'enemies')):
+        for i, entry in enumerate(config.get(key, [])):
+            stats, _ = parse_combatant(entry)
+            name = entry.get('name', f'{key}_{i}')
+            count = entry.get('count', 1)
+            for k in range(count):
+                entities.add(
+                    f'{name} #{k + 1}' if count > 1 else name,
+                    team,
+                    stats,
+                    spawn_time=entry.get('spawn_time', 0.0),
+                )
+
+    return PartySimulator(
+        entities,
+        party_targeting=config.get('party_targeting', 'lowest_hp'),
+        enemy_targeting=config.get('enemy_targeting', 'random'),
+        armor_formula=config.get('armor_formula', 'flat'),
+        max_time=config.get('max_time', 600.0),
+        seed=seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Party-vs-group combat simulator')
+    parser.add_argument(
+        '--config',
+        type=Path,
+        required=True,
+        help='JSON config with "party" and "enemies" lists'
+    )
+    parser.add_argument(
+        '--simulations',
+        type=int,
+        default=1000,
+        help='Number of encounters to simulate (default: 1000)'
+    )
+    parser.add_argument(
+        '--party-targeting',
+        choices=sorted(TARGETING_POLICIES),
+        default=None,
+        help='Override the party targeting policy'
+    )
+    parser.add_argument(
+        '--enemy-targeting',
+        choices=sorted(TARGETING_POLICIES),
+        default=None,
+        help='Override the enemy targeting policy'
+    )
+    parser.add_argument(
+        '--curve-points',
+        type=int,
+        default=DEFAULT_CURVE_POINTS,
+        help=f'Points per survival curve (default: {DEFAULT_CURVE_POINTS})'
+    )
+    parser.add_argument(
+        '--engine',
+        choices=['auto', 'python', 'numpy'],
+        default='auto',
+        help='Simulation engine (default: auto = numpy batch engine when installed)'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='Random seed for reproducibility'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=1,
+        help='Worker processes to shard simulations across (default: 1)'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_PARTY_BATCH,
+        help=f'Fights per batch/shard (default: {DEFAULT_PARTY_BATCH})'
+    )
+    parser.add_argument(
+        '--output',
+        type=Path,
+        default=Path('party_results.json'),
+        help='Output path for results JSON'
+    )
+    add_cache_arguments(parser)
+
+    args = parser.parse_args()
+
+    config = load_config(args.config)
+    if args.party_targeting:
+        config['party_targeting'] = args.party_targeting
+    if args.enemy_targeting:
+        config['enemy_targeting'] = args.enemy_targeting
+    sim = build_party_simulator(config, seed=args.seed)
+    cache = cache_from_args(args)
+
+    party_size = sim.entities.team.count(PARTY)
+    print(f"Running {args.simulations} encounter simulations "
+          f"({party_size} vs {len(sim.entities) - party_size})...")
+
+    def run() -> Dict[str, Any]:
+        return sim.run_simulations(
+            args.simulations,
+            engine=args.engine,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            curve_points=args.curve_points,
+        )
+
+    if cache is None:
+        results = run()
+    else:
+        key = None
+        if args.seed is not None:
+            # Seeded runs are identical for any worker count; 'auto' is keyed
+            # as the engine it resolves to here
+            engine = args.engine
+            if engine == 'auto':
+                engine = 'numpy' if np is not None else 'python'
+            key = cache.key('party_sim', source_version(__file__, combat_sim.__file__),
+                            config=config, simulations=args.simulations, engine=engine,
+                            batch_size=args.batch_size, curve_points=args.curve_points,
+                            seed=args.seed)
+        results = cache.get_or_compute(key, run)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nEncounter Results:")
+    print(f"  Party win rate: {results['party_win_rate']:.2%}")
+    print(f"  Enemy win rate: {results['enemy_win_rate']:.2%}")
+    print(f"  Draw rate: {results['draw_rate']:.2%}")
+    print(f"  Average duration: {results['average_duration']:.2f}s "
+          f"(P50/P90/P99 {results['duration_p50']:.2f}/{results['duration_p90']:.2f}/"
+          f"{results['duration_p99']:.2f}s)")
+    print(f"\n  {'entity':<24} {'team':<8} {'dmg share':>9} {'avg dmg':>9} {'death rate':>10}")
+    for entity in results['entities']:
+        print(f"  {entity['name']:<24} {entity['team']:<8} {entity['damage_share']:>9.1%} "
+              f"{entity['avg_damage']:>9.1f} {entity['death_rate']:>10.1%}")
+    if cache is not None:
+        print(f"\n{cache.report()}")
+    print(f"\nSaved results to: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
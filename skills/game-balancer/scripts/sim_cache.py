@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for simulation results.
+
+Shared by combat_sim.py, loot_sim.py, economy_sim.py and the scripts built on
+them. A result is stored under the SHA-256 of its canonical inputs (config,
+simulation count, seed, options) together with a hash of the simulator's
+source code, so editing a simulator makes its old entries unreachable rather
+than stale. The cache is bounded in size and evicts least-recently-used
+entries; a hit refreshes the entry's modification time. The directory is
+scanned once for its size and then tracked per write, so it is only listed
+again when it has to evict.
+
+Only reproducible runs are cached: stochastic runs need a seed.
+
+Usage:
+    python sim_cache.py            # entry count and size
+    python sim_cache.py --clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+DEFAULT_CACHE_DIR = Path(
+    os.environ.get('SIM_CACHE_DIR', Path.home() / '.cache' / 'game-balancer')
+)
+DEFAULT_CACHE_MB = 256
+
+# Eviction frees space down to this fraction of the size limit, so a full
+# cache is rescanned once per batch of writes rather than on every write
+EVICT_TO_FRACTION = 0.9
+
+
+def source_version(*paths: Any) -> str:
+    """
+    Hash of simulator source files, used as the code version in cache keys.
+
+    Args:
+        *paths: Source files (typically __file__ of each module involved)
+
+    Returns:
+        Short hex digest that changes whenever any of the files changes
+    """
+    digest = hashlib.sha256()
+    for path in sorted(str(p) for p in paths):
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def canonical_hash(value: Any) -> str:
+    """SHA-256 of the canonical JSON form of value (sorted keys, no whitespace)."""
+    canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Size-bounded LRU cache of JSON results in a directory."""
+
+    def __init__(self, directory: Path = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_CACHE_MB << 20):
+        """
+        Initialize result cache.
+
+        Args:
+            directory: Cache directory (created on first write)
+            max_bytes: Total size above which old entries are evicted
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        self._total_bytes: Optional[int] = None  # running size, from one scan
+
+    def key(self, namespace: str, version: str, **inputs: Any) -> str:
+        """
+        Cache key for a run.
+
+        Args:
+            namespace: Simulator/mode name, e.g. 'combat_sim:matchup'
+            version: source_version() of the code producing the result
+            **inputs: Config, simulation count, seed and any option that
+                      changes the result
+
+        Returns:
+            Hex key
+        """
+        return canonical_hash({'namespace': namespace, 'version': version, 'inputs': inputs})
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f'{key}.json'
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cached result for key, or None (unreadable entries count as misses)."""
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError):
+            self.misses += 1
+            path.unlink(missing_ok=True)
+            return None
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a result atomically, then evict down to max_bytes."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        if self._total_bytes is None:
+            self._total_bytes = sum(size for _, size, _ in self.entries())
+        else:
+            self._total_bytes += size - replaced
+        if self._total_bytes > self.max_bytes:
+            self.evict(keep=key)
+
+    def entries(self) -> List[Tuple[float, int, Path]]:
+        """(mtime, size, path) of every entry, least recently used first."""
+        entries = []
+        for path in self.directory.glob('*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Delete least-recently-used entries until the cache fits in EVICT_TO_FRACTION x max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes * EVICT_TO_FRACTION:
+                break
+            if path.stem == keep:
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            self.evictions += 1
+        self._total_bytes = total
+
+    def clear(self) -> int:
+        """Delete every entry; returns the number removed."""
+        entries = self.entries()
+        for _, _, path in entries:
+            path.unlink(missing_ok=True)
+        self._total_bytes = 0
+        return len(entries)
+
+    def get_or_compute(
+        self,
+        key: Optional[str],
+        compute: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Return the cached result for key, or compute and store it.
+
+        Args:
+            key: Cache key, or None for runs that must not be cached
+            compute: Produces the result on a miss
+
+        Returns:
+            Result dictionary
+        """
+        if key is None:
+            self.bypassed += 1
+            return compute()
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def report(self) -> str:
+        """One-line hit/miss summary for CLI output."""
+        parts = [f"{self.hits} hit{'s' if self.hits != 1 else ''}",
+                 f"{self.misses} miss{'es' if self.misses != 1 else ''}"]
+        if self.bypassed:
+            parts.append(f"{self.bypassed} not cacheable (no --seed)")
+        if self.evictions:
+            parts.append(f"{self.evictions} evicted")
+        return f"Cache: {', '.join(parts)} ({self.directory})"
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the shared --cache-dir / --cache-size-mb / --no-cache options."""
+    parser.add_argument(
+        '--cache-dir',
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f'Result cache directory (default: $SIM_CACHE_DIR or {DEFAULT_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--cache-size-mb',
+        type=int,
+        default=DEFAULT_CACHE_MB,
+        help=f'Evict least recently used results above this size (default: {DEFAULT_CACHE_MB})'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always simulate and do not store results'
+    )
+
+
+def cache_from_args(args: argparse.Namespace) -> Optional[ResultCache]:
+    """ResultCache for parsed add_cache_arguments() options (None with --no-cache)."""
+    if args.no_cache:
+        return None
+    return ResultCache(args.cache_dir, args.cache_size_mb << 20)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or clear the simulation result cache')
+    parser.add_argument(
+        '--cache-dir',
+        type=Path,
+        default=DEFAULT_CACHE_DIR,
+        help=f'Result cache directory (default: $SIM_CACHE_DIR or {DEFAULT_CACHE_DIR})'
+    )
+    parser.add_argument(
+        '--clear',
+        action='store_true',
+        help='Delete all cached results'
+    )
+
+    args = parser.parse_args()
+    cache = ResultCache(args.cache_dir)
+
+    if args.clear:
+        print(f"Removed {cache.clear()} cached results from {cache.directory}")
+        return
+
+    entries = cache.entries()
+    total = sum(size for _, size, _ in entries)
+    print(f"Cache directory: {cache.directory}")
+    print(f"  Entries: {len(entries)}")
+    print(f"  Size: {total / (1 << 20):.2f} MB")
+
+
+if __name__ == '__main__':
+    main()
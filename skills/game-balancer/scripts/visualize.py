@@ -4,7 +4,7 @@ Chart generation utilities for game balance data.
 
 Generates charts from JSON data files produced by stat_curves, combat_sim,
 economy_sim, loot_sim, and fairness scripts. Supports line, bar, histogram,
-and scatter chart types. Uses matplotlib when available; falls back to ASCII
+scatter, and heatmap (combat_sim roster matrices) chart types. Uses matplotlib when available; falls back to ASCII
 chart rendering otherwise.
 """
 
@@ -159,6 +159,37 @@ class ASCIIChart:
         # Scatter is essentially the same as line for ASCII
         return ASCIIChart.line(x_values, y_values, title, width, height)
 
+    @staticmethod
+    def heatmap(
+        labels: List[str],
+        matrix: List[List[float]],
+        title: str = '',
+    ) -> str:
+        """Render a square matrix as ASCII shading (darker = higher)."""
+        if not labels or not matrix:
+            return '(no data)'
+
+        shades = ' .:-=+*#%@'
+        values = [v for row in matrix for v in row]
+        v_min = min(values)
+        v_range = (max(values) - v_min) or 1.0
+
+        lines: List[str] = []
+        if title:
+            lines.append(f'  {title}')
+            lines.append('')
+
+        max_label = max(len(str(l)) for l in labels)
+        for label, row in zip(labels, matrix):
+            cells = ''.join(
+                shades[min(len(shades) - 1, int((v - v_min) / v_range * len(shades)))] * 2
+                for v in row
+            )
+            lines.append(f'{str(label):>{max_label}} |{cells}|')
+        lines.append(f'{"":>{max_label}}  range [{v_min:.2f}, {v_min + v_range:.2f}]')
+
+        return '\n'.join(lines)
+
 
 # ---------------------------------------------------------------------------
 # Matplotlib chart renderer
@@ -232,6 +263,44 @@ def render_matplotlib(
     plt.close()
 
 
+def render_matplotlib_heatmap(
+    labels: List[str],
+    matrix: List[List[float]],
+    title: str,
+    output_path: Path,
+) -> None:
+    """
+    Render a square matrix (e.g. a combat_sim roster win-rate matrix) as PNG.
+
+    Args:
+        labels: Row/column labels
+        matrix: Row-major values (row = attacker, column = defender)
+        title: Chart title
+        output_path: Path to save PNG
+    """
+    import matplotlib
+    matplotlib.use('Agg')  # Non-interactive backend
+    import matplotlib.pyplot as plt
+
+    size = max(6, len(labels) * 0.35)
+    fig, ax = plt.subplots(figsize=(size + 2, size))
+    image = ax.imshow(matrix, cmap='RdYlGn', aspect='auto')
+    fig.colorbar(image, ax=ax)
+
+    ax.set_xticks(range(len(labels)))
+    ax.set_yticks(range(len(labels)))
+    ax.set_xticklabels(labels, rotation=45, ha='right')
+    ax.set_yticklabels(labels)
+    ax.set_xlabel('Defender', fontsize=12)
+    ax.set_ylabel('Attacker', fontsize=12)
+    ax.set_title(title, fontsize=14, fontweight='bold')
+
+    plt.tight_layout()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    plt.savefig(str(output_path), dpi=150, format='png')
+    plt.close()
+
+
 # ---------------------------------------------------------------------------
 # Data extraction from various JSON formats
 # ---------------------------------------------------------------------------
@@ -250,6 +319,7 @@ def extract_data(
         - economy_sim output: {balance_history: [...], ...}
         - loot_sim output: {actual_rates: {item: rate}, ...}
         - fairness output: {analysis: {options_analyzed: N, ...}, ...}
+        - combat_sim roster matrix / fairness input: {options: {name: value}, ...}
         - Generic list of numbers
         - List of {x: ..., y: ...} objects
         - Dict with x_key / y_key arrays
@@ -293,8 +363,10 @@ def extract_data(
     if isinstance(data, dict) and 'balance_history' in data:
         history = data['balance_history']
         if isinstance(history, list):
+            # Long runs store sampled turns alongside the history
+            turns = data.get('history_turns') or list(range(len(history)))
             return (
-                list(range(len(history))),
+                [float(t) for t in turns],
                 [float(v) for v in history],
                 None,
             )
@@ -312,6 +384,13 @@ def extract_data(
                     labs,
                 )
 
+    # --- Case 4b: option values (fairness input, combat_sim roster matrix) ---
+    if isinstance(data, dict) and isinstance(data.get('options'), dict):
+        items = data['options']
+        labs = list(items.keys())
+        vals = [float(v) for v in items.values()]
+        return list(range(len(labs))), vals, labs
+
     # --- Case 5: fairness analysis options ---
     if isinstance(data, dict) and 'analysis' in data:
         analysis = data['analysis']
@@ -353,6 +432,23 @@ def extract_data(
     return [], [], None
 
 
+def extract_matrix(
+    data: Any,
+    matrix_key: str = 'win_rate',
+) -> Tuple[List[str], List[List[float]]]:
+    """
+    Extract a labelled square matrix from combat_sim roster output.
+
+    Returns:
+        (labels, matrix), or ([], []) if the data has no such matrix
+    """
+    if isinstance(data, dict) and isinstance(data.get(matrix_key), list):
+        labels = data.get('combatants') or [str(i) for i in range(len(data[matrix_key]))]
+        matrix = [[float(v) for v in row] for row in data[matrix_key]]
+        return [str(l) for l in labels], matrix
+    return [], []
+
+
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
@@ -370,7 +466,7 @@ def main():
     )
     parser.add_argument(
         '--type',
-        choices=['line', 'bar', 'histogram', 'scatter'],
+        choices=['line', 'bar', 'histogram', 'scatter', 'heatmap'],
         default='line',
         help='Chart type (default: line)'
     )
@@ -398,6 +494,12 @@ def main():
         default=None,
         help='JSON key for y-axis data'
     )
+    parser.add_argument(
+        '--matrix-key',
+        type=str,
+        default='win_rate',
+        help='Matrix to plot with --type heatmap (default: win_rate)'
+    )
     parser.add_argument(
         '--x-label',
         type=str,
@@ -426,6 +528,39 @@ def main():
     with open(args.data, 'r', encoding='utf-8') as f:
         raw_data = json.load(f)
 
+    # Determine output path
+    output_path = args.output or args.data.with_name(
+        f'{args.data.stem}_chart.png'
+    )
+
+    # Auto-generate title if not provided
+    title = args.title or f'{args.data.stem} ({args.type})'
+
+    use_ascii = args.ascii or not _has_matplotlib()
+
+    if args.type == 'heatmap':
+        labels, matrix = extract_matrix(raw_data, args.matrix_key)
+        if not matrix:
+            print(f"Error: No '{args.matrix_key}' matrix found in input file.")
+            print("Tip: Heatmaps read combat_sim.py --roster output.")
+            sys.exit(1)
+
+        if use_ascii:
+            output_text = ASCIIChart.heatmap(labels, matrix, title)
+            print(output_text)
+            txt_path = output_path.with_suffix('.txt')
+            txt_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(txt_path, 'w', encoding='utf-8') as f:
+                f.write(output_text + '\n')
+            print(f"\nSaved ASCII chart to: {txt_path}")
+        else:
+            render_matplotlib_heatmap(labels, matrix, title, output_path)
+            print(f"Saved chart to: {output_path}")
+
+        print(f"\nData Summary:")
+        print(f"  Matrix: {len(matrix)}x{len(matrix[0]) if matrix else 0} ({args.matrix_key})")
+        return
+
     # Extract x/y values
     x_values, y_values, labels = extract_data(
         raw_data,
@@ -438,16 +573,7 @@ def main():
         print("Tip: Use --x-key and --y-key to specify JSON keys, or check the data format.")
         sys.exit(1)
 
-    # Determine output path
-    output_path = args.output or args.data.with_name(
-        f'{args.data.stem}_chart.png'
-    )
-
-    # Auto-generate title if not provided
-    title = args.title or f'{args.data.stem} ({args.type})'
-
     # Render chart
-    use_ascii = args.ascii or not _has_matplotlib()
 
     if use_ascii:
         if _has_matplotlib() and not args.ascii: